@@ -0,0 +1 @@
+# Benchmarks. Run them from the top folder, e.g. python -m benchmarks.startup
@@ -0,0 +1,129 @@
+# A corpus of recorded games to check collision engines against, and to time them
+#
+# The collision rule of collission_detector.collide is corner containment in both directions, with touching
+# edges counting as a collision. A faster engine must give the same results for every step, or the learned
+# Q-tables behave differently. The corpus records the seed of the pillars, the actions and the outcome of each
+# step ('.' nothing, 's' scored, 'x' died) of seeded games played by a mix of random and gap-following policies.
+#
+# python -m benchmarks.collisions --generate                  re-generate the corpus with the current engine
+# python -m benchmarks.collisions --engine module:function    replay the corpus with an engine(pillars, rect)
+
+from __future__ import division
+import argparse
+import importlib
+import json
+import random
+import time
+
+from flappy_bird import flappy_bird_game
+
+corpus_file = 'tests/data/collision_corpus.json'
+
+def _policy_action(game, rng, style):
+    '''
+    Returns the action of the policy style: ('random', jump probability) or ('gap', noise probability)
+    '''
+    kind, p = style
+    if kind == 'random' or rng.random() < p:
+        return rng.random() < p
+    bird = game.bird
+    for pillar in game.pillars:
+        if pillar.x + pillar.width > bird.x:
+            gap_y_min, gap_y_max = pillar.get_gap_y_range()
+            return bird.y < gap_y_min + 0.3 * (gap_y_max - gap_y_min) and bird.yspeed < 0
+    return False
+
+def generate_corpus(n_games=60, max_steps=400):
+    '''
+    Returns the corpus of n_games recorded with the current engine
+    '''
+    styles = [('random', 0.1), ('random', 0.25), ('gap', 0.02), ('gap', 0.1)]
+    games = []
+    for seed in xrange(n_games):
+        rng = random.Random(-1 - seed)
+        style = styles[seed % len(styles)]
+        game = flappy_bird_game(rng=random.Random(seed))
+        actions = []
+        outcomes = []
+        while not game.is_game_over and len(actions) < max_steps:
+            action = _policy_action(game, rng, style)
+            game.move(action)
+            actions.append('1' if action else '0')
+            outcomes.append(_get_outcome(game))
+        games.append({'seed': seed, 'actions': ''.join(actions), 'outcomes': ''.join(outcomes)})
+    return {'max_steps': max_steps, 'games': games}
+
+def _get_outcome(game):
+    if game.is_game_over:
+        return 'x'
+    if game.just_scored:
+        return 's'
+    return '.'
+
+def replay(corpus, engine=None):
+    '''
+    Replay the corpus with the engine, or the game's if None. Returns the mismatches, as (seed, step, expected
+    outcome, outcome) of the first one of each game, and the steps per second. A game that the engine finds
+    over before its first move is a mismatch at step -1. Recorded games without moves are skipped
+    '''
+    mismatches = []
+    n_steps = 0
+    elapsed = 0.0
+    for recorded in corpus['games']:
+        game = flappy_bird_game(rng=random.Random(recorded['seed']))
+        if game.is_game_over or not recorded['actions']:
+            continue
+        if engine is not None:
+            game.collision_engine = engine
+            if not game.is_bird_alive():
+                mismatches.append((recorded['seed'], -1, '.', 'x'))
+                continue
+        actions = [a == '1' for a in recorded['actions']]
+        outcomes = recorded['outcomes']
+
+        game_steps = 0
+        start = time.time()
+        for i in xrange(len(actions)):
+            game.move(actions[i])
+            game_steps += 1
+            outcome = _get_outcome(game)
+            if outcome != outcomes[i]:
+                mismatches.append((recorded['seed'], i, outcomes[i], outcome))
+                break
+        elapsed += time.time() - start
+        n_steps += game_steps
+    return mismatches, n_steps / max(elapsed, 1e-9)
+
+def load_corpus(filename=corpus_file):
+    with open(filename) as f:
+        return json.load(f)
+
+def load_engine(name):
+    '''
+    Returns the engine function given as module:function
+    '''
+    module_name, function_name = name.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Check a collision engine against the recorded games, and time it')
+    parser.add_argument('--corpus', default=corpus_file, help='(default=%(default)s)')
+    parser.add_argument('--engine', default=None, help='module:function of the engine(pillars, rect). The game\'s by default')
+    parser.add_argument('--generate', action='store_true', help='record the corpus with the game\'s engine instead')
+    parser.add_argument('--games', type=int, default=60, help='games to generate (default=%(default)s)')
+    parser.add_argument('--max-steps', type=int, default=400, help='max steps of a generated game (default=%(default)s)')
+    args = parser.parse_args()
+
+    if args.generate:
+        corpus = generate_corpus(args.games, args.max_steps)
+        with open(args.corpus, 'w') as f:
+            json.dump(corpus, f, indent=0, sort_keys=True)
+        n_steps = sum(len(g['actions']) for g in corpus['games'])
+        n_scores = sum(g['outcomes'].count('s') for g in corpus['games'])
+        print 'Recorded {} games, {} steps, {} scores to {}'.format(len(corpus['games']), n_steps, n_scores, args.corpus)
+    else:
+        engine = load_engine(args.engine) if args.engine is not None else None
+        mismatches, steps_per_sec = replay(load_corpus(args.corpus), engine)
+        for seed, step, expected, outcome in mismatches:
+            print 'game {} step {}: expected {!r}, got {!r}'.format(seed, step, expected, outcome)
+        print '{} mismatching games, {:.0f} steps/s'.format(len(mismatches), steps_per_sec)
@@ -0,0 +1,83 @@
+# Decisions/sec and latency of many game clients playing with the policy server,
+# compared with the same number of processes each valuing the actions with its own copy of the model
+
+from __future__ import division
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from flappy_bird import flappy_bird_game
+from policy_server import policy_server, policy_client, load_model
+
+def _play(get_action, duration):
+    '''
+    Play games for duration seconds. Returns the decisions and their latencies
+    '''
+    latencies = []
+    game = flappy_bird_game()
+    end = time.time() + duration
+    while time.time() < end:
+        if game.is_game_over:
+            game = flappy_bird_game()
+        start = time.time()
+        action = get_action(game)
+        latencies.append(time.time() - start)
+        game.move(action)
+    return latencies
+
+def _remote_client(args):
+    address, duration = args
+    client = policy_client(address)
+    try:
+        return _play(client.get_action, duration)
+    finally:
+        client.close()
+
+def _local_client(args):
+    kind, duration = args
+    # loading its own copy of the model, as the play loops do
+    if kind == 'qtable':
+        from trainer import trainer
+        t = trainer()
+        def get_action(game):
+            actions = game.get_legal_actions()
+            values = [t.get_action_value(game, a, training=False) for a in actions]
+            return t.select_action_with_max_score(actions, values)[0]
+    else:
+        from feature_trainer import feature_trainer
+        ft = feature_trainer()
+        def get_action(game):
+            return ft.selection_action_with_max_value(game, game.get_legal_actions(), False)[0]
+    return _play(get_action, duration)
+
+def _report(name, results, duration):
+    latencies = sorted(l for r in results for l in r)
+    n = len(latencies)
+    print '{:>8s} {:10.0f} {:9.3f}ms {:9.3f}ms'.format(name, n / duration, 1000 * latencies[int(0.5 * (n - 1))],
+                                                       1000 * latencies[int(0.99 * (n - 1))])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Decisions/sec of game clients with the policy server and with local models')
+    parser.add_argument('--model', choices=['qtable', 'feature'], default='qtable')
+    parser.add_argument('--clients', type=int, default=8, help='client processes (default=%(default)s)')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds the clients play (default=%(default)s)')
+    parser.add_argument('--latency-budget-ms', type=float, default=1.0, help='(default=%(default)s)')
+    args = parser.parse_args()
+
+    address = os.path.join(tempfile.mkdtemp(), 'policy.sock')
+    server = policy_server(load_model(args.model), address, latency_budget=args.latency_budget_ms / 1000.0)
+    server.start()
+    pool = multiprocessing.Pool(args.clients)
+    remote = pool.map(_remote_client, [(address, args.duration)] * args.clients)
+    local = pool.map(_local_client, [(args.model, args.duration)] * args.clients)
+    pool.close()
+    pool.join()
+    stats = server.get_stats()
+    server.stop()
+
+    print '{:>8s} {:>10s} {:>11s} {:>11s}'.format('', 'decisions/s', 'p50', 'p99')
+    _report('server', remote, args.duration)
+    _report('local', local, args.duration)
+    print 'server: {requests} requests, {rows_per_batch:.1f} rows per batch, p50 {p50_ms:.3f}ms p99 {p99_ms:.3f}ms'.format(**stats)
@@ -0,0 +1,97 @@
+# Compare the wall-clock time to train a Q-table from scratch until the AI scores a target,
+# with one-step updates and with lambda-returns.
+# With --updates N, compare instead the time of the lambda-return updates of the trajectories of N sessions,
+# applied together by trainer.update_q_values_backwards or one step at a time by the loop it replaced
+
+from __future__ import division
+import argparse
+import random
+import time
+
+from trainer import trainer
+
+def time_to_target(trace_lambda, target, sessions_per_round, n_games, max_time, seed):
+    '''
+    Returns (training seconds, sessions) until all of n_games evaluation games reach the target score,
+    or (None, sessions) if that doesn't happen within max_time seconds of training
+    '''
+    random.seed(seed)
+    t = trainer(QTable_file=None, trace_lambda=trace_lambda)
+    training_time = 0.0
+    sessions = 0
+    while training_time < max_time:
+        start = time.time()
+        for _ in xrange(sessions_per_round):
+            t.train_one_session(False)
+        training_time += time.time() - start
+        sessions += sessions_per_round
+        
+        scores = t.evaluate(n_games, target)
+        print '  lambda={} sessions={} training {:.1f}s Q-table size {} scores {}'.format(trace_lambda, sessions, training_time, len(t.QTable), scores)
+        if min(scores) >= target:
+            return training_time, sessions
+    return None, sessions
+
+def loop_update(t, trajectory, terminal_reward):
+    '''
+    The update of the lambda-returns one step at a time from the end, which update_q_values_backwards replaced
+    '''
+    g = terminal_reward
+    for state, action, score in reversed(trajectory):
+        g = (1-t.trace_lambda) * score + t.trace_lambda * g
+        t.update_q_value(state, action, g)
+
+def time_updates(trace_lambda, n_sessions, seed):
+    '''
+    Returns the seconds to apply the updates of the trajectories of n_sessions training sessions to an empty
+    Q-table, with update_q_values_backwards and with loop_update
+    '''
+    random.seed(seed)
+    t = trainer(QTable_file=None, trace_lambda=trace_lambda)
+    sessions = []
+    update = t.update_q_values_backwards
+    def record(trajectory, terminal_reward):
+        sessions.append((list(trajectory), terminal_reward))
+        update(trajectory, terminal_reward)
+    t.update_q_values_backwards = record
+    for _ in xrange(n_sessions):
+        t.train_one_session(False)
+    
+    times = []
+    for apply_update in [trainer.update_q_values_backwards, loop_update]:
+        t = trainer(QTable_file=None, trace_lambda=trace_lambda)
+        start = time.time()
+        for trajectory, terminal_reward in sessions:
+            apply_update(t, trajectory, terminal_reward)
+        times.append(time.time() - start)
+    return times
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Time to train a Q-table scoring the target, by lambda')
+    parser.add_argument('--lambdas', type=float, nargs='+', default=[0.0, 0.8])
+    parser.add_argument('--target', type=int, default=500, help='score all the evaluation games must reach (default=%(default)s)')
+    parser.add_argument('--sessions', type=int, default=200, help='training sessions between evaluations (default=%(default)s)')
+    parser.add_argument('--games', type=int, default=3, help='evaluation games (default=%(default)s)')
+    parser.add_argument('--max-time', type=float, default=600, help='max training seconds per lambda (default=%(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--updates', type=int, default=None, metavar='N',
+                        help='compare the update times on the trajectories of N sessions instead')
+    args = parser.parse_args()
+    
+    if args.updates is not None:
+        print '{:>8s} {:>12s} {:>12s}'.format('lambda', 'together', 'step loop')
+        for trace_lambda in args.lambdas:
+            if trace_lambda > 0:
+                print '{:8.2f} {:11.2f}s {:11.2f}s'.format(trace_lambda, *time_updates(trace_lambda, args.updates, args.seed))
+        raise SystemExit
+    
+    results = []
+    for trace_lambda in args.lambdas:
+        results.append((trace_lambda,) + time_to_target(trace_lambda, args.target, args.sessions, args.games, args.max_time, args.seed))
+    
+    print '{:>8s} {:>12s} {:>10s}'.format('lambda', 'training', 'sessions')
+    for trace_lambda, training_time, sessions in results:
+        if training_time is None:
+            print '{:8.2f} {:>12s} {:10d}'.format(trace_lambda, 'not reached', sessions)
+        else:
+            print '{:8.2f} {:11.1f}s {:10d}'.format(trace_lambda, training_time, sessions)
@@ -0,0 +1,51 @@
+# Measure the startup time of the entry points, each imported in a fresh process,
+# and which of the heavy packages they load
+
+from __future__ import division
+import argparse
+import subprocess
+import sys
+import time
+
+heavy_packages = ['pygame', 'numpy', 'matplotlib']
+
+_probe = '''
+import sys, time
+t = time.time()
+import {module}
+t = time.time() - t
+print 'import_time', t
+print 'loaded', ' '.join(p for p in {packages} if p in sys.modules)
+'''
+
+def measure(module, repeat):
+    '''
+    Returns (median wall time of the process, median import time, heavy packages loaded)
+    '''
+    process_times = []
+    import_times = []
+    loaded = ''
+    for _ in xrange(repeat):
+        t = time.time()
+        out = subprocess.check_output([sys.executable, '-c', _probe.format(module=module, packages=heavy_packages)])
+        process_times.append(time.time() - t)
+        # anything other than the probe's lines is printed by the module
+        for line in out.split('\n'):
+            if line.startswith('import_time '):
+                import_times.append(float(line.split()[1]))
+            elif line.startswith('loaded'):
+                loaded = line[len('loaded'):].strip()
+    process_times.sort()
+    import_times.sort()
+    return process_times[repeat//2], import_times[repeat//2], loaded
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Startup time of the entry points')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='processes per module (default=%(default)s)')
+    parser.add_argument('modules', nargs='*', default=['flappy_bird', 'trainer', 'feature_trainer', 'policy_gradiants', 'graphic_display'])
+    args = parser.parse_args()
+    
+    print '{:20s} {:>10s} {:>10s}  {}'.format('module', 'process', 'import', 'heavy packages loaded')
+    for module in args.modules:
+        process_time, import_time, loaded = measure(module, args.repeat)
+        print '{:20s} {:9.1f}ms {:9.1f}ms  {}'.format(module, process_time*1000, import_time*1000, loaded)
@@ -0,0 +1,127 @@
+# Incremental checkpoints of the Q-table
+#
+# The snapshot is the whole table pickled as a plain dict, so it is the same file format as before.
+# Each save appends only the entries changed since the last save to a log next to it (<file>.log),
+# as one pickled (changed entries, removed keys) record. Loading replays the log on top of the snapshot,
+# dropping a record cut short by a crash. When the log grows as large as the snapshot, it is compacted
+# into a new snapshot.
+
+import os
+import pickle
+
+from log_setup import get_logger
+
+logger = get_logger('flappy_bird.checkpoint')
+
+class tracked_table(dict):
+    '''
+    A dict remembering the keys set or removed since the last checkpoint.
+    Only [] assignment, del and pop are tracked; use them to change the table
+    '''
+    __slots__ = ('dirty', 'removed')
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.dirty = set()
+        self.removed = set()
+
+    def __setitem__(self, key, value):
+        self.dirty.add(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.dirty.discard(key)
+        self.removed.add(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.dirty.discard(key)
+            self.removed.add(key)
+        return dict.pop(self, key, *default)
+
+    def __reduce__(self):
+        # pickled as a plain dict
+        return (dict, (dict(self),))
+
+class checkpointer(object):
+    '''
+    Saves and loads a tracked_table to the snapshot file and its log
+    '''
+    def __init__(self, filename, compact_ratio=1.0):
+        '''
+        compact_ratio: compact when the log is larger than this times the snapshot
+        '''
+        self.filename = filename
+        self.log_filename = filename + '.log'
+        self.compact_ratio = compact_ratio
+
+    def load(self):
+        '''
+        Returns the table of the snapshot with the log replayed, or an empty one if there is no snapshot
+        '''
+        table = tracked_table()
+        if os.path.isfile(self.filename):
+            with open(self.filename, 'rb') as f:
+                dict.update(table, pickle.load(f))
+        if os.path.isfile(self.log_filename):
+            n_records = 0
+            with open(self.log_filename, 'rb') as f:
+                end = 0
+                while True:
+                    try:
+                        changed, removed = pickle.load(f)
+                    except EOFError:
+                        break
+                    except (pickle.UnpicklingError, ValueError, IndexError, KeyError, AttributeError, TypeError):
+                        logger.warning('dropping the incomplete checkpoint record at byte %d of %s', end, self.log_filename)
+                        break
+                    dict.update(table, changed)
+                    for key in removed:
+                        dict.pop(table, key, None)
+                    end = f.tell()
+                    n_records += 1
+            # cut off what the crash left, so that the next records are appended after the good ones
+            if end < os.path.getsize(self.log_filename):
+                with open(self.log_filename, 'r+b') as f:
+                    f.truncate(end)
+            logger.info('replayed %d checkpoint records of %s', n_records, self.log_filename)
+        return table
+
+    def save(self, table):
+        '''
+        Append the changes of the table since the last save, compacting if the log is large.
+        Returns the number of entries written
+        '''
+        if not os.path.isfile(self.filename):
+            return self.compact(table)
+        if not table.dirty and not table.removed:
+            return 0
+        changed = dict((key, table[key]) for key in table.dirty)
+        with open(self.log_filename, 'ab') as f:
+            pickle.dump((changed, table.removed), f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        n_written = len(changed) + len(table.removed)
+        table.dirty = set()
+        table.removed = set()
+        if os.path.getsize(self.log_filename) > self.compact_ratio * os.path.getsize(self.filename):
+            self.compact(table)
+        return n_written
+
+    def compact(self, table):
+        '''
+        Write the whole table as the new snapshot and empty the log. Returns the number of entries written
+        '''
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            pickle.dump(dict(table), f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        # the log replayed on top of the new snapshot changes nothing, so a crash in between is harmless
+        os.rename(tmp_filename, self.filename)
+        if os.path.isfile(self.log_filename):
+            os.remove(self.log_filename)
+        table.dirty = set()
+        table.removed = set()
+        return len(table)
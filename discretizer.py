@@ -0,0 +1,180 @@
+# Discretizers map the continuous state of the bird (dx, dy, vy) to the states of the Q-table
+#
+# uniform_discretizer: fixed bins of equal size in each dimension
+# adaptive_discretizer: a k-d tree whose leaves are the states. Leaves with a high variance of TD errors
+#                       are split, so that the resolution is only high where it matters
+
+from __future__ import division
+import math
+import os
+import pickle
+import random
+import sys
+import time
+
+class uniform_discretizer:
+    '''
+    Evenly partition each dimension from its min, with the step size of the dimension.
+    The state is (state_x, state_y, state_vy)
+    '''
+    def __init__(self, mins, steps):
+        self.dx_min, self.dy_min, self.vy_min = mins
+        self.step_dx, self.step_dy, self.step_dvy = steps
+        
+    def get_state(self, dx, dy, vy):
+        return (math.floor((dx - self.dx_min)/self.step_dx),
+                math.floor((dy - self.dy_min)/self.step_dy),
+                math.floor((vy - self.vy_min)/self.step_dvy))
+    
+    def observe(self, state, td_error):
+        '''
+        Learn from the TD error of an update of the state. Returns the states replacing it, if it is split.
+        The bins are fixed
+        '''
+        return None
+    
+    def is_leaf(self, state):
+        return True
+    
+    def store(self, QTable_file):
+        pass
+    
+    def load(self, QTable_file):
+        pass
+    
+    def get_n_states(self):
+        return None
+    
+class adaptive_discretizer:
+    '''
+    A k-d tree over (dx, dy, vy), stored in flat lists indexed by the node id. The state is the id of a leaf.
+    The tree starts as a coarse grid. A leaf is split in half, along its widest dimension relative to the range,
+    once it has seen min_samples TD errors whose variance exceeds split_variance.
+    The Q-values of the children start as those of the leaf
+    '''
+    def __init__(self, mins, maxs, initial_depth=6, min_samples=100, split_variance=200.0, min_widths=(0.1, 0.1, 0.1), max_leaves=50000):
+        self.mins = tuple(mins)
+        self.ranges = tuple(hi - lo for lo, hi in zip(mins, maxs))
+        self.min_samples = min_samples
+        self.split_variance = split_variance
+        self.min_widths = min_widths
+        self.max_leaves = max_leaves
+        
+        # the nodes; a leaf has split_dim -1
+        self.split_dim = []
+        self.split_value = []
+        self.left = []
+        self.right = []
+        self.lows = []          # bounds of the nodes
+        self.highs = []
+        # count, mean and sum of squared differences of the TD errors of the leaves (Welford's algorithm)
+        self.count = []
+        self.mean = []
+        self.m2 = []
+        self.n_leaves = 0
+        
+        self._add_node(tuple(mins), tuple(maxs))
+        leaves = [0]
+        for depth in xrange(initial_depth):
+            leaves = [child for leaf in leaves for child in self._split(leaf, depth % 3)]
+
+    def _add_node(self, lows, highs):
+        self.split_dim.append(-1)
+        self.split_value.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.lows.append(lows)
+        self.highs.append(highs)
+        self.count.append(0)
+        self.mean.append(0.0)
+        self.m2.append(0.0)
+        self.n_leaves += 1
+        return len(self.split_dim) - 1
+    
+    def _split(self, node, dim):
+        lows, highs = self.lows[node], self.highs[node]
+        value = (lows[dim] + highs[dim]) / 2.0
+        self.split_dim[node] = dim
+        self.split_value[node] = value
+        self.left[node] = self._add_node(lows, highs[:dim] + (value,) + highs[dim+1:])
+        self.right[node] = self._add_node(lows[:dim] + (value,) + lows[dim+1:], highs)
+        self.n_leaves -= 1
+        return self.left[node], self.right[node]
+    
+    def get_state(self, dx, dy, vy):
+        point = (dx, dy, vy)
+        node = 0
+        split_dim = self.split_dim
+        while split_dim[node] >= 0:
+            if point[split_dim[node]] < self.split_value[node]:
+                node = self.left[node]
+            else:
+                node = self.right[node]
+        return node
+    
+    def observe(self, state, td_error):
+        '''
+        Learn from the TD error of an update of the state. Returns the states replacing it, if it is split
+        '''
+        if self.split_dim[state] >= 0:
+            return None         # already split, e.g. earlier in the same session
+        self.count[state] += 1
+        delta = td_error - self.mean[state]
+        self.mean[state] += delta / self.count[state]
+        self.m2[state] += delta * (td_error - self.mean[state])
+        
+        n = self.count[state]
+        if n < self.min_samples or self.m2[state] / (n - 1) <= self.split_variance or self.n_leaves >= self.max_leaves:
+            return None
+        lows, highs = self.lows[state], self.highs[state]
+        widths = [(highs[d] - lows[d]) / self.ranges[d] for d in xrange(3)]
+        dim = widths.index(max(widths))
+        if highs[dim] - lows[dim] < 2 * self.min_widths[dim]:
+            return None
+        return self._split(state, dim)
+    
+    def is_leaf(self, state):
+        '''
+        False once the state is split: it is not the state of any point anymore
+        '''
+        return self.split_dim[state] < 0
+    
+    def store(self, QTable_file):
+        with open(QTable_file + '.tree', 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+    
+    def load(self, QTable_file):
+        if os.path.isfile(QTable_file + '.tree'):
+            with open(QTable_file + '.tree', 'rb') as f:
+                self.__dict__.update(pickle.load(f).__dict__)
+            
+    def get_n_states(self):
+        return self.n_leaves
+
+def get_stats(discretizer, QTable, mins, maxs, n_lookups=10000, n_samples=1000, seed=0):
+    '''
+    Returns the size of the table and the cost of the lookups with the discretizer:
+    states, entries, approximate bytes of the table, and microseconds per get_state.
+    The bytes are extrapolated from n_samples entries. The samples and the lookup points are drawn with
+    a generator of the seed, so that the training's random numbers are left alone
+    '''
+    rng = random.Random(seed)
+    keys = QTable.keys()
+    samples = rng.sample(keys, min(n_samples, len(keys)))
+    sample_bytes = 0
+    for key in samples:
+        sample_bytes += sys.getsizeof(key) + sys.getsizeof(key[0]) + sys.getsizeof(QTable[key])
+        if isinstance(key[0], tuple):
+            sample_bytes += sum(sys.getsizeof(v) for v in key[0])
+    n_bytes = sys.getsizeof(QTable) + (sample_bytes * len(keys) / len(samples) if samples else 0)
+    
+    points = [tuple(rng.uniform(lo, hi) for lo, hi in zip(mins, maxs)) for _ in xrange(n_lookups)]
+    start = time.time()
+    for dx, dy, vy in points:
+        discretizer.get_state(dx, dy, vy)
+    lookup_us = (time.time() - start) / n_lookups * 1e6
+    
+    n_states = discretizer.get_n_states()
+    if n_states is None:
+        n_states = len(set(key[0] for key in keys))
+    return {'states': n_states, 'entries': len(QTable), 'bytes': n_bytes, 'lookup_us': lookup_us}
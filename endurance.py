@@ -0,0 +1,67 @@
+# !/usr/bin/python
+
+# Endurance runs: one game in the endurance mode of flappy_bird_game, played for as long as the agent lasts.
+# The steps/sec and the resident memory are reported periodically, which should stay flat
+
+from __future__ import division
+import argparse
+import os
+import random
+import resource
+import time
+
+from flappy_bird import flappy_bird_game
+from game_config import default_config
+
+def get_rss_mb():
+    '''
+    Returns the resident memory of the process in MB, or its peak if the current one isn't available
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (IOError, OSError, ValueError, IndexError):
+        # KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run(get_action, config=default_config, max_steps=None, report_interval=10.0, rng=random):
+    '''
+    Play an endurance game with get_action(game), until it is over or max_steps are played.
+    Returns the game, and prints a report every report_interval seconds
+    '''
+    game = flappy_bird_game(config=config, rng=rng, endurance=True)
+    start = time.time()
+    last_report = start
+    last_ticks = 0
+    while not game.is_game_over and (max_steps is None or game.ticks < max_steps):
+        game.move(get_action(game))
+        # checking the time only every 1000 steps
+        if game.ticks % 1000 == 0:
+            now = time.time()
+            if now - last_report >= report_interval:
+                print 'steps {}, score {}, {:.0f} steps/s, RSS {:.1f}MB'.format(
+                    game.ticks, game.score, (game.ticks - last_ticks) / (now - last_report), get_rss_mb())
+                last_report = now
+                last_ticks = game.ticks
+    elapsed = time.time() - start
+    print 'Finished: steps {}, score {}, game over {}, {:.0f} steps/s, RSS {:.1f}MB'.format(
+        game.ticks, game.score, game.is_game_over, game.ticks / max(elapsed, 1e-9), get_rss_mb())
+    return game
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Play one game for as long as the agent lasts')
+    parser.add_argument('--agent', choices=['feature', 'mlp'], default='feature')
+    parser.add_argument('--steps', type=float, default=None, help='stop after this many steps (default: never)')
+    parser.add_argument('--report-interval', type=float, default=10.0, help='(default=%(default)s)')
+    args = parser.parse_args()
+
+    if args.agent == 'feature':
+        from feature_trainer import feature_trainer
+        agent = feature_trainer()
+        get_action = lambda game: agent.selection_action_with_max_value(game, game.get_legal_actions(), False)[0]
+    else:
+        from mlp_trainer import mlp_trainer
+        agent = mlp_trainer()
+        get_action = agent.get_action
+    run(get_action, max_steps=None if args.steps is None else int(args.steps), report_interval=args.report_interval)
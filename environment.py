@@ -0,0 +1,159 @@
+# A gym-style environment of the game: reset(seed) and step(action) -> (observation, reward, done, info)
+#
+# Observation modes:
+#   'state':  the float vector (dx, dy, vy) of the bird to the next pillar, see trainer.get_distances
+#   'bins':   the state of a discretizer, fixed bins like the Q-table's by default
+#   'pixels': a (rows, columns) uint8 image of the view, drawn from the logical rects without pygame
+# The observations are written into a buffer allocated once, which is returned by every call.
+# Copy it to keep an observation past the next step.
+
+from __future__ import division
+import random
+
+import numpy as np
+
+from flappy_bird import flappy_bird_game
+from game_config import default_config
+from discretizer import uniform_discretizer
+from trainer import get_distances
+
+observation_modes = ('state', 'bins', 'pixels')
+
+# pixel values of the 'pixels' mode
+background_pixel = 0
+bird_pixel = 128
+pillar_pixel = 255
+
+class flappy_bird_env(object):
+    '''
+    One game at a time, stepped one decision at a time
+    '''
+    def __init__(self, config=default_config, observation='state', action_repeat=1, discretizer=None,
+                 pixel_shape=(50, 100), score_reward=1.0, death_reward=-1.0, step_reward=0.0, seed=None):
+        '''
+        observation: one of observation_modes
+        action_repeat: a step repeats the action this many moves, or until the game ends. The rewards are summed
+        discretizer: of the 'bins' mode, fixed bins of the trainer's sizes by default
+        pixel_shape: (rows, columns) of the 'pixels' mode
+        seed: of the pillars of the games reset without a seed
+        '''
+        if observation not in observation_modes:
+            raise ValueError('unknown observation mode: {}'.format(observation))
+        self.config = config
+        self.observation = observation
+        self.action_repeat = action_repeat
+        self.score_reward = score_reward
+        self.death_reward = death_reward
+        self.step_reward = step_reward
+        self.seed_rng = random.Random(seed)
+        self.game = None
+
+        if observation == 'bins':
+            if discretizer is None:
+                n_state_vy = 10
+                discretizer = uniform_discretizer((config.dx_min, config.dy_min, config.vy_min),
+                                                  (config.time_per_move * config.xspeed, config.bird_size,
+                                                   (config.vy_max - config.vy_min) / n_state_vy))
+            self.discretizer = discretizer
+            shape = np.atleast_1d(discretizer.get_state(config.dx_min, config.dy_min, config.vy_min)).shape
+            self.buffer = np.zeros(shape, dtype=np.int64)
+        elif observation == 'pixels':
+            self.buffer = np.zeros(pixel_shape, dtype=np.uint8)
+        else:
+            self.buffer = np.zeros(3, dtype=np.float64)
+
+    def reset(self, seed=None):
+        '''
+        Start a new game, with the pillars of the seed if given. Returns the observation
+        '''
+        if seed is None:
+            seed = self.seed_rng.getrandbits(32)
+        self.game = flappy_bird_game(config=self.config, rng=random.Random(seed))
+        return self._observe()
+
+    def step(self, action):
+        '''
+        Take the action (True or 1 to jump). Returns (observation, reward, done, info)
+        '''
+        game = self.game
+        jump = bool(action)
+        reward = 0.0
+        moves = 0
+        while moves < self.action_repeat and not game.is_game_over:
+            game.move(jump)
+            moves += 1
+            if game.is_game_over:
+                reward += self.death_reward
+            elif game.just_scored:
+                reward += self.score_reward
+            else:
+                reward += self.step_reward
+        return self._observe(), reward, game.is_game_over, {'score': game.score, 'moves': moves}
+
+    def _observe(self):
+        buf = self.buffer
+        if self.observation == 'state':
+            buf[0], buf[1], buf[2] = get_distances(self.game, training=False)
+        elif self.observation == 'bins':
+            buf[:] = self.discretizer.get_state(*get_distances(self.game, training=False))
+        else:
+            self.draw(buf)
+        return buf
+
+    def draw(self, buf):
+        '''
+        Draw the view [game.x, game.x + dx_loaded] x [0, height] into the image, the top row being the top
+        '''
+        game = self.game
+        rows, columns = buf.shape
+        sx = columns / game.dx_loaded
+        sy = rows / game.height
+        buf.fill(background_pixel)
+        for p in game.pillars:
+            c0 = max(int((p.x - game.x) * sx), 0)
+            c1 = min(int((p.x + p.width - game.x) * sx), columns)
+            if c1 > c0:
+                buf[rows - int(p.gap_y_min * sy):, c0:c1] = pillar_pixel
+                buf[:rows - int(p.gap_y_max * sy), c0:c1] = pillar_pixel
+        bird = game.bird
+        c0 = max(int((bird.x - game.x) * sx), 0)
+        c1 = min(int((bird.x + bird.size - game.x) * sx) + 1, columns)
+        r0 = max(rows - int((bird.y + bird.size) * sy) - 1, 0)
+        r1 = min(rows - int(bird.y * sy), rows)
+        buf[r0:r1, c0:c1] = bird_pixel
+
+class flappy_bird_vector_env(object):
+    '''
+    n environments stepped together, with their observations in one (n, ...) buffer.
+    An environment whose game ends is reset right away; its done flag of that step is set
+    '''
+    def __init__(self, n, seed=None, **kwargs):
+        '''
+        kwargs: those of flappy_bird_env
+        '''
+        seed_rng = random.Random(seed)
+        self.envs = [flappy_bird_env(seed=seed_rng.getrandbits(32), **kwargs) for _ in xrange(n)]
+        self.buffer = np.zeros((n,) + self.envs[0].buffer.shape, dtype=self.envs[0].buffer.dtype)
+        self.rewards = np.zeros(n)
+        self.dones = np.zeros(n, dtype=bool)
+
+    def reset(self, seed=None):
+        '''
+        Start new games, seeded seed, seed+1, ... if seed is given. Returns the observations
+        '''
+        for i, env in enumerate(self.envs):
+            self.buffer[i] = env.reset(None if seed is None else seed + i)
+        return self.buffer
+
+    def step(self, actions):
+        '''
+        Take an action in each environment. Returns (observations, rewards, dones, infos)
+        '''
+        infos = []
+        for i, env in enumerate(self.envs):
+            obs, self.rewards[i], self.dones[i], info = env.step(actions[i])
+            if self.dones[i]:
+                obs = env.reset()
+            self.buffer[i] = obs
+            infos.append(info)
+        return self.buffer, self.rewards, self.dones, infos
@@ -0,0 +1,189 @@
+# !/usr/bin/python
+
+# Optimize the weights of the features with evolution strategies, instead of the gradient steps at deaths
+# of feature_trainer.update_weights.
+#
+# Each generation samples a population of weight vectors around the current one (in antithetic pairs),
+# scores every candidate by its mean survival in the same seeded headless games (common random numbers,
+# so the candidates are compared on equal terms), and moves the weights along the rank-weighted noise.
+# The candidates are evaluated over a process pool. The best candidate's fitness is lucky noise as much as
+# skill, so at the end it is scored again against the current weights on fresh games, and the better one kept.
+
+from __future__ import division
+import argparse
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from flappy_bird import flappy_bird_game
+from game_config import default_config
+from feature_trainer import feature_trainer, get_feature_values, select_action_with_max_value, read_weights, write_weights
+
+def _gap_features(game):
+    return get_feature_values(game, 0.2)
+
+def _gap_speed_features(game):
+    dy, dy_gap, dy_gap_in_gap = get_feature_values(game, 0.2)
+    # how fast the bird moves away from the baseline of the gap
+    vy = game.bird.yspeed
+    return dy, dy_gap, dy_gap_in_gap, abs(vy) if dy_gap > 0 or dy_gap_in_gap > 0 else 0.0
+
+# the feature sets: name -> function(game) returning the tuple of the feature values.
+# 'gap' is feature_trainer's, whose weights can be written to its weight file
+feature_sets = {
+    'gap': _gap_features,
+    'gap_speed': _gap_speed_features,
+}
+
+def get_value_function(weights, features):
+    '''
+    Returns the function of the game giving the weighted sum of the feature values
+    '''
+    def get_value(game):
+        value = 0.0
+        for w, f in zip(weights, features(game)):
+            value += w * f
+        return value
+    return get_value
+
+def survival(weights, feature_set, seed, max_steps, config=default_config):
+    '''
+    Returns the moves the bird survives, up to max_steps, in the game of the seed.
+    The seed gives the pillars, the start height and the choices between actions of the same value
+    '''
+    rng = random.Random(seed)
+    game = flappy_bird_game(config=config, rng=rng)
+    game.bird.y = rng.uniform(1.0, config.height - 1.0)
+    # the ties are broken by their own generator, so that they don't change the pillars
+    tie_rng = random.Random(rng.getrandbits(32))
+    get_value = get_value_function(weights, feature_sets[feature_set])
+    steps = 0
+    while not game.is_game_over and steps < max_steps:
+        game.move(select_action_with_max_value(game, game.get_legal_actions(), get_value, tie_rng)[0])
+        steps += 1
+    return steps
+
+def evaluate(args):
+    '''
+    Returns the mean survival of the weights over the games of the seeds
+    '''
+    weights, feature_set, seeds, max_steps = args
+    return sum(survival(weights, feature_set, seed, max_steps) for seed in seeds) / len(seeds)
+
+def get_rank_weights(fitness):
+    '''
+    Returns the centered ranks of the fitness, in [-0.5, 0.5], so that the update doesn't depend on its scale
+    '''
+    ranks = np.empty(len(fitness))
+    ranks[np.argsort(fitness)] = np.arange(len(fitness))
+    return ranks / (len(fitness) - 1) - 0.5
+
+class es_optimizer(object):
+    '''
+    Evolution strategies over the weights of a feature set
+    '''
+    def __init__(self, weights, feature_set='gap', population=16, sigma=0.5, learning_rate=4.0,
+                 n_games=8, max_steps=500, seed=0, pool=None):
+        '''
+        weights: the initial weights, one per feature of the set
+        population: candidates per generation, in antithetic pairs
+        sigma: standard deviation of the noise, relative to the norm of the weights
+        n_games: seeded games each candidate is scored on, the same for all candidates of a generation
+        pool: a multiprocessing pool evaluating the candidates, or None to evaluate them in this process
+        '''
+        self.theta = np.array(weights, dtype=np.float64)
+        self.feature_set = feature_set
+        self.population = population + population % 2
+        self.sigma = sigma
+        self.learning_rate = learning_rate
+        self.n_games = n_games
+        self.max_steps = max_steps
+        self.rng = np.random.RandomState(seed)
+        self.pool = pool
+        self.best_weights = self.theta.copy()
+        self.best_fitness = None
+        self.generation = 0
+
+    def _map(self, jobs):
+        if self.pool is None:
+            return map(evaluate, jobs)
+        return self.pool.map(evaluate, jobs)
+
+    def _get_seeds(self):
+        return [int(s) for s in self.rng.randint(0, 2 ** 31 - 1, self.n_games)]
+
+    def step(self):
+        '''
+        Run one generation. Returns the fitness of the current weights, and the mean of the candidates
+        '''
+        seeds = self._get_seeds()
+        scale = self.sigma * max(np.linalg.norm(self.theta), 1.0)
+        half = self.rng.randn(self.population // 2, len(self.theta))
+        noise = np.concatenate([half, -half])
+        candidates = [self.theta + scale * eps for eps in noise]
+        jobs = [(list(c), self.feature_set, seeds, self.max_steps) for c in [self.theta] + candidates]
+        results = self._map(jobs)
+        fitness = np.array(results[1:])
+
+        # keep the best weights scored so far, each on the games of its generation
+        current_fitness = results[0]
+        for weights, f in [(self.theta, current_fitness)] + zip(candidates, fitness):
+            if self.best_fitness is None or f > self.best_fitness:
+                self.best_fitness = f
+                self.best_weights = weights.copy()
+
+        self.theta = self.theta + self.learning_rate * scale * get_rank_weights(fitness).dot(noise) / len(noise)
+        self.generation += 1
+        return current_fitness, fitness.mean()
+
+    def select_best(self):
+        '''
+        Score the current weights and the best weights scored so far on fresh games.
+        Returns the better ones and their fitness on those games
+        '''
+        seeds = self._get_seeds()
+        candidates = [self.theta, self.best_weights]
+        results = self._map([(list(c), self.feature_set, seeds, self.max_steps) for c in candidates])
+        best = int(np.argmax(results))
+        return candidates[best].copy(), results[best]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Optimize the feature weights with evolution strategies')
+    parser.add_argument('--features', choices=sorted(feature_sets), default='gap',
+                        help='the feature set. Only gap is feature_trainer\'s (default=%(default)s)')
+    parser.add_argument('--init', choices=['ones', 'file'], default='ones',
+                        help='start from ones as feature_trainer does, or the weights of --out (default=%(default)s)')
+    parser.add_argument('--generations', type=int, default=30, help='(default=%(default)s)')
+    parser.add_argument('--population', type=int, default=16, help='(default=%(default)s)')
+    parser.add_argument('--learning-rate', type=float, default=4.0, help='(default=%(default)s)')
+    parser.add_argument('--games', type=int, default=8, help='games per candidate (default=%(default)s)')
+    parser.add_argument('--max-steps', type=int, default=500, help='moves a game is played at most (default=%(default)s)')
+    parser.add_argument('--processes', type=int, default=None, help='(default: the number of CPUs)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='file of the best weights (default: %s for the gap features)' % feature_trainer.weight_file)
+    args = parser.parse_args()
+
+    n_features = len(feature_sets[args.features](flappy_bird_game()))
+    out = args.out
+    if out is None:
+        out = feature_trainer.weight_file if args.features == 'gap' else 'data/feature_weights_' + args.features
+    if args.init == 'file' and os.path.isfile(out):
+        weights = read_weights(out, n_features)
+    else:
+        weights = [1.0] * n_features
+
+    pool = multiprocessing.Pool(args.processes)
+    es = es_optimizer(weights, args.features, args.population, learning_rate=args.learning_rate, n_games=args.games, max_steps=args.max_steps,
+                      seed=args.seed, pool=pool)
+    for _ in xrange(args.generations):
+        current, mean = es.step()
+        print 'generation {}: survival {:.1f}, candidates {:.1f}, best {:.1f}, weights {}'.format(
+            es.generation, current, mean, es.best_fitness, ', '.join('{:.3f}'.format(w) for w in es.theta))
+    weights, fitness = es.select_best()
+    pool.close()
+    pool.join()
+
+    write_weights(out, weights)
+    print 'Stored the best weights ({:.1f} moves survived in fresh games) to {}'.format(fitness, out)
@@ -3,18 +3,97 @@
 # Train the AI player with features, or approximate Q-table
 
 from __future__ import division
-from flappy_bird import flappy_bird_game, bird
-from graphic_display import graphic_display
+from flappy_bird import flappy_bird_game
+from game_config import default_config
 from null_display import null_display
+from planner import lookahead_planner
+from start_sampler import uniform_start_sampler
+from metrics import null_metrics
 import random
-import logging.config
+import logging
+from log_setup import get_logger
 import math
 import pickle
 import os
 import time
 
-logging.config.fileConfig('logging.conf')
-logger = logging.getLogger('flappy_bird.feature_trainer')
+logger = get_logger('flappy_bird.feature_trainer')
+
+def get_feature_values(game, gap_baseline):
+    '''
+    returns values of each feature of the game if activated, if not activated 0.
+    gap_baseline: where the baseline of the gap is, as a fraction of the gap from its bottom
+    '''
+    bird = game.bird
+    
+    # find the target pillar
+    for i in xrange(len(game.pillars)):
+        p = game.pillars[i]
+        p_x_min, p_x_max = p.get_x_range()
+        if p_x_max > game.bird.x:
+            pillar = game.pillars[i]
+            break
+    
+    gap_y_min, gap_y_max = pillar.get_gap_y_range()
+    #gap_y_center = (gap_y_min + gap_y_max) / 2.0
+    gap_y_center = (1 - gap_baseline) * gap_y_min + gap_baseline * gap_y_max    # aim toward the bottom of the gap
+
+    bird_y = game.bird.y
+    
+    if bird.x < p_x_min:
+        # not in the gap
+        y_center = game.height/2.0
+        dy = abs(bird_y - y_center)
+        dy_gap = abs(bird_y - gap_y_center)
+        dy_gap_in_gap = 0.0     # not activated
+    else:
+        # in the gap
+        dy = 0.0                # not activated
+        dy_gap = 0.0            # not activated
+        dy_gap_in_gap = abs(bird_y - gap_y_center)
+    return dy, dy_gap, dy_gap_in_gap
+
+def select_action_with_max_value(game, actions, get_value, rng=random):
+    '''
+    returns the action whose next game has the max value by get_value(game), and the values of all actions.
+    if multiple actions has the same value, randomly choose one with rng
+    '''
+    if len(actions) == 0:
+        raise Exception('Actions can not be empty')
+    
+    values = []
+    
+    max_value = None
+    actions_with_max_value = []
+    
+    for a in actions:
+        copied_game = game.clone_game()
+        copied_game.move(a)
+        value = get_value(copied_game)
+        values.append(value)
+        if max_value is None:
+            max_value = value
+            actions_with_max_value = [a]
+        elif value == max_value:
+            actions_with_max_value.append(a)
+        elif value > max_value:
+            max_value = value
+            actions_with_max_value = [a]
+    
+    action = rng.choice(actions_with_max_value)
+    return action, values
+
+def read_weights(filename, n_weights=3):
+    '''
+    returns the weights of the weight file, each pickled in turn
+    '''
+    with open(filename, 'rb') as f:
+        return [pickle.load(f) for _ in xrange(n_weights)]
+
+def write_weights(filename, weights):
+    with open(filename, 'wb') as f:
+        for w in weights:
+            pickle.dump(float(w), f)
 
 class feature_trainer:
     '''
@@ -25,22 +104,30 @@ class feature_trainer:
       * distance to the baseline of the gap when the bird is in the gap (not sure this is necessary, but keep it anyway)
     '''
     weight_file = 'data/feature_weights'
-    def __init__(self):
+    def __init__(self, config=default_config):
+        '''
+        config: the game_config of the games played and trained
+        '''
+        self.config = config
         self.alpha = 0.1    # learning rate
+        self.gap_baseline = 0.2 # where the baseline of the gap is, as a fraction of the gap from its bottom
+        self.display = None
         self.load_weights()
         
         # compute some parameters for convenience later
-        self.vy_max = bird.yspeed_after_jump
-        # time to fall from the top to bottom
-        t_fall = math.sqrt(2 * flappy_bird_game.height / math.fabs(bird.yaccelation))
-        self.vy_min = t_fall * bird.yaccelation
+        self.vy_max = config.vy_max
+        # speed after falling from the top to bottom
+        self.vy_min = config.vy_fall_height
+        
+        # where the training sessions start, and the pillars they are played with (None for the game's)
+        self.start_sampler = uniform_start_sampler(self.vy_min, self.vy_max, config.yspeed_after_jump, config.height)
+        self.curriculum = None
+        # the training metrics, see metrics.metrics_sink
+        self.metrics = null_metrics()
             
     def load_weights(self):
         if os.path.isfile(feature_trainer.weight_file):
-            with open(feature_trainer.weight_file) as f:
-                self.w_dy_to_center = pickle.load(f)
-                self.w_dy_to_gap_baseline = pickle.load(f)
-                self.w_dy_to_gap_baseline_in_gap = pickle.load(f)
+            self.w_dy_to_center, self.w_dy_to_gap_baseline, self.w_dy_to_gap_baseline_in_gap = read_weights(feature_trainer.weight_file)
             print 'Loaded weights'
             self.show_weights()
         else:
@@ -50,39 +137,46 @@ class feature_trainer:
             self.w_dy_to_gap_baseline_in_gap = 1.0
 
     def store_weights(self):
-        with open(feature_trainer.weight_file, 'wb') as f:
-            pickle.dump(self.w_dy_to_center, f)
-            pickle.dump(self.w_dy_to_gap_baseline, f)
-            pickle.dump(self.w_dy_to_gap_baseline_in_gap, f)
+        write_weights(feature_trainer.weight_file, [self.w_dy_to_center, self.w_dy_to_gap_baseline, self.w_dy_to_gap_baseline_in_gap])
     
     def show_weights(self):
         print 'weight for dy_to_center:            ', self.w_dy_to_center
         print 'weight for dy_to_gap_baseline:        ', self.w_dy_to_gap_baseline
         print 'weight for dy_to_gap_baseline_in_gap: ', self.w_dy_to_gap_baseline_in_gap
     
+    def get_graphic_display(self, game):
+        '''
+        Returns the graphic display showing the game. The display is created once and re-bound to later games
+        '''
+        if self.display is None:
+            # import on demand, so that the headless modes don't load pygame
+            from graphic_display import graphic_display
+            self.display = graphic_display(game)
+        else:
+            self.display.bind(game)
+        return self.display
+    
     def train_one_session(self, user_interactive = True):
         '''
         Run one interactive training session
         '''
-        game = flappy_bird_game()
+        config = self.config
+        if self.curriculum is not None:
+            config = self.curriculum.get_config(config)
+        game = flappy_bird_game(config=config)
         bird = game.bird
         bird.x = 2.0
-        r = random.random()
-        bird.y = r * flappy_bird_game.height
-        dice = random.random()
-        if dice < 0.2:
-            bird.yspeed = 1.5       # 20% for the bird just jumped
-        else:
-            r = random.random()
-            bird.yspeed = r * (self.vy_max - self.vy_min) + self.vy_min
+        bird.y, bird.yspeed = self.start_sampler.sample()
+        start = (bird.y, bird.yspeed)
 
         if user_interactive:
-            display = graphic_display(game)
+            display = self.get_graphic_display(game)
         else:
             display = null_display(game)
         
         game_over = game.is_game_over
         just_scored = game.just_scored
+        steps = 0
 
         while not game_over and not just_scored:
             actions = game.get_legal_actions()
@@ -100,12 +194,22 @@ class feature_trainer:
                     print 'choose action: ', self.get_action_text(action)
             
             game.move(action)
+            steps += 1
             
             game_over = game.is_game_over
             just_scored = game.just_scored
 
             if game_over or just_scored:
-                self.update_weights(game, user_interactive)
+                diff = self.update_weights(game, user_interactive)
+                if diff is not None:
+                    self.start_sampler.record(start, abs(diff))
+                    self.metrics.observe('td_error', abs(diff))
+                if self.curriculum is not None:
+                    self.curriculum.record(just_scored)
+                self.metrics.count('sessions')
+                self.metrics.count('steps', steps)
+                self.metrics.observe('episode_length', steps)
+                self.metrics.observe('score', 1 if just_scored else 0)
             
             display.update_display()
             
@@ -117,34 +221,10 @@ class feature_trainer:
         returns the action that resules in the max value, and all values.
         if multiple actions has the same value, randomly choose one
         '''
-        if len(actions) == 0:
-            raise Exception('Actions can not be empty')
-        
-        values = []
-        
-        max_value = None
-        actions_with_max_value = []
-        
-        for a in actions:
-            copied_game = game.clone_game()
-            copied_game.move(a)
-            value = self.get_value(copied_game)
-            values.append(value)
-            if max_value is None:
-                max_value = value
-                actions_with_max_value = [a]
-            elif value == max_value:
-                actions_with_max_value.append(a)
-            elif value > max_value:
-                max_value = value
-                actions_with_max_value = [a]
-            else:
-                pass
-            
-            if user_interactive:
+        action, values = select_action_with_max_value(game, actions, self.get_value)
+        if user_interactive:
+            for a, value in zip(actions, values):
                 print 'action {} has value {:.2f}'.format(self.get_action_text(a), value)
-            
-        action = random.choice(actions_with_max_value)
         return action, values
     
     def get_value(self, game):
@@ -157,6 +237,7 @@ class feature_trainer:
     def update_weights(self, game, user_interactive):
         '''
         update the weights based on the rewards
+        Returns the difference of the reward and the expected value, or None if not updated
         '''
         if game.is_game_over:
             score = -100.0
@@ -183,6 +264,7 @@ class feature_trainer:
         self.w_dy_to_center = w_dy
         self.w_dy_to_gap_baseline = w_dy_gap
         self.w_dy_to_gap_baseline_in_gap = w_dy_gap_in_gap
+        return diff
         
         
     def get_feature_values(self, game, user_interactive):
@@ -190,33 +272,7 @@ class feature_trainer:
         returns values of each feature if activated.
         if not activated, returns 0
         '''
-        bird = game.bird
-        
-        # find the target pillar
-        for i in xrange(len(game.pillars)):
-            p = game.pillars[i]
-            p_x_min, p_x_max = p.get_x_range()
-            if p_x_max > game.bird.x:
-                pillar = game.pillars[i]
-                break
-        
-        gap_y_min, gap_y_max = pillar.get_gap_y_range()
-        #gap_y_center = (gap_y_min + gap_y_max) / 2.0
-        gap_y_center = 0.8 * gap_y_min + 0.2 * gap_y_max    # aim toward the bottom of the gap
-
-        bird_y = game.bird.y
-        
-        if bird.x < p_x_min:
-            # not in the gap
-            y_center = game.height/2.0
-            dy = abs(bird_y - y_center)
-            dy_gap = abs(bird_y - gap_y_center)
-            dy_gap_in_gap = 0.0     # not activated
-        else:
-            # in the gap
-            dy = 0.0                # not activated
-            dy_gap = 0.0            # not activated
-            dy_gap_in_gap = abs(bird_y - gap_y_center)
+        dy, dy_gap, dy_gap_in_gap = get_feature_values(game, self.gap_baseline)
             
         if user_interactive:
             print 'feature values...'
@@ -226,23 +282,45 @@ class feature_trainer:
         
         return dy, dy_gap, dy_gap_in_gap
     
-    def play(self, delay_in_not_silent_mode=0.15, silent_mode=False ):
+    def evaluate(self, n_games=10, max_score=500):
         '''
-        play the game based on learned weights
+        Play n games silently with the learned weights, and returns their scores. A game stops at max_score
         '''
-        game = flappy_bird_game()
+        scores = []
+        for _ in xrange(n_games):
+            game = flappy_bird_game(config=self.config)
+            while not game.is_game_over and game.score < max_score:
+                actions = game.get_legal_actions()
+                action, _ = self.selection_action_with_max_value(game, actions, False)
+                game.move(action)
+            scores.append(game.score)
+            self.metrics.observe('eval_score', game.score)
+        return scores
+    
+    def play(self, delay_in_not_silent_mode=0.15, silent_mode=False, fast_forward=False, policy=None):
+        '''
+        play the game based on learned weights, or the policy (e.g. a lookahead_planner) if given
+        In fast forward mode, the game is not slowed down, and only every Nth step is shown
+        '''
+        game = flappy_bird_game(config=self.config)
         
         if silent_mode:
             display = null_display(game, 1000)
+        elif fast_forward:
+            from graphic_display import fast_forward_display
+            display = fast_forward_display(self.get_graphic_display(game))
         else:
-            display = graphic_display(game)
+            display = self.get_graphic_display(game)
             
         while not game.is_game_over:
-            actions = game.get_legal_actions()
-            action, _ = self.selection_action_with_max_value(game, actions, False)
+            if policy is None:
+                actions = game.get_legal_actions()
+                action, _ = self.selection_action_with_max_value(game, actions, False)
+            else:
+                action = policy.get_action(game)
             game.move(action)
             
-            if not silent_mode:
+            if not silent_mode and not fast_forward:
                 time.sleep(delay_in_not_silent_mode)
             display.update_display()
 
@@ -252,6 +330,11 @@ class feature_trainer:
         print ' p: play the game with learned weights'
         print ' pf: play the game for human viewing but running faster'
         print ' ps: play the game in silent mode, without delays for human to view'
+        print ' pff: play the game fast forward, showing only every Nth step'
+        print ' pe: play one endurance game silently, for as long as the AI lasts, reporting steps/sec and memory'
+        print ' pr: play the game with the values of the policy server (see policy_server.py)'
+        print ' pl: play the game with the lookahead planner, valuing its leaves with the learned weights'
+        print ' lv: train silently in a worker process, showing the current weights playing live until the window is closed'
         print ' w: show the weights'
         print ' s: store the weights'
         print ' <Return>: one interactive training session'
@@ -276,6 +359,24 @@ class feature_trainer:
                 self.play(delay_in_not_silent_mode=0.005)
             elif user_input == 'ps':
                 self.play(silent_mode=True)
+            elif user_input == 'pff':
+                self.play(fast_forward=True)
+            elif user_input == 'pl':
+                self.play(policy=lookahead_planner(max_depth=6, leaf_value=self.get_value))
+            elif user_input == 'pe':
+                import endurance
+                endurance.run(lambda game: self.selection_action_with_max_value(game, game.get_legal_actions(), False)[0], self.config)
+            elif user_input == 'pr':
+                # import on demand, so that the other modes don't load numpy
+                from policy_server import policy_client
+                client = policy_client()
+                try:
+                    self.play(policy=client)
+                finally:
+                    client.close()
+            elif user_input == 'lv':
+                import live_training
+                live_training.run(self, live_training.weights_sync())
             user_input = self._prompt()
             
     def get_action_text(self, action):
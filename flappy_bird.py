@@ -1,54 +1,59 @@
 #!/usr/bin/python
 from __future__ import division
 import argparse
+import copy
+from game_config import game_config, default_config
+import physics
 import random
-from graphic_display import graphic_display
 import time
 
-import logging.config
+import logging
+from log_setup import get_logger
 
-logging.config.fileConfig('logging.conf')
-logger = logging.getLogger('flappy_bird.game')
+logger = get_logger('flappy_bird.game')
 
 
-class bird:
+class bird(object):
     '''
     Represent the bird
     '''
-    # Some constant parameters
-    xspeed = 1
-    yaccelation = -2        # accelaration in y-direction
-    yspeed_after_jump = 1.5   # everytime the bird jumps, vy is set to this value
+    __slots__ = ('size', 'x', 'y', 'yspeed', 'config')
+    
+    # Some constant parameters, of the default config. The bird moves with those of its config
+    xspeed = default_config.xspeed
+    yaccelation = default_config.yaccelation        # accelaration in y-direction
+    yspeed_after_jump = default_config.yspeed_after_jump   # everytime the bird jumps, vy is set to this value
     #yspeed_inc_per_jump = 1
     
-    def __init__(self, size, x, y):
+    def __init__(self, size, x, y, config=default_config):
         self.size = size
         self.x = x
         self.y = y
         self.yspeed = 0
+        self.config = config
 
     def clone(self):
         '''
         clone a bird
         '''
-        bird_copy = bird(self.size, self.x, self.y)
+        bird_copy = bird(self.size, self.x, self.y, self.config)
         bird_copy.yspeed = self.yspeed
         return bird_copy
         
-    def move(self, dt, jumped=False):
+    def move(self, dt, jumped=False, substeps=1):
         '''
         Move the bird with the current speeds of x and y
         '''
-        self.x += bird.xspeed * dt
-        y_old_speed = self.yspeed
-        self.yspeed += bird.yaccelation * dt
-        if jumped:
-            logger.debug('bird jumped')
-            #self.yspeed += self.yspeed_inc_per_jump
-            self.yspeed = bird.yspeed_after_jump
-        self.y += (y_old_speed + self.yspeed) / 2.0 * dt
+        config = self.config
+        self.x += config.xspeed * dt
+        self.y, self.yspeed = physics.step(self.y, self.yspeed, dt, config.yaccelation, jumped, config.yspeed_after_jump, substeps)
 
-        logger.debug('bird vy={}, y={}'.format(self.yspeed, self.y))
+    def advance(self, dt, k):
+        '''
+        Move the bird k times without jumping, in O(1)
+        '''
+        self.x += self.config.xspeed * dt * k
+        self.y, self.yspeed = physics.advance(self.y, self.yspeed, dt, k, self.config.yaccelation)
 
     def get_rect(self):
         '''
@@ -56,32 +61,53 @@ class bird:
         '''
         return ((self.x, self.y), (self.x+self.size, self.y+self.size))
     
-class pillar:
+class pillar(object):
     '''
     Represent a pillar
     Each pillar has two pieces: the top and the bottom. The gap in between is for the bird to fly through
     For display, pillars may be added with trims, but they are not included in the collission computation.
+    
+    Only the x and the vertical range of the gap are stored. Many are created in a long game,
+    so they don't have a __dict__. The rects of the two pieces are computed when asked for
     '''
+    __slots__ = ('pid', 'x', 'width', 'height', 'gap_y_min', 'gap_y_max')
+    
     def __init__(self, pid, x, top_length, bottom_length, width, height):
         self.pid = pid
         self.x = x
-        self.bottom_rect = ((x, 0), (x+width, bottom_length))        # (bottom_left point, top_righ_point)
-        self.top_rect = ((x, height-top_length), (x+width, height))  # (bottom_left point, top_righ_point)
         self.width = width
+        self.height = height
+        self.gap_y_min = bottom_length
+        self.gap_y_max = height-top_length
+
+    @property
+    def bottom_rect(self):
+        return ((self.x, 0), (self.x+self.width, self.gap_y_min))          # (bottom_left point, top_righ_point)
+    
+    @property
+    def top_rect(self):
+        return ((self.x, self.gap_y_max), (self.x+self.width, self.height))  # (bottom_left point, top_righ_point)
 
     def get_x_range(self):
         return self.x, self.x+self.width
     
+    def moved_to(self, x):
+        '''
+        Returns a copy of the pillar at x
+        '''
+        p = pillar.__new__(pillar)
+        p.pid, p.x, p.width, p.height = self.pid, x, self.width, self.height
+        p.gap_y_min, p.gap_y_max = self.gap_y_min, self.gap_y_max
+        return p
+    
     def get_gap_y_range(self):
         '''
         returns the vertical range of the gap: y_min, y_max
         '''
-        y_min = self.bottom_rect[1][1]
-        y_max = self.top_rect[0][1]
-        return y_min, y_max
+        return self.gap_y_min, self.gap_y_max
     
     def __str__(self):
-        return 'pillar {} (x={:.2f}, gap {:.2f})'.format(self.pid, self.x, self.bottom_rect[1][1])
+        return 'pillar {} (x={:.2f}, gap {:.2f})'.format(self.pid, self.x, self.gap_y_min)
     
     def collide_with(self, rect):
         '''
@@ -125,6 +151,16 @@ class collission_detector:
         if rect[0][1] < rect[1][1]:
             return rect[0][1], rect[1][1]
         return rect[1][1], rect[0][1]
+
+def pillars_collide(pillars, rect):
+    '''
+    The collision engine of the game: whether the rectangle collides with any of the pillars.
+    Another engine must give the same results, see benchmarks/collisions.py
+    '''
+    for p in pillars:
+        if p.collide_with(rect):
+            return True
+    return False
         
 class flappy_bird_game:
     '''
@@ -133,32 +169,62 @@ class flappy_bird_game:
     The game has a logical coordinate system. At start, x=0. As the game proceeds, x increases with 
     a constant speed of 1 distance unit/1 time unit.
     
+    The parameters are those of the config given to the game. See game_config
     '''
     
-    # Constant parameters
-    time_per_move = 0.2        # every consecutive moves are this time units apart
-    height = 5.0
+    # Constant parameters, of the default config. A game with another config has them as instance attributes
+    time_per_move = default_config.time_per_move
+    substeps = default_config.substeps
+    height = default_config.height
     
     # parameters for the pillars
-    pillar_width = 1.0
-    pillar_x_interval = 4.0        # How far between consecutive pillars
-    pillar_gap = 2.0               # Gap between two parts of a pillar that can go through
-    pillar_piece_min_length = 0.6  # Each piece of a pillar is at least this long
-    pillar_x0 = 5.0                # First pillar's x
+    pillar_width = default_config.pillar_width
+    pillar_x_interval = default_config.pillar_x_interval
+    pillar_gap = default_config.pillar_gap
+    pillar_piece_min_length = default_config.pillar_piece_min_length
+    pillar_x0 = default_config.pillar_x0
 
     # parameters for the bird
-    bird_size = 0.4
-    bird_x0 = 1.0
-    bird_y0 = 2.5
+    bird_size = default_config.bird_size
+    bird_x0 = default_config.bird_x0
+    bird_y0 = default_config.bird_y0
+    
+    # whether a rectangle collides with any of the pillars
+    collision_engine = staticmethod(pillars_collide)
 
-    def __init__(self, dx_loaded=10.0, presenter=None):
+    def __init__(self, dx_loaded=10.0, presenter=None, config=default_config, rng=random, endurance=False):
         '''
         dx_loaded: objects within [x, x+dx_loaded] will be kept in memory
+        config: the parameters of the game
+        rng: the random number generator of the pillars, e.g. random.Random(seed). The global one by default
+        endurance: for games of any length. Moves are counted in integer ticks. After the first two pillar
+            intervals, the origin moves forward by an interval every interval, back to the x of the bird and
+            the game at the start of the second one. So every later move computes with the same floats as
+            the one of the second interval of a short game, and the numbers stay small
         '''
+        self.config = config
+        self.rng = rng
+        if config is not default_config:
+            for name in game_config.parameters:
+                if hasattr(flappy_bird_game, name):
+                    setattr(self, name, getattr(config, name))
+        
         self.x = 0.0
         self.dx_loaded=dx_loaded
+        
+        # pillar ids are counted from the origin's. It moves forward only in the endurance mode
+        self.pillar_id_origin = 0
+        self.endurance = endurance
+        if endurance:
+            self.ticks = 0              # moves in total
+            self.local_ticks = 0        # moves since the origin
+            ticks = self.pillar_x_interval / (self.time_per_move * config.xspeed)
+            self.ticks_per_interval = int(round(ticks))
+            if abs(ticks - self.ticks_per_interval) > 1e-9:
+                raise ValueError('the endurance mode needs a pillar interval of a whole number of moves')
+            self.rebase_x = None        # x of the game and the bird after ticks_per_interval moves
                 
-        self.bird = bird(self.bird_size, self.bird_x0, self.bird_y0)
+        self.bird = bird(self.bird_size, self.bird_x0, self.bird_y0, config)
 
         # create the pillars
         self.pillars = []
@@ -173,18 +239,11 @@ class flappy_bird_game:
     def clone_game(self):
         '''
         Make a clone of the game
+        A shallow copy, without running __init__ which would create pillars only to throw them away
         '''
-        game = flappy_bird_game()
-        game.x = self.x
-        game.dx_loaded = self.dx_loaded
+        game = copy.copy(self)
         game.bird = self.bird.clone()
         game.pillars = self.pillars[:]      # pillars are immutable, thus no need to deep copy
-        game.next_pillar_id = self.next_pillar_id
-        game.is_game_over = self.is_game_over
-        game.score = self.score
-        game.just_scored = self.just_scored
-        game.last_pillar_bird_passed = self.last_pillar_bird_passed
-        
         return game
         
     def score_update(self):
@@ -206,11 +265,7 @@ class flappy_bird_game:
         '''
         if self.is_bird_out_of_bound():
             return False
-        bird_rect = self.bird.get_rect()
-        for p in self.pillars:
-            if p.collide_with(bird_rect):
-                return False
-        return True
+        return not self.collision_engine(self.pillars, self.bird.get_rect())
     
     def is_bird_out_of_bound(self):
         rect = self.bird.get_rect()
@@ -221,14 +276,31 @@ class flappy_bird_game:
     def move(self, jump=False):
         self.just_scored = False
         if not self.is_game_over:
+            if self.endurance and self.local_ticks == 2 * self.ticks_per_interval:
+                self.rebase()
             self.x += self.time_per_move
             self.update_pillars()
-            self.bird.move(self.time_per_move, jump)
+            self.bird.move(self.time_per_move, jump, self.substeps)
+            if self.endurance:
+                self.ticks += 1
+                self.local_ticks += 1
+                if self.local_ticks == self.ticks_per_interval and self.rebase_x is None:
+                    self.rebase_x = (self.x, self.bird.x)
             self.score_update()
             self.is_game_over = not self.is_bird_alive()
             if self.is_game_over:
                 logging.debug('game is over. Bird is at {}. Score: {}'.format(self.bird.get_rect(), self.score))
         
+    def rebase(self):
+        '''
+        Move the origin forward by a pillar interval, in the endurance mode
+        '''
+        self.local_ticks -= self.ticks_per_interval
+        self.pillar_id_origin += 1
+        self.x, self.bird.x = self.rebase_x
+        # new pillars at the new x, since the pillars may be shared with clones
+        self.pillars = [p.moved_to(self.get_pillar_x(p.pid)) for p in self.pillars]
+        
     def update_pillars(self):
         '''
         Remove the pillars that are no longer in view, and create ones that come in view
@@ -256,14 +328,14 @@ class flappy_bird_game:
         '''
         Returns the starting x of the pillar
         '''
-        return self.pillar_x0 + pid * self.pillar_x_interval
+        return self.pillar_x0 + (pid - self.pillar_id_origin) * self.pillar_x_interval
 
     def create_pillar(self, pid):
         '''
         Create a pillar with pid
         '''
         x = self.get_pillar_x(pid)
-        r = random.random()
+        r = self.rng.random()
         bottom_length = r * (self.height - 2 * self.pillar_piece_min_length - self.pillar_gap) + self.pillar_piece_min_length
         top_length = self.height - bottom_length - self.pillar_gap
         return pillar(pid, x, top_length, bottom_length, self.pillar_width, self.height)
@@ -280,6 +352,8 @@ class flappy_bird_game:
         return [True, False]
     
 if __name__=='__main__':
+    from graphic_display import graphic_display
+    
     parser = argparse.ArgumentParser('Flappy bird game with reinforcement learning')
     
     parser.add_argument('--p', '--player', choices=['h', 'human', 'a', 'AI'], default='human',
@@ -289,10 +363,14 @@ if __name__=='__main__':
     args = parser.parse_args()
 
     new_game = True
+    presenter = None
     while new_game:
         new_game = False
         game = flappy_bird_game()
-        presenter = graphic_display(game)
+        if presenter is None:
+            presenter = graphic_display(game)
+        else:
+            presenter.bind(game)
         done = False
         jump = False
         while not done and not new_game:
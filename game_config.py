@@ -0,0 +1,103 @@
+# The parameters of the game
+#
+# A game_config is immutable, so games, trainers and displays with different configs can run
+# side by side in one process. Quantities derived from the parameters are computed once
+
+from __future__ import division
+import math
+
+# (name, default value)
+_parameters = [
+    ('time_per_move', 0.2),             # every consecutive moves are this time units apart
+    ('substeps', 1),                    # the bird's movement is integrated in this many steps per move
+    ('height', 5.0),
+    
+    # parameters for the pillars
+    ('pillar_width', 1.0),
+    ('pillar_x_interval', 4.0),         # How far between consecutive pillars
+    ('pillar_gap', 2.0),                # Gap between two parts of a pillar that can go through
+    ('pillar_piece_min_length', 0.6),   # Each piece of a pillar is at least this long
+    ('pillar_x0', 5.0),                 # First pillar's x
+    
+    # parameters for the bird
+    ('bird_size', 0.4),
+    ('bird_x0', 1.0),
+    ('bird_y0', 2.5),
+    ('xspeed', 1),
+    ('yaccelation', -2),                # accelaration in y-direction
+    ('yspeed_after_jump', 1.5),         # everytime the bird jumps, vy is set to this value
+]
+
+_derived = [
+    'dx_min', 'dx_max',         # range of the horizontal distance of the bird to the next pillar
+    'dy_min', 'dy_max',         # range of the vertical distance of the bird to the bottom of the gap
+    'vy_min', 'vy_max',         # range of the vertical speed, from falling dy_max to just jumped
+    'vy_fall_height',           # vertical speed after falling the whole height
+]
+
+def _new_config(values):
+    return game_config(**values)
+
+class game_config(object):
+    '''
+    Parameters of the game, given as keyword arguments. The ones not given have the default values
+    '''
+    parameters = tuple(name for name, _ in _parameters)
+    __slots__ = parameters + tuple(_derived)
+    
+    def __init__(self, **kwargs):
+        for name in kwargs:
+            if name not in game_config.parameters:
+                raise TypeError('unknown game parameter: {}'.format(name))
+        for name, default in _parameters:
+            object.__setattr__(self, name, kwargs.get(name, default))
+        
+        derived = dict()
+        derived['dx_min'] = 0.0
+        # bird initial location or after it clears a pillar, to the next pillar
+        derived['dx_max'] = max(self.pillar_x0 + self.pillar_width - self.bird_x0, self.pillar_x_interval)
+        derived['dy_max'] = self.height - self.bird_size/2.0       # 4.8 by default
+        derived['dy_min'] = -derived['dy_max']
+        derived['vy_max'] = self.yspeed_after_jump
+        # time to fall from the top to bottom
+        t_fall = math.sqrt(2 * derived['dy_max'] / math.fabs(self.yaccelation))
+        derived['vy_min'] = t_fall * self.yaccelation
+        t_fall = math.sqrt(2 * self.height / math.fabs(self.yaccelation))
+        derived['vy_fall_height'] = t_fall * self.yaccelation
+        for name in _derived:
+            object.__setattr__(self, name, derived[name])
+            
+    def __setattr__(self, name, value):
+        raise AttributeError('game_config is immutable. Use replace() to make a modified copy')
+    
+    def replace(self, **kwargs):
+        '''
+        Returns a copy with the given parameters changed
+        '''
+        values = self.as_dict()
+        values.update(kwargs)
+        return game_config(**values)
+    
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in game_config.parameters)
+    
+    def _values(self):
+        return tuple(getattr(self, name) for name in game_config.parameters)
+    
+    def __eq__(self, other):
+        return isinstance(other, game_config) and self._values() == other._values()
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __hash__(self):
+        return hash(self._values())
+    
+    def __reduce__(self):
+        return (_new_config, (self.as_dict(),))
+    
+    def __repr__(self):
+        changed = ['{}={!r}'.format(name, getattr(self, name)) for name, default in _parameters if getattr(self, name) != default]
+        return 'game_config({})'.format(', '.join(changed))
+
+default_config = game_config()
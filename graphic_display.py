@@ -1,139 +1,302 @@
 from __future__ import division
 
-import logging.config
+import logging
+from log_setup import get_logger
+import os
 import spritesheet
 import pygame
 import time
-import numpy as np
 
 
-logging.config.fileConfig('logging.conf')
-logger = logging.getLogger('flappy_bird.graphic_display')
+logger = get_logger('flappy_bird.graphic_display')
 
-class graphic_display:
-    def __init__(self, game):
-        self.game = game
-        
-        self.display_height = 300
-        self.display_width = 600
-        self.x_margin = 10.0
-        self.y_margin = 0.0
-        self.x_factor = (self.display_width - 2*self.x_margin)/self.game.dx_loaded
-        self.y_factor = (self.display_height - 2*self.y_margin)/self.game.height
-        
+atlas_image_file = 'res/atlas.png'
+atlas_file = 'res/atlas.txt'
+music_file = 'res/Hopes and Dreams.mp3'
+sound_files = {'hit': 'res/sfx_hit.mp3', 'point': 'res/sfx_point.mp3'}
+
+# Module level caches shared by all graphic_display instances, so that a new display
+# (or a display re-bound to a new game) doesn't re-initialize pygame or reload the images
+_pygame_initialized = False
+_music_playing = False
+_sounds = None          # name -> (pygame.mixer.Sound, its reserved channel)
+_sprite_sheet = None
+_atlas = None
+_assets = {}            # (display_width, display_height, dx_loaded) -> graphic_assets
+_cached_fonts = {}
+
+def load_atlas(filename=atlas_file):
+    '''
+    Parse the atlas description once and returns {name: (x, y, w, h)}.
+    Each line of the file is "name width height x y w h", where x, y, w, h are fractions of the atlas image size
+    '''
+    global _atlas
+    if _atlas is None:
+        atlas = {}
+        with open(filename) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 7:
+                    continue
+                atlas[fields[0]] = tuple(float(v) for v in fields[3:])
+        _atlas = atlas
+    return _atlas
+
+def _init_pygame(display_size):
+    '''
+    Initialize pygame and the background music once, and returns the screen of the given size
+    '''
+    global _pygame_initialized
+    if not _pygame_initialized:
         pygame.init()
-        #pygame.mixer.music.load('res/Yesterday.wav')
-        pygame.mixer.music.load('res/Hopes and Dreams.mp3')
-        pygame.mixer.music.play(-1)
-        
-        self.screen = pygame.display.set_mode((self.display_width, self.display_height))
+        _pygame_initialized = True
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != display_size:
+        screen = pygame.display.set_mode(display_size)
         pygame.display.set_caption('Flappy Bird')
-        self.clock = pygame.time.Clock()
-        
-        # backgroud
-        ss = spritesheet.spritesheet('res/atlas.png')
-        self.bg_img = ss.image_at((0.0, 0.0, 0.28125*ss.imgsize[0], 0.5*ss.imgsize[1]))
+    load_sounds()
+    return screen
+
+def play_music():
+    '''
+    (Re)start the background music if it is not playing
+    '''
+    global _music_playing
+    if _music_playing or pygame.mixer.get_init() is None:
+        return
+    if not os.path.isfile(music_file):
+        logger.debug('music file {} not found'.format(music_file))
+        return
+    #pygame.mixer.music.load('res/Yesterday.wav')
+    pygame.mixer.music.load(music_file)
+    pygame.mixer.music.play(-1)
+    _music_playing = True
+
+def stop_music():
+    global _music_playing
+    if pygame.mixer.get_init() is not None:
+        pygame.mixer.music.stop()
+    _music_playing = False
+
+def is_headless():
+    '''
+    True if there is no real screen or sound card, e.g. SDL_VIDEODRIVER=dummy
+    '''
+    return pygame.display.get_driver() == 'dummy' or os.environ.get('SDL_AUDIODRIVER') == 'dummy'
+
+def load_sounds():
+    '''
+    Decode the sound effects once into memory, each played on a channel of its own so that the
+    effects don't cut each other off, nor the background music, which streams separately.
+    There are no sound effects in headless mode, or without a mixer
+    '''
+    global _sounds
+    if _sounds is None:
+        sounds = {}
+        if not is_headless() and pygame.mixer.get_init() is not None:
+            pygame.mixer.set_reserved(len(sound_files))
+            for i, name in enumerate(sorted(sound_files)):
+                try:
+                    sounds[name] = (pygame.mixer.Sound(sound_files[name]), pygame.mixer.Channel(i))
+                except pygame.error as e:
+                    logger.debug('sound {} not loaded: {}'.format(sound_files[name], e))
+        _sounds = sounds
+    return _sounds
+
+def play_sound(name):
+    '''
+    Start the named sound effect and return right away. It restarts if it is still playing
+    '''
+    sound = load_sounds().get(name, None)
+    if sound is not None:
+        sound[1].play(sound[0])
+
+def get_sprite_sheet():
+    global _sprite_sheet
+    if _sprite_sheet is None:
+        _sprite_sheet = spritesheet.spritesheet(atlas_image_file)
+    return _sprite_sheet
+
+def get_sprite_rect(name):
+    '''
+    Returns the rect (x, y, width, height) in pixels of the named sprite in the atlas image
+    '''
+    ss_size = get_sprite_sheet().imgsize
+    x, y, w, h = load_atlas()[name]
+    return (x*ss_size[0], y*ss_size[1], w*ss_size[0], h*ss_size[1])
+
+def get_assets(display_width, display_height, game):
+    '''
+    Returns the images scaled for the display size and the game's dx_loaded and config. They are loaded only once per key
+    '''
+    key = (display_width, display_height, game.dx_loaded, game.config)
+    assets = _assets.get(key, None)
+    if assets is None:
+        assets = graphic_assets(display_width, display_height, game)
+        _assets[key] = assets
+    return assets
+
+class graphic_assets:
+    '''
+    The images used by the display, cut from the sprite sheet and scaled to the display
+    '''
+    def __init__(self, display_width, display_height, game):
+        self.x_factor = (display_width - 2*graphic_display.x_margin)/game.dx_loaded
+        self.y_factor = (display_height - 2*graphic_display.y_margin)/game.height
+        ss = get_sprite_sheet()
+
+        # backgroud, composited once into a surface of the display size
+        self.bg_img = ss.image_at(get_sprite_rect('bg_day'))
+        self.background = self._compose_background(display_width, display_height)
         
         # images for the bird
-        bird_img1 = self._load_bird_img(ss, (0.0, 0.9472656, 0.046875, 0.046875))
-        bird_img2 = self._load_bird_img(ss, (0.0546875, 0.9472656, 0.046875, 0.046875))
-        bird_img3 = self._load_bird_img(ss, (0.109375, 0.9472656, 0.046875, 0.046875))
-        self.bird_imgs = [bird_img1, bird_img2, bird_img3]
-        self.bird_img_index = 0
-        self.bird_img_time = time.time()
+        bird_display_size = (int(game.bird_size*self.x_factor), int(game.bird_size*self.y_factor))
+        self.bird_imgs = [self._load_bird_img(ss, name, bird_display_size) for name in ('bird0_0', 'bird0_1', 'bird0_2')]
         
         # images for the pillars
         # use the pixel at (0,30) to remove the black borders
-        self.pillar_bot_img = ss.image_at((0.0, 0.6308594*ss.imgsize[1], 52, 320), -1, (0,30))  
-        pillar_img_size = self.pillar_bot_img.get_rect().size
-        pillar_display_width = self.game.pillar_width * self.x_factor
+        pillar_bot_img = ss.image_at(get_sprite_rect('pipe2_down'), -1, (0,30))
+        pillar_img_size = pillar_bot_img.get_rect().size
+        pillar_display_width = game.pillar_width * self.x_factor
         pillar_ima_scale = pillar_display_width / pillar_img_size[0]
         self.pillar_img_size = (int(pillar_display_width), int(pillar_img_size[1] * pillar_ima_scale))
-        self.pillar_bot_img = pygame.transform.scale(self.pillar_bot_img, self.pillar_img_size)
+        self.pillar_bot_img = pygame.transform.scale(pillar_bot_img, self.pillar_img_size)
         self.pillar_top_img = pygame.transform.flip(self.pillar_bot_img, False, True)
+
+    def _compose_background(self, display_width, display_height):
+        background = pygame.Surface((display_width, display_height)).convert()
+        background.fill((255,255,255))
+        bg_img_width, bg_img_height = self.bg_img.get_rect().size
+        y_offset = display_height - graphic_display.y_margin - bg_img_height
+        
+        x = 0
+        while x < display_width:
+            background.blit(self.bg_img, (x,y_offset))
+            x += bg_img_width
+        return background
+
+    def _load_bird_img(self, ss, name, bird_display_size):
+        '''
+        Load the bird image from the spritesheet
+        '''
+        x, y, w, h = get_sprite_rect(name)
+        # the image has some edges. Clip them off by a few pixels at each side
+        bird_img = ss.image_at((x+7, y+10, w-15, h-15), -1)
+        return pygame.transform.scale(bird_img, bird_display_size)
+
+class graphic_display:
+    display_height = 300
+    display_width = 600
+    x_margin = 10.0
+    y_margin = 0.0
+
+    def __init__(self, game):
+        self.screen = _init_pygame((self.display_width, self.display_height))
+        self.clock = pygame.time.Clock()
+        
+        self.bird_img_index = 0
+        self.bird_img_time = time.time()
         
         # text related
-        self.cached_fonts = {}
         self.font_preferences = [
                 "Papyrus",
                 "Comic Sans MS"]
+        self.score_img = None
+        self.score_img_score = None
+        self.game_over_img = None
+        self.overlay_img = None
+        self.overlay_img_text = None
         
-        self.was_game_over = self.game.is_game_over
+        self.bind(game)
 
-        self.update_display()
-        
-
-    def _load_bird_img(self, ss, rect):
+    def bind(self, game):
         '''
-        Load the bird image from the spritesheet
+        Show a (new) game on this display, without re-initializing pygame or reloading the images
         '''
-        ss_size = ss.imgsize
-        bird_logic_size = self.game.bird_size
-        bird_display_size = (int(bird_logic_size*self.x_factor), int(bird_logic_size*self.y_factor))
-        # the image has some edges. Clip them off by a few pixels at each side
-        bird_img = ss.image_at((rect[0]*ss_size[0]+7, rect[1]*ss_size[1]+10, rect[2]*ss_size[0]-15, rect[3]*ss_size[1]-15), -1)
-        bird_img = pygame.transform.scale(bird_img, bird_display_size)
-        return bird_img
+        self.game = game
+        assets = get_assets(self.display_width, self.display_height, game)
+        self.x_factor = assets.x_factor
+        self.y_factor = assets.y_factor
+        self.background = assets.background
+        self.bird_imgs = assets.bird_imgs
+        self.pillar_bot_img = assets.pillar_bot_img
+        self.pillar_top_img = assets.pillar_top_img
+        self.pillar_img_size = assets.pillar_img_size
         
-    def update_display(self):
+        self.was_game_over = self.game.is_game_over
+        self.last_score = self.game.score
+        if not self.was_game_over:
+            play_music()
+        
+        self.overlay_text = None
+        
+        # areas drawn in the last frame; the first frame of a game redraws the whole screen
+        self.dirty_rects = []
+        self.full_redraw = True
+
+        self.update_display()
+        
+    def update_display(self, fps=60):
         '''
-        Update the game display
+        Update the game display, and wait to keep the frame rate at fps. No wait if fps is 0
+        Only the areas drawn in this frame or in the previous frame are pushed to the screen
         Return QUIT, MOUSEBUTTONUP, NEWGAME events 
         '''
         quit_game = False
         jump = False
         new_game = False
 
-        self.screen.fill((255,255,255))
-        
-        self.display_background()
+        # erase what was drawn in the last frame by restoring the pre-composited background
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.dirty_rects:
+                self.screen.blit(self.background, rect, rect)
         
-        self.display_bird()
+        rects = [self.display_bird()]
         
         for pillar in self.game.pillars:
-            self.display_rect(pillar.top_rect, True)
-            self.display_rect(pillar.bottom_rect, False)
+            rects.append(self.display_rect(pillar.top_rect, True))
+            rects.append(self.display_rect(pillar.bottom_rect, False))
 
-        self.display_score()
+        rects.append(self.display_score())
         
         if not self.was_game_over and self.game.is_game_over:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load('res/sfx_hit.mp3')
-            pygame.mixer.music.play()
+            play_sound('hit')
+        elif self.game.score > self.last_score:
+            play_sound('point')
         self.was_game_over = self.game.is_game_over
+        self.last_score = self.game.score
         
         if self.was_game_over:
-            self.display_game_over()
+            rects.append(self.display_game_over())
+        
+        if self.overlay_text is not None:
+            rects.append(self.display_overlay())
                   
-        pygame.display.flip()
-        self.clock.tick(60)      # 60 frames-per-second
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.dirty_rects + rects)
+        self.dirty_rects = rects
+        if fps:
+            self.clock.tick(fps)
         
-        pressed_keys = pygame.key.get_pressed() # for some reason this has to be after play the mp3 sound. Otherwise there is no sound
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.mixer.music.stop()
+                stop_music()
                 quit_game = True
             if event.type == pygame.MOUSEBUTTONUP:
                 jump = True
             if  event.type == pygame.KEYUP:
-                if pressed_keys[pygame.K_UP]:
+                if event.key == pygame.K_UP:
                     jump = True
-                elif pressed_keys[pygame.K_n]:
+                elif event.key == pygame.K_n:
                     new_game = True
         
         return quit_game, jump, new_game
     
-    def display_background(self):
-        bg_img_size = self.bg_img.get_rect().size
-        bg_img_width = bg_img_size[0]
-        bg_img_height = bg_img_size[1]
-        y_offset = self.display_height - self.y_margin - bg_img_height
-        
-        x = 0
-        while x < self.display_width:
-            self.screen.blit(self.bg_img, (x,y_offset))
-            x += bg_img_width
-                
     def display_bird(self):
         new_time = time.time()
         if new_time - self.bird_img_time > 0.3:
@@ -146,15 +309,13 @@ class graphic_display:
         anchor_x = min(rect[0][0], rect[1][0])
         anchor_y = max(rect[0][1], rect[1][1])        
         x, y = self.game_coordinate_to_display_coordinate(anchor_x, anchor_y)
-        self.screen.blit(bird_img, (x, y))
-        #self.screen.blit(bird_img, (0, 0))
+        return self.screen.blit(bird_img, (x, y))
     
     def display_rect(self, rect, isTop):
         x1, y1, x2, y2 = self._get_rect_display_coordinates(rect)
         if isTop:
-            self.screen.blit(self.pillar_top_img, (x1, y1-self.pillar_img_size[1]))
-        else:
-            self.screen.blit(self.pillar_bot_img, (x1, y2))
+            return self.screen.blit(self.pillar_top_img, (x1, y1-self.pillar_img_size[1]))
+        return self.screen.blit(self.pillar_bot_img, (x1, y2))
         
     def _get_rect_display_coordinates(self, rect):
         '''
@@ -187,26 +348,38 @@ class graphic_display:
         
     
     def get_font(self, font_preferences, size):
-        global _cached_fonts
         key = str(font_preferences) + '|' + str(size)
-        font = self.cached_fonts.get(key, None)
+        font = _cached_fonts.get(key, None)
         if font == None:
             font = self.make_font(font_preferences, size)
-            self.cached_fonts[key] = font
+            _cached_fonts[key] = font
         return font
 
     def display_game_over(self):
-        font = self.get_font(self.font_preferences, 72)
-        image = font.render("Game Over", True, (255,255,255))
+        if self.game_over_img is None:
+            font = self.get_font(self.font_preferences, 72)
+            self.game_over_img = font.render("Game Over", True, (255,255,255))
+        image = self.game_over_img
         location = ((self.display_width - image.get_width())//2, (self.display_height - image.get_height())//2)
-        self.screen.blit(image, location)
+        return self.screen.blit(image, location)
 
     def display_score(self):
-        font = self.get_font(self.font_preferences, 36)
-        score_text = 'Score: {}'.format(self.game.score)
-        image = font.render(score_text, True, (255,255,255))
+        # the text is only rendered when the score changes
+        if self.score_img is None or self.score_img_score != self.game.score:
+            font = self.get_font(self.font_preferences, 36)
+            score_text = 'Score: {}'.format(self.game.score)
+            self.score_img = font.render(score_text, True, (255,255,255))
+            self.score_img_score = self.game.score
         location = (450, 20)
-        self.screen.blit(image, location)
+        return self.screen.blit(self.score_img, location)
+        
+    def display_overlay(self):
+        if self.overlay_img is None or self.overlay_img_text != self.overlay_text:
+            font = self.get_font(self.font_preferences, 20)
+            self.overlay_img = font.render(self.overlay_text, True, (255,255,255))
+            self.overlay_img_text = self.overlay_text
+        location = (10, 10)
+        return self.screen.blit(self.overlay_img, location)
         
     def get_image_pixels_old(self):
         '''
@@ -230,6 +403,7 @@ class graphic_display:
         '''
         Returns the screen pixel in a numpy array in shape (row, column, 3)
         '''
+        import numpy as np
         #pixels = np.zeros((self.display_height, self.display_width, 3), dtype=np.int8)
         pixels = np.zeros((self.display_height, self.display_width, 3))
         pixel_array = pygame.PixelArray(self.screen)
@@ -245,3 +419,48 @@ class graphic_display:
 
         return pixels
 
+
+class fast_forward_display:
+    '''
+    Show every Nth state of the game on a graphic display, without throttling the simulation.
+    N is adjusted to keep the frame rate around target_fps.
+    The overlay shows the simulated steps/sec and the score rate
+    '''
+    def __init__(self, display, target_fps=60, report_interval=1.0):
+        self.display = display
+        self.target_fps = target_fps
+        self.report_interval = report_interval  # seconds between adjustments of N
+        self.n = 1                              # render every n-th step
+        self.step_count = 0
+        self._start_window()
+        
+    def _start_window(self):
+        self.window_time = time.time()
+        self.window_steps = 0
+        self.window_score = self.display.game.score
+        
+    def bind(self, game):
+        self.display.bind(game)
+        self.step_count = 0
+        self._start_window()
+
+    def update_display(self):
+        '''
+        Count one simulation step, and render it if it is the n-th one, or the game is over
+        Return QUIT, MOUSEBUTTONUP, NEWGAME events as graphic_display does
+        '''
+        self.step_count += 1
+        self.window_steps += 1
+        game = self.display.game
+        if self.step_count % self.n != 0 and not game.is_game_over:
+            return False, False, False
+        
+        now = time.time()
+        elapsed = now - self.window_time
+        if elapsed >= self.report_interval:
+            steps_per_sec = self.window_steps / elapsed
+            score_rate = (game.score - self.window_score) / elapsed
+            self.n = max(1, int(round(steps_per_sec / self.target_fps)))
+            self.display.overlay_text = 'x{}  {:.0f} steps/s  {:.1f} points/s'.format(self.n, steps_per_sec, score_rate)
+            self._start_window()
+        return self.display.update_display(fps=0)
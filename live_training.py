@@ -0,0 +1,215 @@
+# Live training: the learner trains silently at full speed in a worker process, while this process
+# plays demo games with the current policy on the graphic display.
+#
+# The worker starts as a fork of this process, with the learner as it is. Every publish_interval seconds
+# it sends only what changed since its last message: the Q-table entries set or removed, or the weights.
+# The viewer applies the messages to its copy of the learner between frames. Neither side locks the
+# other, and the table is never copied as a whole. When the window is closed, the worker sends its last
+# changes and stops, and the learner of this process is left with all of the training.
+#
+# The state the learner keeps besides its Q-table or weights is synced too (the state visit counts), or the
+# mode is refused: the priorities of the prioritized start sampler and the level of the curriculum would
+# be lost in the worker. The metrics are recorded by a sink of the worker, the flusher thread of the
+# learner's sink does not survive the fork.
+
+from __future__ import division
+import multiprocessing
+import Queue
+import time
+import traceback
+
+from flappy_bird import flappy_bird_game
+from checkpoint import tracked_table
+from metrics import metrics_sink
+from start_sampler import prioritized_start_sampler
+
+class live_table(tracked_table):
+    '''
+    A tracked_table that also remembers the keys set or removed since its changes were last taken,
+    independently of the checkpoints
+    '''
+    __slots__ = ('changed', 'dropped')
+
+    def __init__(self, table):
+        tracked_table.__init__(self, table)
+        self.dirty = set(getattr(table, 'dirty', ()))
+        self.removed = set(getattr(table, 'removed', ()))
+        self.changed = set()
+        self.dropped = set()
+
+    def __setitem__(self, key, value):
+        self.changed.add(key)
+        tracked_table.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        tracked_table.__delitem__(self, key)
+        self.changed.discard(key)
+        self.dropped.add(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.changed.discard(key)
+            self.dropped.add(key)
+        return tracked_table.pop(self, key, *default)
+
+    def take_changes(self):
+        '''
+        Returns the entries set and the keys removed since the last call
+        '''
+        changes = dict((key, self[key]) for key in self.changed), self.dropped
+        self.changed = set()
+        self.dropped = set()
+        return changes
+
+def _apply_table_changes(table, changes):
+    changed, removed = changes
+    for key in removed:
+        table.pop(key, None)
+    for key, value in changed.iteritems():
+        table[key] = value
+
+class qtable_sync(object):
+    '''
+    Live training of a trainer of fixed bins: the changes of its Q-table, of the entry statistics and of the
+    state visit counts are sent
+    '''
+    def __init__(self, t):
+        if t.discretizer.get_n_states() is not None:
+            raise ValueError('live training needs the fixed bins, the viewer could not follow the splits of the states')
+
+    def start(self, t):
+        # in the worker; the entries are copied once
+        t.QTable = live_table(t.QTable)
+        t.q_stats.entries = live_table(t.q_stats.entries)
+        t.state_visits = live_table(t.state_visits)
+
+    def get_changes(self, t):
+        return t.QTable.take_changes(), t.q_stats.entries.take_changes(), t.state_visits.take_changes()
+
+    def apply(self, t, changes):
+        qtable_changes, stats_changes, visits_changes = changes
+        _apply_table_changes(t.QTable, qtable_changes)
+        t.q_stats.update(*stats_changes)
+        _apply_table_changes(t.state_visits, visits_changes)
+
+    def get_action(self, t, game):
+        actions = game.get_legal_actions()
+        values = [t.get_action_value(game, act, training=False) for act in actions]
+        return t.select_action_with_max_score(actions, values)[0]
+
+    def describe(self, t):
+        return 'Q-table {} entries'.format(len(t.QTable))
+
+class weights_sync(object):
+    '''
+    Live training of a feature_trainer: its weights are sent
+    '''
+    names = ('w_dy_to_center', 'w_dy_to_gap_baseline', 'w_dy_to_gap_baseline_in_gap')
+
+    def start(self, t):
+        pass
+
+    def get_changes(self, t):
+        return tuple(getattr(t, name) for name in weights_sync.names)
+
+    def apply(self, t, changes):
+        for name, value in zip(weights_sync.names, changes):
+            setattr(t, name, value)
+
+    def get_action(self, t, game):
+        return t.selection_action_with_max_value(game, game.get_legal_actions(), False)[0]
+
+    def describe(self, t):
+        return 'weights ' + ' '.join('{:.2f}'.format(getattr(t, name)) for name in weights_sync.names)
+
+def check_learner(t):
+    '''
+    Raise ValueError if the learner keeps state that live training would lose
+    '''
+    if isinstance(t.start_sampler, prioritized_start_sampler):
+        raise ValueError('live training needs the uniform start sampler, the priorities learned by the worker would be lost')
+    if t.curriculum is not None:
+        raise ValueError('live training does not support a curriculum, the level reached by the worker would be lost')
+
+def train_worker(t, sync, queue, stop, publish_interval):
+    '''
+    Train sessions until stop is set, sending (sessions trained, changes) to the queue every publish_interval seconds,
+    and last a message whose sessions are None, with the traceback if the training failed
+    '''
+    if isinstance(t.metrics, metrics_sink):
+        t.metrics = metrics_sink(t.metrics.filename, t.metrics.flush_interval)
+    try:
+        sync.start(t)
+        n_sessions = 0
+        last_publish = time.time()
+        while not stop.is_set():
+            t.train_one_session(False)
+            n_sessions += 1
+            now = time.time()
+            if now - last_publish >= publish_interval:
+                queue.put((n_sessions, sync.get_changes(t)))
+                last_publish = now
+        queue.put((n_sessions, sync.get_changes(t)))
+        queue.put((None, None))
+    except Exception:
+        queue.put((None, traceback.format_exc()))
+    finally:
+        t.metrics.close()
+
+def run(t, sync, publish_interval=0.5, fps=30, max_frames=None):
+    '''
+    Train the learner t in a worker process, and show demo games of its current policy until the window
+    is closed, or max_frames frames are shown. Returns the number of sessions trained.
+    Raises RuntimeError if the worker failed
+    '''
+    check_learner(t)
+    queue = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    worker = multiprocessing.Process(target=train_worker, args=(t, sync, queue, stop, publish_interval))
+    worker.daemon = True
+    worker.start()
+
+    start = time.time()
+    n_sessions = 0
+    n_frames = 0
+    game = flappy_bird_game(config=t.config)
+    display = t.get_graphic_display(game)
+    quit_game = False
+    new_game = False
+    done = False
+    failure = None
+    while not done and not quit_game and (max_frames is None or n_frames < max_frames):
+        while not queue.empty():
+            sessions, changes = queue.get()
+            if sessions is None:
+                done, failure = True, changes
+                break
+            n_sessions = sessions
+            sync.apply(t, changes)
+        if game.is_game_over or new_game:
+            game = flappy_bird_game(config=t.config)
+            display = t.get_graphic_display(game)
+        game.move(sync.get_action(t, game))
+        display.overlay_text = '{} sessions, {:.0f}/s, {}'.format(n_sessions, n_sessions / (time.time() - start), sync.describe(t))
+        quit_game, _, new_game = display.update_display(fps)
+        n_frames += 1
+
+    stop.set()
+    # drain the queue before joining, the worker can't exit with messages unsent
+    while not done:
+        try:
+            sessions, changes = queue.get(timeout=1.0)
+        except Queue.Empty:
+            if not worker.is_alive():
+                done, failure = True, 'the training worker exited with code {}'.format(worker.exitcode)
+            continue
+        if sessions is None:
+            done, failure = True, changes
+            break
+        n_sessions = sessions
+        sync.apply(t, changes)
+    worker.join()
+    if failure:
+        raise RuntimeError('live training failed after {} sessions:\n{}'.format(n_sessions, failure))
+    print 'Trained {} sessions in {:.1f}s, {}'.format(n_sessions, time.time() - start, sync.describe(t))
+    return n_sessions
@@ -0,0 +1,17 @@
+# Configure the logging from logging.conf, once per process
+
+import logging
+import logging.config
+
+_configured = False
+
+def get_logger(name):
+    '''
+    Returns the logger of the name, configuring the logging first if it is not yet
+    '''
+    global _configured
+    if not _configured:
+        # keep the loggers created before the configuration working
+        logging.config.fileConfig('logging.conf', disable_existing_loggers=False)
+        _configured = True
+    return logging.getLogger(name)
@@ -0,0 +1,141 @@
+# Training metrics: cheap in-process counters, gauges and histograms, flushed by a background thread
+#
+# The training loop only updates dicts and lists under an uncontended lock. Every flush_interval seconds
+# the flusher thread takes them, summarizes them (rates of the counters, count/mean/min/max/p50/p99
+# of the histograms) and appends the summary to a JSONL file (one object per flush) or a CSV file
+# (one time,name,field,value row per number)
+
+from __future__ import division
+import json
+import os
+import threading
+import time
+
+from log_setup import get_logger
+
+logger = get_logger('flappy_bird.metrics')
+
+class null_metrics(object):
+    '''
+    A metrics sink that records nothing
+    '''
+    def count(self, name, n=1):
+        pass
+
+    def observe(self, name, value):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def close(self):
+        pass
+
+def summarize(values):
+    '''
+    Returns count, mean, min, max, p50 and p99 of the values
+    '''
+    values = sorted(values)
+    n = len(values)
+    return {'count': n, 'mean': sum(values) / n, 'min': values[0], 'max': values[-1],
+            'p50': values[int(0.5 * (n - 1))], 'p99': values[int(0.99 * (n - 1))]}
+
+class metrics_sink(object):
+    '''
+    Records metrics and flushes their summaries to the file asynchronously
+    '''
+    def __init__(self, filename, flush_interval=5.0):
+        '''
+        filename: ending with .csv for CSV, otherwise JSONL. The summaries are appended
+        flush_interval: seconds between the summaries
+        '''
+        self.filename = filename
+        self.csv = filename.endswith('.csv')
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.counters = dict()
+        self.gauges = dict()
+        self.histograms = dict()
+        self.start_time = time.time()
+        self.last_flush = self.start_time
+
+        if self.csv and not os.path.isfile(filename):
+            with open(filename, 'w') as f:
+                f.write('time,name,field,value\n')
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics-flusher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def count(self, name, n=1):
+        '''
+        Add n to the counter. Its rate per second is reported too
+        '''
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        '''
+        Add the value to the histogram
+        '''
+        with self.lock:
+            values = self.histograms.get(name)
+            if values is None:
+                self.histograms[name] = [value]
+            else:
+                values.append(value)
+
+    def gauge(self, name, value):
+        '''
+        Set the current value, e.g. the Q-table size
+        '''
+        self.gauges[name] = value
+
+    def close(self):
+        '''
+        Stop the flusher, flushing what is recorded since the last summary
+        '''
+        if not self.stopped.is_set():
+            self.stopped.set()
+            self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def take_summary(self):
+        '''
+        Returns the summary of the metrics since the last one, and starts over
+        '''
+        with self.lock:
+            counters, self.counters = self.counters, dict()
+            histograms, self.histograms = self.histograms, dict()
+            gauges = dict(self.gauges)
+        now = time.time()
+        interval = max(now - self.last_flush, 1e-6)
+        self.last_flush = now
+
+        summary = {'time': now, 'elapsed': now - self.start_time, 'interval': interval}
+        for name, n in counters.iteritems():
+            summary[name] = {'count': n, 'per_sec': n / interval}
+        for name, value in gauges.iteritems():
+            summary[name] = {'value': value}
+        for name, values in histograms.iteritems():
+            summary[name] = summarize(values)
+        return summary
+
+    def _flush(self):
+        summary = self.take_summary()
+        try:
+            with open(self.filename, 'a') as f:
+                if self.csv:
+                    t = '{:.3f}'.format(summary['time'])
+                    for name in sorted(summary):
+                        if isinstance(summary[name], dict):
+                            for field in sorted(summary[name]):
+                                f.write('{},{},{},{}\n'.format(t, name, field, summary[name][field]))
+                else:
+                    f.write(json.dumps(summary, sort_keys=True) + '\n')
+        except IOError:
+            logger.exception('failed to write the metrics to %s', self.filename)
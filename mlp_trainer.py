@@ -0,0 +1,314 @@
+# !/usr/bin/python
+
+# Train the AI player with a small neural network approximating Q(s, a) of the continuous state (dx, dy, vy),
+# the one trainer.get_state quantizes. The transitions are kept in a replay buffer, and the network is
+# trained on minibatches of them toward the targets of a target network, which follows it every few updates.
+
+from __future__ import division
+import argparse
+import os
+import time
+
+import numpy as np
+
+from flappy_bird import flappy_bird_game
+from game_config import default_config
+from environment import flappy_bird_env
+from trainer import get_distances
+from null_display import null_display
+
+import logging
+from log_setup import get_logger
+
+logger = get_logger('flappy_bird.mlp_trainer')
+
+class mlp(object):
+    '''
+    A fully connected network with ReLU hidden layers and a linear output, trained with Adam.
+    All passes take a batch of inputs, in rows
+    '''
+    def __init__(self, sizes, seed=0):
+        rng = np.random.RandomState(seed)
+        self.weights = [rng.randn(a, b) * np.sqrt(2.0 / a) for a, b in zip(sizes[:-1], sizes[1:])]
+        self.biases = [np.zeros(b) for b in sizes[1:]]
+        self.adam_m = [np.zeros_like(p) for p in self.weights + self.biases]
+        self.adam_v = [np.zeros_like(p) for p in self.weights + self.biases]
+        self.adam_t = 0
+
+    def forward(self, x):
+        '''
+        Returns the outputs, and the activations of each layer for backward
+        '''
+        activations = [x]
+        for i in xrange(len(self.weights)):
+            x = x.dot(self.weights[i]) + self.biases[i]
+            if i < len(self.weights) - 1:
+                x = np.maximum(x, 0.0)
+            activations.append(x)
+        return x, activations
+
+    def backward(self, activations, d_out):
+        '''
+        Returns the gradients of the weights and the biases, given the gradient of the outputs
+        '''
+        d_weights = [None] * len(self.weights)
+        d_biases = [None] * len(self.biases)
+        d = d_out
+        for i in reversed(xrange(len(self.weights))):
+            d_weights[i] = activations[i].T.dot(d)
+            d_biases[i] = d.sum(axis=0)
+            if i > 0:
+                d = d.dot(self.weights[i].T) * (activations[i] > 0)
+        return d_weights, d_biases
+
+    def apply_gradients(self, d_weights, d_biases, learning_rate, beta1=0.9, beta2=0.999, eps=1e-8):
+        self.adam_t += 1
+        params = self.weights + self.biases
+        grads = d_weights + d_biases
+        correction = np.sqrt(1 - beta2 ** self.adam_t) / (1 - beta1 ** self.adam_t)
+        for i in xrange(len(params)):
+            self.adam_m[i] = beta1 * self.adam_m[i] + (1 - beta1) * grads[i]
+            self.adam_v[i] = beta2 * self.adam_v[i] + (1 - beta2) * grads[i] ** 2
+            params[i] -= learning_rate * correction * self.adam_m[i] / (np.sqrt(self.adam_v[i]) + eps)
+
+    def copy_from(self, other):
+        self.weights = [w.copy() for w in other.weights]
+        self.biases = [b.copy() for b in other.biases]
+
+class replay_buffer(object):
+    '''
+    The latest capacity transitions (state, action, reward, next state, done), in preallocated arrays
+    '''
+    def __init__(self, capacity, state_size=3):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size))
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity)
+        self.next_states = np.zeros((capacity, state_size))
+        self.dones = np.zeros(capacity)
+        self.size = 0
+        self.next_idx = 0
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.next_idx
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.next_idx = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size, rng):
+        idx = rng.randint(0, self.size, batch_size)
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.dones[idx]
+
+class mlp_trainer:
+    '''
+    Q-learning with a neural network of the continuous state. The actions are 0 (no jump) and 1 (jump)
+    '''
+    weight_file = 'data/mlp_weights.npz'
+    actions = [False, True]
+
+    def __init__(self, config=default_config, hidden_sizes=(32, 32), seed=0):
+        '''
+        config: the game_config of the games played and trained
+        '''
+        self.config = config
+        self.gamma = 0.98               # discount of the future rewards
+        self.learning_rate = 1e-3
+        self.batch_size = 256
+        self.train_every = 4            # moves between minibatch updates
+        self.target_sync = 500          # updates between copies of the network to the target network
+        self.epsilon_start = 1.0        # probability of a random action, decayed linearly over epsilon_steps moves
+        self.epsilon_end = 0.02
+        self.epsilon_steps = 50000
+        self.display = None
+
+        self.rng = np.random.RandomState(seed)
+        self.net = mlp((3,) + tuple(hidden_sizes) + (len(mlp_trainer.actions),), seed)
+        self.target_net = mlp((3,) + tuple(hidden_sizes) + (len(mlp_trainer.actions),), seed)
+        self.load_weights()
+        self.target_net.copy_from(self.net)
+        self.replay = replay_buffer(100000)
+        self.env = flappy_bird_env(config=config, seed=seed)
+        self.n_moves = 0
+        self.n_updates = 0
+
+        # the inputs are scaled to about [-1, 1]
+        mins = np.array([config.dx_min, config.dy_min, config.vy_min])
+        maxs = np.array([config.dx_max, config.dy_max, config.vy_max])
+        self.input_center = (maxs + mins) / 2.0
+        self.input_scale = 2.0 / (maxs - mins)
+
+    def load_weights(self):
+        if os.path.isfile(mlp_trainer.weight_file):
+            data = np.load(mlp_trainer.weight_file)
+            n_layers = len(self.net.weights)
+            if all('w{}'.format(i) in data and data['w{}'.format(i)].shape == self.net.weights[i].shape for i in xrange(n_layers)):
+                self.net.weights = [data['w{}'.format(i)] for i in xrange(n_layers)]
+                self.net.biases = [data['b{}'.format(i)] for i in xrange(n_layers)]
+                print 'Loaded weights from', mlp_trainer.weight_file
+            else:
+                print 'The weights in {} are of another network. Start from random weights'.format(mlp_trainer.weight_file)
+        else:
+            print 'No weight file available. Start from random weights'
+
+    def store_weights(self):
+        arrays = dict()
+        for i in xrange(len(self.net.weights)):
+            arrays['w{}'.format(i)] = self.net.weights[i]
+            arrays['b{}'.format(i)] = self.net.biases[i]
+        np.savez(mlp_trainer.weight_file, **arrays)
+
+    def get_epsilon(self):
+        fraction = min(self.n_moves / self.epsilon_steps, 1.0)
+        return self.epsilon_start + fraction * (self.epsilon_end - self.epsilon_start)
+
+    def get_q_values(self, states):
+        '''
+        Returns the Q-values of a batch of states, in rows of the actions
+        '''
+        q, _ = self.net.forward((states - self.input_center) * self.input_scale)
+        return q
+
+    def get_action_values(self, game):
+        '''
+        Returns the actions and their Q-values at the game's state, like lookahead_planner.get_action_values
+        '''
+        state = get_distances(game, training=False)
+        q = self.get_q_values(np.array([state]))[0]
+        return mlp_trainer.actions, list(q)
+
+    def get_action(self, game):
+        _, values = self.get_action_values(game)
+        return mlp_trainer.actions[int(np.argmax(values))]
+
+    def train(self, n_moves):
+        '''
+        Play n_moves moves, epsilon-greedy, training on a minibatch every train_every moves.
+        Returns the scores of the games finished
+        '''
+        env = self.env
+        if env.game is None or env.game.is_game_over:
+            env.reset()
+        state = env.buffer.copy()
+        scores = []
+        for _ in xrange(n_moves):
+            if self.rng.rand() < self.get_epsilon():
+                action = self.rng.randint(len(mlp_trainer.actions))
+            else:
+                action = int(np.argmax(self.get_q_values(state[np.newaxis])[0]))
+            next_state, reward, done, info = env.step(mlp_trainer.actions[action])
+            self.replay.add(state, action, reward, next_state, done)
+            self.n_moves += 1
+            if done:
+                scores.append(info['score'])
+                state = env.reset().copy()
+            else:
+                state = next_state.copy()
+            if self.n_moves % self.train_every == 0 and self.replay.size >= self.batch_size:
+                self.update()
+        return scores
+
+    def update(self):
+        '''
+        One gradient step on a minibatch of the replay buffer. Returns the loss
+        '''
+        states, actions, rewards, next_states, dones = self.replay.sample(self.batch_size, self.rng)
+        q_next, _ = self.target_net.forward((next_states - self.input_center) * self.input_scale)
+        targets = rewards + self.gamma * (1 - dones) * q_next.max(axis=1)
+
+        q, activations = self.net.forward((states - self.input_center) * self.input_scale)
+        rows = np.arange(self.batch_size)
+        errors = q[rows, actions] - targets
+        # gradient of the Huber loss, averaged over the batch
+        d_out = np.zeros_like(q)
+        d_out[rows, actions] = np.clip(errors, -1.0, 1.0) / self.batch_size
+        d_weights, d_biases = self.net.backward(activations, d_out)
+        self.net.apply_gradients(d_weights, d_biases, self.learning_rate)
+
+        self.n_updates += 1
+        if self.n_updates % self.target_sync == 0:
+            self.target_net.copy_from(self.net)
+        return float(np.mean(errors ** 2))
+
+    def evaluate(self, n_games=10, max_score=500):
+        '''
+        Play n games greedily, and returns their scores. A game stops at max_score
+        '''
+        scores = []
+        for _ in xrange(n_games):
+            game = flappy_bird_game(config=self.config)
+            while not game.is_game_over and game.score < max_score:
+                game.move(self.get_action(game))
+            scores.append(game.score)
+        return scores
+
+    def get_graphic_display(self, game):
+        '''
+        Returns the graphic display showing the game. The display is created once and re-bound to later games
+        '''
+        if self.display is None:
+            # import on demand, so that the headless modes don't load pygame
+            from graphic_display import graphic_display
+            self.display = graphic_display(game)
+        else:
+            self.display.bind(game)
+        return self.display
+
+    def play(self, delay_in_not_silent_mode=0.15, silent_mode=False):
+        '''
+        Play the game with the network
+        '''
+        game = flappy_bird_game(config=self.config)
+        if silent_mode:
+            display = null_display(game, 1000)
+        else:
+            display = self.get_graphic_display(game)
+        while not game.is_game_over:
+            game.move(self.get_action(game))
+            if not silent_mode:
+                time.sleep(delay_in_not_silent_mode)
+            display.update_display()
+        print 'Score: ', game.score
+
+    def _prompt(self):
+        print 'Select from following options:'
+        print ' x: quit'
+        print ' p: play the game with the network'
+        print ' ps: play the game in silent mode'
+        print ' e: evaluate 10 games, each up to 500 points'
+        print ' s: store the weights'
+        print ' <n>: train n moves'
+        user_input = raw_input('What do you want to do:')
+        return user_input
+
+    def run(self):
+        '''
+        run the trainer functions
+        '''
+        user_input = self._prompt()
+        while user_input != 'x':
+            if user_input == 's':
+                self.store_weights()
+                print 'Stored weights to', mlp_trainer.weight_file
+            elif user_input == 'p':
+                self.play()
+            elif user_input == 'ps':
+                self.play(silent_mode=True)
+            elif user_input == 'e':
+                print 'Scores: ', self.evaluate()
+            elif user_input.isdigit():
+                start = time.time()
+                scores = self.train(int(user_input))
+                print 'Trained {} moves in {:.1f}s, {} games, epsilon {:.2f}, mean score {:.2f}'.format(
+                    user_input, time.time() - start, len(scores), self.get_epsilon(),
+                    sum(scores) / len(scores) if scores else 0.0)
+            user_input = self._prompt()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Train the AI player with a neural network Q-function')
+    parser.parse_args()
+    trainer = mlp_trainer()
+    trainer.run()
@@ -0,0 +1,63 @@
+# Kinematics of the bird in the vertical direction
+#
+# The bird has a constant acceleration, except when it jumps, which sets its speed to a fixed value.
+# The step function integrates one move, optionally in sub-steps. The closed-form functions give
+# the state after k moves without jumping in O(1), so that planners can skip ahead instead of looping
+
+from __future__ import division
+import math
+
+def step(y, vy, dt, yaccelation, jumped=False, yspeed_after_jump=0.0, substeps=1):
+    '''
+    Returns (y, vy) after dt, integrated with trapezoidal averaging of the speed.
+    If jumped, the speed ends the move at yspeed_after_jump instead of accelerating. The sub-steps follow the same
+    straight change of the speed, so that every number of sub-steps ends the move at the same (y, vy)
+    '''
+    if substeps == 1:
+        vy_old = vy
+        vy += yaccelation * dt
+        if jumped:
+            vy = yspeed_after_jump
+        return y + (vy_old + vy) / 2.0 * dt, vy
+    
+    h = dt / substeps
+    vy_start = vy
+    for i in xrange(substeps):
+        vy_old = vy
+        if jumped:
+            vy = vy_start + (yspeed_after_jump - vy_start) * (i + 1) / substeps
+        else:
+            vy += yaccelation * h
+        y += (vy_old + vy) / 2.0 * h
+    return y, vy
+
+def advance(y, vy, dt, k, yaccelation):
+    '''
+    Returns (y, vy) after k moves of dt without jumping.
+    With constant acceleration the trapezoidal steps are exact, so this equals looping step() k times
+    up to rounding, which it accumulates less of
+    '''
+    t = k * dt
+    return y + vy * t + 0.5 * yaccelation * t * t, vy + yaccelation * t
+
+def steps_until_below(y, vy, dt, yaccelation, y_min):
+    '''
+    Returns the number of moves without jumping until y <= y_min, or None if that never happens.
+    yaccelation is gravity, thus not positive
+    '''
+    if y <= y_min:
+        return 0
+    if yaccelation == 0:
+        if vy >= 0:
+            return None
+        return int(math.ceil((y_min - y) / (vy * dt)))
+    # y + vy*t + a*t^2/2 = y_min. With a < 0 the later root is when the bird falls through y_min
+    discriminant = vy * vy - 2 * yaccelation * (y - y_min)
+    t = (-vy - math.sqrt(discriminant)) / yaccelation
+    k = int(math.ceil(t / dt - 1e-9))
+    # guard against rounding at the boundary
+    while k > 0 and advance(y, vy, dt, k - 1, yaccelation)[0] <= y_min:
+        k -= 1
+    while advance(y, vy, dt, k, yaccelation)[0] > y_min:
+        k += 1
+    return k
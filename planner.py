@@ -0,0 +1,117 @@
+# Depth-limited lookahead search for the AI player
+
+from __future__ import division
+import time
+
+import logging
+from log_setup import get_logger
+
+logger = get_logger('flappy_bird.planner')
+
+class _out_of_time(Exception):
+    pass
+
+def distance_to_gap(game):
+    '''
+    A leaf value: the negative vertical distance of the bird to the center of the next gap
+    '''
+    for p in game.pillars:
+        _, p_x_max = p.get_x_range()
+        if p_x_max > game.bird.x:
+            gap_y_min, gap_y_max = p.get_gap_y_range()
+            return -abs(game.bird.y + game.bird_size/2.0 - (gap_y_min + gap_y_max)/2.0)
+    return 0.0
+
+class lookahead_planner:
+    '''
+    Search the game tree a number of moves ahead and pick the action with the max value.
+    
+    * The value of a path is the sum of score_value for each pillar passed, plus death_value if the bird
+      dies, or leaf_value of the game at the end of the path
+    * Branches where the game is over are not expanded further
+    * States are memoized by their quantized bird position and speed. At the same depth all the
+      branches have the same x, thus the same pillars and score
+    * The search deepens iteratively until max_depth, or until the time budget for the decision runs out.
+      The values of the deepest finished iteration are used
+      
+    * With prefer_later_death, a death is worth 1 less for each move it comes earlier, so that the bird
+      dies later rather than sooner when it can't survive
+      
+    death_value and leaf_value can be numbers or functions of the game
+    '''
+    def __init__(self, max_depth=12, time_budget=0.05, leaf_value=distance_to_gap, death_value=-100.0, score_value=100.0,
+                 stop_at_score=False, quantum=0.001, prefer_later_death=True):
+        self.max_depth = max_depth
+        self.time_budget = time_budget      # seconds per decision
+        self.leaf_value = leaf_value
+        self.death_value = death_value
+        self.score_value = score_value
+        self.stop_at_score = stop_at_score  # do not search beyond the first score, e.g. for training sessions
+        self.quantum = quantum
+        self.prefer_later_death = prefer_later_death
+        
+        # statistics of the last decision
+        self.depth_reached = 0
+        self.nodes_expanded = 0
+        
+    def get_action(self, game):
+        '''
+        Returns the action with the max value
+        '''
+        actions, values = self.get_action_values(game)
+        max_value = max(values)
+        return actions[values.index(max_value)]
+    
+    def get_action_values(self, game):
+        '''
+        Returns the legal actions and their values
+        '''
+        actions = game.get_legal_actions()
+        deadline = time.time() + self.time_budget
+        self.nodes_expanded = 0
+        values = None
+        for depth in xrange(1, self.max_depth+1):
+            memo = {}
+            try:
+                values = [self._get_action_value(game, a, depth, memo, deadline) for a in actions]
+            except _out_of_time:
+                break
+            self.depth_reached = depth
+        if values is None:
+            # not even one move could be searched in time; still decide with one move lookahead
+            values = [self._get_action_value(game, a, 1, {}, None) for a in actions]
+            self.depth_reached = 1
+        return actions, values
+    
+    def _get_action_value(self, game, action, depth, memo, deadline):
+        new_game = game.clone_game()
+        new_game.move(action)
+        self.nodes_expanded += 1
+        value = 0.0
+        if new_game.just_scored:
+            value += self.score_value
+            if self.stop_at_score:
+                return value
+        if new_game.is_game_over:
+            value += self._value(self.death_value, new_game)
+            if self.prefer_later_death:
+                value -= depth      # die later rather than sooner
+            return value
+        return value + self._search(new_game, depth-1, memo, deadline)
+    
+    def _search(self, game, depth, memo, deadline):
+        if depth == 0:
+            return self._value(self.leaf_value, game)
+        if deadline is not None and time.time() > deadline:
+            raise _out_of_time()
+        key = (depth, int(round(game.bird.y/self.quantum)), int(round(game.bird.yspeed/self.quantum)))
+        value = memo.get(key, None)
+        if value is None:
+            value = max(self._get_action_value(game, a, depth, memo, deadline) for a in game.get_legal_actions())
+            memo[key] = value
+        return value
+        
+    def _value(self, v, game):
+        if callable(v):
+            return v(game)
+        return v
@@ -4,18 +4,12 @@
 # Reference http://karpathy.github.io/2016/05/31/rl/
 
 from __future__ import division
-from flappy_bird import flappy_bird_game, bird
-from graphic_display import graphic_display
 import time
-import pygame
 
-from matplotlib import pyplot as plt
+import logging
+from log_setup import get_logger
 
-
-import logging.config
-
-logging.config.fileConfig('logging.conf')
-logger = logging.getLogger('flappy_bird.policy_gradiants')
+logger = get_logger('flappy_bird.policy_gradiants')
 
 class policy_gradiants_trainer:
     '''
@@ -33,15 +27,15 @@ class policy_gradiants_trainer:
         '''
         Train the AI player using the algorithm
         '''
-        game = flappy_bird_game()
-        display = graphic_display(game)
+        # import on demand, so that importing the module doesn't load numpy
+        from environment import flappy_bird_env
+        env = flappy_bird_env(observation='pixels')
+        p = env.reset()
+        done = False
 
-        while not game.is_game_over:
+        while not done:
             action = False
-            game.move(action)
-            display.update_display()
-
-            p = display.get_image_pixels()
+            p, reward, done, _ = env.step(action)
             self.display_image(p)
             time.sleep(delay_in_not_silent_mode)
 
@@ -49,8 +43,9 @@ class policy_gradiants_trainer:
         '''
         Display the image
         '''
+        from matplotlib import pyplot as plt
         print pixels.shape
-        plt.imshow(pixels)
+        plt.imshow(pixels, cmap='gray')
         plt.show(block=False)
         time.sleep(5)
         plt.close()
@@ -0,0 +1,362 @@
+# !/usr/bin/python
+
+# A local server answering the action requests of many game clients with one copy of the model
+#
+# The models value the states after each action, like trainer.get_action_value and
+# feature_trainer.selection_action_with_max_value do. A client sends the rows of those states, and the
+# server collects the requests of all clients into micro-batches, up to max_batch rows or until the
+# oldest request has waited latency_budget seconds, and values each batch with array lookups.
+#
+# Wire format: every message is a 4-byte big-endian length and the payload. On connect the server sends
+# JSON of the model kind and params. A request is float64 rows of 4 columns, the reply float64 values.
+
+from __future__ import division
+import argparse
+import collections
+import json
+import os
+import Queue
+import random
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from game_config import default_config
+from trainer import trainer, get_distances
+from feature_trainer import feature_trainer, get_feature_values
+
+import logging
+from log_setup import get_logger
+
+logger = get_logger('flappy_bird.policy_server')
+
+default_address = '/tmp/flappy_bird_policy.sock'
+
+_header = struct.Struct('!I')
+
+# the kinds of the states of the Q-table rows, as the last column
+_alive, _dead, _scored = 0, 1, 2
+
+def _send(sock, payload):
+    sock.sendall(_header.pack(len(payload)) + payload)
+
+def _recv_exact(sock, n):
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(n)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        n -= len(chunk)
+    return ''.join(chunks)
+
+def _recv(sock):
+    '''
+    Returns the payload of the next message, or None if the connection is closed
+    '''
+    header = _recv_exact(sock, _header.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, _header.unpack(header)[0])
+
+def _create_socket(address):
+    '''
+    Returns the socket and its address: a Unix socket for a path, TCP for host:port
+    '''
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM), (host, int(port))
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address
+
+class qtable_model(object):
+    '''
+    The Q-table of a trainer with fixed bins, as a dense array of the values of the states of each kind
+    '''
+    kind = 'qtable'
+
+    def __init__(self, t):
+        states = [key[0] for key in t.QTable]
+        if any(not isinstance(state, tuple) for state in states):
+            raise ValueError('only Q-tables of fixed bins can be served')
+        self.mins = np.array(t.get_state_mins())
+        self.steps = np.array([t.step_dx, t.step_dy, t.step_dvy])
+        self.lo = np.array([min(s[d] for s in states) for d in xrange(3)], dtype=np.int64) if states else np.zeros(3, dtype=np.int64)
+        hi = np.array([max(s[d] for s in states) for d in xrange(3)], dtype=np.int64) if states else np.zeros(3, dtype=np.int64)
+        self.shape = hi - self.lo + 1
+        # the missing entries are 0, as in trainer.get_action_value
+        jump = np.zeros(tuple(self.shape))
+        no_jump = np.zeros(tuple(self.shape))
+        self.values = np.zeros((3,) + tuple(self.shape))
+        for (state, action), value in t.QTable.iteritems():
+            idx = tuple(np.array(state, dtype=np.int64) - self.lo)
+            if action == 'x':
+                self.values[(_dead,) + idx] = value
+            elif action == 's':
+                self.values[(_scored,) + idx] = value
+            elif action:
+                jump[idx] = value
+            else:
+                no_jump[idx] = value
+        self.values[_alive] = np.maximum(jump, no_jump)
+
+    def get_params(self):
+        return dict()
+
+    def evaluate(self, rows):
+        '''
+        Returns the values of the rows (dx, dy, vy, kind)
+        '''
+        idx = np.floor((rows[:, :3] - self.mins) / self.steps).astype(np.int64) - self.lo
+        inside = ((idx >= 0) & (idx < self.shape)).all(axis=1)
+        values = np.zeros(len(rows))
+        i = idx[inside]
+        values[inside] = self.values[rows[inside, 3].astype(np.int64), i[:, 0], i[:, 1], i[:, 2]]
+        return values
+
+class feature_model(object):
+    '''
+    The weights of a feature_trainer
+    '''
+    kind = 'feature'
+
+    def __init__(self, ft):
+        self.gap_baseline = ft.gap_baseline
+        self.weights = (ft.w_dy_to_center, ft.w_dy_to_gap_baseline, ft.w_dy_to_gap_baseline_in_gap)
+
+    def get_params(self):
+        return {'gap_baseline': self.gap_baseline}
+
+    def evaluate(self, rows):
+        '''
+        Returns the values of the rows (dy, dy_gap, dy_gap_in_gap, 0)
+        '''
+        # in the order of feature_trainer.get_value, so that the values are the same
+        return self.weights[0] * rows[:, 0] + self.weights[1] * rows[:, 1] + self.weights[2] * rows[:, 2]
+
+def load_model(kind, config=default_config):
+    '''
+    Returns the model of the kind, loaded from its file in data/
+    '''
+    if kind == 'qtable':
+        return qtable_model(trainer(config=config))
+    return feature_model(feature_trainer(config))
+
+class policy_server(object):
+    '''
+    Serves the model to the clients connecting to the address
+    '''
+    def __init__(self, model, address=default_address, max_batch=256, latency_budget=0.002, n_latencies=10000):
+        '''
+        max_batch: rows of a batch, more if one request is larger
+        latency_budget: seconds the oldest request of a batch waits for more requests
+        n_latencies: the latencies of this many latest requests are kept for the percentiles
+        '''
+        self.model = model
+        self.address = address
+        self.max_batch = max_batch
+        self.latency_budget = latency_budget
+        self.requests = Queue.Queue()
+        self.latencies = collections.deque(maxlen=n_latencies)
+        self.n_requests = 0
+        self.n_rows = 0
+        self.n_batches = 0
+        self.start_time = None
+        self.listening = threading.Event()
+        self.stopped = False
+        self.sock = None
+
+    def start(self):
+        '''
+        Serve in background threads. Returns once the server is listening
+        '''
+        thread = threading.Thread(target=self.serve_forever, name='policy-server')
+        thread.daemon = True
+        thread.start()
+        self.listening.wait()
+
+    def serve_forever(self):
+        self.sock, address = _create_socket(self.address)
+        if self.sock.family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)
+        else:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(address)
+        self.sock.listen(64)
+        self.start_time = time.time()
+        batcher = threading.Thread(target=self._run_batches, name='policy-batcher')
+        batcher.daemon = True
+        batcher.start()
+        logger.info('serving the %s model at %s', self.model.kind, self.address)
+        self.listening.set()
+        while not self.stopped:
+            try:
+                conn, _ = self.sock.accept()
+            except socket.error:
+                break
+            handler = threading.Thread(target=self._handle, args=(conn,), name='policy-connection')
+            handler.daemon = True
+            handler.start()
+
+    def stop(self):
+        self.stopped = True
+        self.requests.put(None)
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self.sock.close()
+
+    def _handle(self, conn):
+        '''
+        Answer the requests of one client until it disconnects
+        '''
+        try:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (socket.error, AttributeError):
+            pass
+        try:
+            _send(conn, json.dumps({'model': self.model.kind, 'params': self.model.get_params()}))
+            while True:
+                payload = _recv(conn)
+                if payload is None:
+                    break
+                request = {'rows': np.frombuffer(payload, dtype=np.float64).reshape(-1, 4),
+                           'received': time.time(), 'done': threading.Event(), 'values': None}
+                self.requests.put(request)
+                request['done'].wait()
+                _send(conn, request['values'].tostring())
+        except socket.error:
+            logger.debug('client disconnected', exc_info=True)
+        finally:
+            conn.close()
+
+    def _run_batches(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            batch = [request]
+            n_rows = len(request['rows'])
+            deadline = request['received'] + self.latency_budget
+            while n_rows < self.max_batch:
+                try:
+                    # the requests waiting already, then the ones coming within the budget
+                    timeout = deadline - time.time()
+                    if timeout > 0:
+                        request = self.requests.get(timeout=timeout)
+                    else:
+                        request = self.requests.get_nowait()
+                except Queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)
+                    break
+                batch.append(request)
+                n_rows += len(request['rows'])
+
+            values = self.model.evaluate(np.concatenate([r['rows'] for r in batch]))
+            self.n_requests += len(batch)
+            self.n_rows += n_rows
+            self.n_batches += 1
+            start = 0
+            now = time.time()
+            for r in batch:
+                end = start + len(r['rows'])
+                r['values'] = values[start:end]
+                start = end
+                self.latencies.append(now - r['received'])
+                r['done'].set()
+
+    def get_stats(self):
+        '''
+        Returns the requests and batches served, requests/sec, and p50/p99 of the latest decision latencies in ms
+        '''
+        latencies = sorted(self.latencies)
+        elapsed = time.time() - self.start_time if self.start_time is not None else 0.0
+        stats = {'requests': self.n_requests, 'batches': self.n_batches,
+                 'requests_per_sec': self.n_requests / elapsed if elapsed > 0 else 0.0,
+                 'rows_per_batch': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0}
+        if self.n_batches > 0:
+            stats['rows_per_batch'] = self.n_rows / self.n_batches
+        if latencies:
+            stats['p50_ms'] = 1000 * latencies[int(0.5 * (len(latencies) - 1))]
+            stats['p99_ms'] = 1000 * latencies[int(0.99 * (len(latencies) - 1))]
+        return stats
+
+def get_afterstate_rows(game, kind, params):
+    '''
+    Returns the legal actions of the game, and the rows of the states after each, of the model kind
+    '''
+    actions = game.get_legal_actions()
+    rows = np.zeros((len(actions), 4))
+    for i, action in enumerate(actions):
+        new_game = game.clone_game()
+        new_game.move(action)
+        if kind == 'qtable':
+            rows[i, :3] = get_distances(new_game, False)
+            if new_game.is_game_over:
+                rows[i, 3] = _dead
+            elif new_game.just_scored:
+                rows[i, 3] = _scored
+        else:
+            rows[i, :3] = get_feature_values(new_game, params['gap_baseline'])
+    return actions, rows
+
+class policy_client(object):
+    '''
+    A policy whose values come from the policy server. It plugs into the play loops of the trainers,
+    like a lookahead_planner
+    '''
+    def __init__(self, address=default_address):
+        self.sock, address = _create_socket(address)
+        self.sock.connect(address)
+        if self.sock.family != socket.AF_UNIX:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        info = json.loads(_recv(self.sock))
+        self.kind = info['model']
+        self.params = info['params']
+
+    def get_action_values(self, game):
+        '''
+        Returns the legal actions and their values
+        '''
+        actions, rows = get_afterstate_rows(game, self.kind, self.params)
+        _send(self.sock, rows.tostring())
+        values = np.frombuffer(_recv(self.sock), dtype=np.float64)
+        return actions, [float(v) for v in values]
+
+    def get_action(self, game):
+        '''
+        Returns an action with the max value, a random one of them if several
+        '''
+        actions, values = self.get_action_values(game)
+        max_value = max(values)
+        return random.choice([actions[i] for i in xrange(len(actions)) if values[i] == max_value])
+
+    def close(self):
+        self.sock.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Serve the actions of a learned model to game clients')
+    parser.add_argument('--model', choices=['qtable', 'feature'], default='qtable')
+    parser.add_argument('--address', default=default_address, help='path of a Unix socket, or host:port (default=%(default)s)')
+    parser.add_argument('--max-batch', type=int, default=256, help='rows of a batch (default=%(default)s)')
+    parser.add_argument('--latency-budget-ms', type=float, default=2.0,
+                        help='ms the oldest request of a batch waits for more (default=%(default)s)')
+    parser.add_argument('--report-interval', type=float, default=10.0, help='seconds between the stats (default=%(default)s)')
+    args = parser.parse_args()
+
+    server = policy_server(load_model(args.model), args.address, args.max_batch, args.latency_budget_ms / 1000.0)
+    server.start()
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            stats = server.get_stats()
+            print '{requests} requests, {requests_per_sec:.0f}/s, {batches} batches, p50 {p50_ms:.2f}ms p99 {p99_ms:.2f}ms'.format(**stats)
+    except KeyboardInterrupt:
+        server.stop()
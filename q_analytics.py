@@ -0,0 +1,300 @@
+# !/usr/bin/python
+
+# Analytics of the Q-table, on its entries as arrays instead of iterating the dict:
+#   value_distribution: the count, signs and percentiles of the values of each action
+#   get_coverage: the bins of each dimension with entries, and the states of the grid covered
+#   greedy_policy / policy_disagreement: the action of each state, and where two tables choose differently
+#   diff_tables: the entries added, removed and changed between two tables, e.g. two checkpoints
+#   render_heatmaps / write_png: (dx, dy) maps per vy slice, side by side, written to PNG with zlib
+# The per-state analytics need the fixed bins, whose states are (state_x, state_y, state_vy).
+
+from __future__ import division
+import argparse
+import itertools
+import operator
+import struct
+import zlib
+
+import numpy as np
+
+actions = [False, True, 'x', 's']
+action_names = ['no_jump', 'jump', 'dead', 'scored']
+dimension_names = ['dx', 'dy', 'vy']
+_action_codes = {False: 0, True: 1, 'x': 2, 's': 3}
+# a state (state_x, state_y, state_vy) as 3 doubles
+_state_struct = struct.Struct('ddd')
+
+# colors of the heatmaps
+missing_color = (96, 96, 96)
+gap_color = (0, 0, 0)
+policy_colors = {-1: missing_color, 0: (70, 110, 200), 1: (240, 200, 40)}     # undecided, no jump, jump
+disagreement_colors = {-1: missing_color, 0: (235, 235, 235), 1: (220, 40, 40)}
+
+class q_table_arrays(object):
+    '''
+    The entries of a Q-table: states (n, 3) of bin indices, or None if the states aren't fixed bins,
+    action codes (n,) indexing actions, and values (n,)
+    '''
+    def __init__(self, table):
+        n = len(table)
+        self.values = np.fromiter(table.itervalues(), np.float64, n)
+        if n == 0:
+            self.states = np.zeros((0, 3), dtype=np.int64)
+            self.actions = np.zeros(0, dtype=np.int8)
+            return
+        # keys() is in the order of itervalues() as the table isn't changed in between
+        keys = table.keys()
+        self.actions = np.fromiter(map(_action_codes.get, map(operator.itemgetter(1), keys)), np.int8, n)
+        if isinstance(keys[0][0], tuple):
+            # packed into one string, which converts faster than the tuples
+            packed = ''.join(itertools.starmap(_state_struct.pack, itertools.imap(operator.itemgetter(0), keys)))
+            self.states = np.frombuffer(packed, np.float64).reshape(n, 3).astype(np.int64)
+        else:
+            self.states = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def get_nbytes(self):
+        return self.values.nbytes + self.actions.nbytes + (self.states.nbytes if self.states is not None else 0)
+
+def get_bin_range(t, *tables):
+    '''
+    Returns the lowest and highest bins of each dimension of the state ranges of the trainer t, extended to
+    the states of the q_table_arrays tables. The trainer keeps entries outside the ranges, e.g. state_x -1
+    of the deaths past the pillar
+    '''
+    mins = np.array(t.get_state_mins())
+    steps = np.array([t.step_dx, t.step_dy, t.step_dvy])
+    lo = np.zeros(3, dtype=np.int64)
+    hi = np.floor((np.array(t.get_state_maxs()) - mins) / steps).astype(np.int64)
+    for arrays in tables:
+        if arrays.states is not None and len(arrays):
+            lo = np.minimum(lo, arrays.states.min(axis=0))
+            hi = np.maximum(hi, arrays.states.max(axis=0))
+    return lo, hi
+
+def value_distribution(arrays):
+    '''
+    Returns {action name: count, negative, zero, positive, min, p5, p50, p95, max} of the values of each action
+    '''
+    distribution = {}
+    for code, name in enumerate(action_names):
+        values = arrays.values[arrays.actions == code]
+        d = {'count': len(values), 'negative': int((values < 0).sum()), 'zero': int((values == 0).sum()),
+             'positive': int((values > 0).sum())}
+        if len(values):
+            d['min'], d['p5'], d['p50'], d['p95'], d['max'] = [float(v) for v in np.percentile(values, [0, 5, 50, 95, 100])]
+        distribution[name] = d
+    return distribution
+
+def get_coverage(arrays, lo, hi):
+    '''
+    Returns {dimension name: (entries per bin from lo to hi, bins with entries)}, and 'states': the states
+    of the grid lo..hi with entries, of the grid size, and 'outside': the entries outside the grid
+    '''
+    states = arrays.states
+    inside = ((states >= lo) & (states <= hi)).all(axis=1)
+    coverage = {}
+    for d, name in enumerate(dimension_names):
+        counts = np.bincount(states[inside, d] - lo[d], minlength=hi[d] - lo[d] + 1)
+        coverage[name] = (counts, int((counts > 0).sum()))
+    shape = tuple(hi - lo + 1)
+    cells = np.ravel_multi_index((states[inside] - lo).T, shape)
+    coverage['states'] = (int((np.bincount(cells, minlength=int(np.prod(shape))) > 0).sum()), int(np.prod(shape)))
+    coverage['outside'] = int((~inside).sum())
+    return coverage
+
+def get_dense(arrays, lo, hi):
+    '''
+    Returns the values in an array (actions, dx bins, dy bins, vy bins) of the grid lo..hi, NaN where missing
+    '''
+    shape = tuple(hi - lo + 1)
+    dense = np.full((len(actions),) + shape, np.nan)
+    inside = ((arrays.states >= lo) & (arrays.states <= hi)).all(axis=1)
+    idx = (arrays.states[inside] - lo).T
+    dense[(arrays.actions[inside],) + tuple(idx)] = arrays.values[inside]
+    return dense
+
+def greedy_policy(dense):
+    '''
+    Returns the action of each state of the grid: 1 jump, 0 no jump, -1 undecided, when the values are
+    equal or both missing. A missing value is 0, as in trainer.get_action_value
+    '''
+    no_jump, jump = dense[0], dense[1]
+    both_missing = np.isnan(no_jump) & np.isnan(jump)
+    no_jump = np.nan_to_num(no_jump)
+    jump = np.nan_to_num(jump)
+    policy = np.where(jump > no_jump, 1, 0)
+    policy[(jump == no_jump) | both_missing] = -1
+    return policy
+
+def policy_disagreement(policy_a, policy_b):
+    '''
+    Returns the map of the states: 1 where both policies decide and differ, 0 where they agree, -1 where
+    either is undecided, and the fraction of the decided states where they differ
+    '''
+    decided = (policy_a >= 0) & (policy_b >= 0)
+    disagreement = np.where(policy_a != policy_b, 1, 0)
+    disagreement[~decided] = -1
+    n_decided = decided.sum()
+    return disagreement, (disagreement == 1).sum() / n_decided if n_decided else 0.0
+
+def _encode_keys(arrays, lo, shape):
+    return np.ravel_multi_index((arrays.states - lo).T, shape) * len(actions) + arrays.actions
+
+def diff_tables(a, b, top=10):
+    '''
+    Compare the q_table_arrays a and b. Returns the entries added in b, removed from a, changed, the mean and max
+    absolute change of the common entries, and the top largest changes as [(state, action, value in a, value in b)]
+    '''
+    if a.states is None or b.states is None:
+        raise ValueError('only Q-tables of fixed bins can be compared')
+    states = np.concatenate([a.states, b.states])
+    lo = states.min(axis=0) if len(states) else np.zeros(3, dtype=np.int64)
+    shape = tuple(states.max(axis=0) - lo + 1) if len(states) else (1, 1, 1)
+    codes_a = _encode_keys(a, lo, shape)
+    codes_b = _encode_keys(b, lo, shape)
+    n_codes = int(np.prod(shape)) * len(actions)
+    if n_codes <= 8 * len(states):
+        # the position in b of each code, which is faster than sorting
+        positions = np.full(n_codes, -1, dtype=np.int64)
+        positions[codes_b] = np.arange(len(codes_b))
+        idx_a = np.flatnonzero(positions[codes_a] >= 0)
+        idx_b = positions[codes_a[idx_a]]
+        common = codes_a[idx_a]
+    else:
+        common, idx_a, idx_b = np.intersect1d(codes_a, codes_b, assume_unique=True, return_indices=True)
+    changes = b.values[idx_b] - a.values[idx_a]
+    abs_changes = np.abs(changes)
+    largest = np.argsort(-abs_changes)[:min(top, int((changes != 0).sum()))]
+    return {
+        'added': len(b) - len(common),
+        'removed': len(a) - len(common),
+        'changed': int((changes != 0).sum()),
+        'mean_abs_change': float(abs_changes.mean()) if len(common) else 0.0,
+        'max_abs_change': float(abs_changes.max()) if len(common) else 0.0,
+        'largest_changes': [(tuple(int(s) for s in a.states[idx_a[i]]), actions[a.actions[idx_a[i]]],
+                             float(a.values[idx_a[i]]), float(b.values[idx_b[i]])) for i in largest],
+    }
+
+def get_value_colors(grid):
+    '''
+    Returns the colors (..., 3) of a grid of values: blue below 0, red above 0, white at 0, gray where NaN
+    '''
+    finite = np.isfinite(grid)
+    scale = np.abs(grid[finite]).max() if finite.any() else 1.0
+    x = np.clip(np.nan_to_num(grid) / (scale or 1.0), -1.0, 1.0)
+    colors = np.empty(grid.shape + (3,), dtype=np.uint8)
+    colors[..., 0] = np.where(x < 0, 255 * (1 + x), 255)
+    colors[..., 1] = 255 * (1 - np.abs(x))
+    colors[..., 2] = np.where(x > 0, 255 * (1 - x), 255)
+    colors[~finite] = missing_color
+    return colors
+
+def get_category_colors(grid, palette):
+    colors = np.empty(grid.shape + (3,), dtype=np.uint8)
+    for value, color in palette.iteritems():
+        colors[grid == value] = color
+    return colors
+
+def render_heatmaps(colors, scale=8):
+    '''
+    Returns the image (rows, columns, 3) of the colors (dx bins, dy bins, vy bins, 3), a (dx, dy) map per vy slice
+    side by side from the lowest vy, dx to the right and dy upward. Each bin is scale x scale pixels
+    '''
+    n_dx, n_dy, n_vy = colors.shape[:3]
+    # (vy, dy from the top, dx) with a column of gap_color after each slice
+    tiles = np.empty((n_vy, n_dy, n_dx + 1, 3), dtype=np.uint8)
+    tiles[:, :, :n_dx] = colors.transpose(2, 1, 0, 3)[:, ::-1]
+    tiles[:, :, n_dx] = gap_color
+    image = tiles.transpose(1, 0, 2, 3).reshape(n_dy, n_vy * (n_dx + 1), 3)[:, :-1]
+    return image.repeat(scale, axis=0).repeat(scale, axis=1)
+
+def _png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+def write_png(filename, image):
+    '''
+    Write the RGB image (rows, columns, 3) of uint8 to a PNG file
+    '''
+    rows, columns = image.shape[:2]
+    pixels = image.reshape(rows, columns * 3)
+    # each row starts with its filter type: 0 (none) for the first, then 2 (up), the difference to the row above.
+    # The rows repeated by the scale of the heatmaps are then zeros, which compress fast, and well at the fastest level
+    raw = np.empty((rows, columns * 3 + 1), dtype=np.uint8)
+    raw[0, 0] = 0
+    raw[0, 1:] = pixels[0]
+    raw[1:, 0] = 2
+    np.subtract(pixels[1:], pixels[:-1], out=raw[1:, 1:])
+    with open(filename, 'wb') as f:
+        f.write('\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk('IHDR', struct.pack('>IIBBBBB', columns, rows, 8, 2, 0, 0, 0)))
+        f.write(_png_chunk('IDAT', zlib.compress(raw.tostring(), 1)))
+        f.write(_png_chunk('IEND', ''))
+
+def print_report(arrays, lo, hi):
+    '''
+    Print the value distribution and the coverage of the table
+    '''
+    print 'Q-table size: ', len(arrays)
+    distribution = value_distribution(arrays)
+    for name in action_names:
+        d = distribution[name]
+        if d['count'] == 0:
+            continue
+        print '{:8s} {} entries, {} < 0, {} == 0, {} > 0, min {:.2f}, p5 {:.2f}, median {:.2f}, p95 {:.2f}, max {:.2f}'.format(
+            name, d['count'], d['negative'], d['zero'], d['positive'], d['min'], d['p5'], d['p50'], d['p95'], d['max'])
+    if arrays.states is None:
+        return
+    coverage = get_coverage(arrays, lo, hi)
+    for d, name in enumerate(dimension_names):
+        counts, covered = coverage[name]
+        print '{}: {} of {} bins with entries, bins {} to {}'.format(name, covered, len(counts), lo[d], hi[d])
+    print 'states with entries: {} of {}'.format(*coverage['states'])
+    if coverage['outside']:
+        print 'entries outside the grid: {}'.format(coverage['outside'])
+
+def export_heatmaps(arrays, lo, hi, prefix, scale=8):
+    '''
+    Write the max value and the greedy policy of each (dx, dy) bin per vy slice to <prefix>_values.png and
+    <prefix>_policy.png. Returns the filenames
+    '''
+    dense = get_dense(arrays, lo, hi)
+    # NaN only where both are missing
+    max_values = np.fmax(dense[0], dense[1])
+    filenames = [prefix + '_values.png', prefix + '_policy.png']
+    write_png(filenames[0], render_heatmaps(get_value_colors(max_values), scale))
+    write_png(filenames[1], render_heatmaps(get_category_colors(greedy_policy(dense), policy_colors), scale))
+    return filenames
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Report and render the Q-table of trainer.py')
+    parser.add_argument('--qtable', default='data/QTable_v1', help='(default=%(default)s)')
+    parser.add_argument('--diff', default=None, metavar='QTABLE', help='compare with this Q-table, e.g. an older checkpoint')
+    parser.add_argument('--png', default=None, metavar='PREFIX',
+                        help='write the heatmaps to PREFIX_values.png and PREFIX_policy.png, and PREFIX_disagreement.png with --diff')
+    parser.add_argument('--scale', type=int, default=8, help='pixels per bin (default=%(default)s)')
+    args = parser.parse_args()
+
+    from trainer import trainer
+    from checkpoint import checkpointer
+    t = trainer(args.qtable)
+    arrays = q_table_arrays(t.QTable)
+    other = q_table_arrays(checkpointer(args.diff).load()) if args.diff is not None else None
+    lo, hi = get_bin_range(t, *([arrays] if other is None else [arrays, other]))
+    print_report(arrays, lo, hi)
+    if args.png is not None:
+        print 'Wrote', ', '.join(export_heatmaps(arrays, lo, hi, args.png, args.scale))
+    if other is not None:
+        diff = diff_tables(other, arrays)
+        print 'from {}: {} entries added, {} removed, {} changed, mean |change| {:.3f}, max |change| {:.3f}'.format(
+            args.diff, diff['added'], diff['removed'], diff['changed'], diff['mean_abs_change'], diff['max_abs_change'])
+        for state, action, old, new in diff['largest_changes']:
+            print '  {} {}: {:.2f} -> {:.2f}'.format(state, action, old, new)
+        disagreement, fraction = policy_disagreement(greedy_policy(get_dense(other, lo, hi)), greedy_policy(get_dense(arrays, lo, hi)))
+        print 'the policies differ in {:.1%} of the states both decide'.format(fraction)
+        if args.png is not None:
+            filename = args.png + '_disagreement.png'
+            write_png(filename, render_heatmaps(get_category_colors(disagreement, disagreement_colors), args.scale))
+            print 'Wrote', filename
@@ -0,0 +1,130 @@
+# Statistics of the entries of the Q-table: how many times each was updated, and its last TD error
+#
+# They are kept in a tracked_table parallel to the Q-table, of key -> (visits, last TD error), and checkpointed
+# next to it (<QTable file>.stats), so the Q-table file keeps its format. The aggregates over all the entries,
+# the totals and a histogram of the visit counts by powers of 2, are updated with each entry, so a summary
+# costs the same over millions of entries as over a few.
+
+from __future__ import division
+import math
+import os
+
+from checkpoint import checkpointer, tracked_table
+
+class q_store(object):
+    '''
+    The visit counts and the last TD errors of the Q-table entries, which get learning rates and
+    exploration bonuses from them
+    '''
+    def __init__(self, filename=None):
+        '''
+        filename: the statistics are loaded from and saved to it. With None, they are not saved
+        '''
+        self.checkpointer = None
+        self.entries = tracked_table()
+        if filename is not None:
+            self.checkpointer = checkpointer(filename)
+            if os.path.isfile(filename) or os.path.isfile(self.checkpointer.log_filename):
+                self.entries = self.checkpointer.load()
+        self.total_visits = 0
+        self.total_abs_td_error = 0.0
+        self.visit_histogram = []       # [i]: entries visited 2^i to 2^(i+1)-1 times
+        for visits, td_error in self.entries.itervalues():
+            self._add(visits, td_error, 1)
+
+    def _add(self, visits, td_error, sign):
+        self.total_visits += sign * visits
+        self.total_abs_td_error += sign * abs(td_error)
+        bucket = visits.bit_length() - 1
+        while len(self.visit_histogram) <= bucket:
+            self.visit_histogram.append(0)
+        self.visit_histogram[bucket] += sign
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_visits(self, key):
+        return self.entries.get(key, (0, 0.0))[0]
+
+    def get_td_error(self, key):
+        '''
+        Returns the TD error of the last update of the entry, 0 if it was never updated
+        '''
+        return self.entries.get(key, (0, 0.0))[1]
+
+    def record(self, key, td_error):
+        '''
+        Count an update of the entry with the TD error. Returns its visits, this one included
+        '''
+        old = self.entries.get(key, None)
+        if old is not None:
+            self._add(old[0], old[1], -1)
+        visits = old[0] + 1 if old is not None else 1
+        self.entries[key] = (visits, td_error)
+        self._add(visits, td_error, 1)
+        return visits
+
+    def remove(self, key):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self._add(old[0], old[1], -1)
+
+    def retain(self, table):
+        '''
+        Remove the entries whose key is not in the table. Returns the number removed
+        '''
+        stale = [key for key in self.entries if key not in table]
+        for key in stale:
+            self.remove(key)
+        return len(stale)
+
+    def update(self, changed, removed):
+        '''
+        Set the (visits, TD error) of the changed entries, and remove the removed ones
+        '''
+        for key in removed:
+            self.remove(key)
+        for key, (visits, td_error) in changed.iteritems():
+            old = self.entries.get(key, None)
+            if old is not None:
+                self._add(old[0], old[1], -1)
+            self.entries[key] = (visits, td_error)
+            self._add(visits, td_error, 1)
+
+    def get_learning_rate(self, key, alpha, decay):
+        '''
+        Returns 1/n^decay for an entry updated n times, e.g. decay 1 averages all its targets.
+        With decay None, or before any update, the constant alpha
+        '''
+        visits = self.get_visits(key)
+        if decay is None or visits == 0:
+            return alpha
+        return visits ** -decay
+
+    def get_bonus(self, key, scale):
+        '''
+        Returns the exploration bonus of the entry, scale/sqrt(n+1) after n updates
+        '''
+        return scale / math.sqrt(self.get_visits(key) + 1)
+
+    def get_summary(self):
+        '''
+        Returns the entries, the visits, the mean visits and the mean absolute last TD error of the entries,
+        and the histogram of the visit counts as [(min visits, entries)]
+        '''
+        n = len(self.entries)
+        return {
+            'entries': n,
+            'visits': self.total_visits,
+            'mean_visits': self.total_visits / n if n else 0.0,
+            'mean_abs_td_error': self.total_abs_td_error / n if n else 0.0,
+            'visit_histogram': [(2 ** i, count) for i, count in enumerate(self.visit_histogram) if count],
+        }
+
+    def save(self):
+        '''
+        Checkpoint the entries changed since the last save. Returns the number of entries written
+        '''
+        if self.checkpointer is None:
+            return 0
+        return self.checkpointer.save(self.entries)
@@ -0,0 +1,143 @@
+# Start states of the training sessions, and the curriculum of the pillars they are played with
+#
+# A training session puts the bird at x=2.0, in front of the first pillar, with a sampled height y
+# and vertical speed vy. It ends at the first score or when the bird dies.
+
+from __future__ import division
+import bisect
+import math
+import random
+
+class uniform_start_sampler:
+    '''
+    y uniform in the height, and vy uniform in [vy_min, vy_max], except 20% for the bird just jumped
+    '''
+    def __init__(self, vy_min, vy_max, yspeed_after_jump, height):
+        self.vy_min = vy_min
+        self.vy_max = vy_max
+        self.yspeed_after_jump = yspeed_after_jump
+        self.height = height
+        
+    def sample(self):
+        '''
+        Returns the start (y, vy)
+        '''
+        y = random.random() * self.height
+        dice = random.random()
+        if dice < 0.2:
+            vy = self.yspeed_after_jump     # 20% for the bird just jumped
+        else:
+            vy = random.random() * (self.vy_max - self.vy_min) + self.vy_min
+        return y, vy
+    
+    def record(self, start, td_error):
+        '''
+        Learn the mean absolute TD error of a session started at start
+        '''
+        pass
+    
+    def get_coverage(self):
+        return None
+    
+class prioritized_start_sampler:
+    '''
+    The (y, vy) space is divided into n_y x n_vy cells. A cell is picked with a probability proportional to
+    its priority, the moving average of the absolute TD errors of the sessions started in it, plus a bonus
+    for the cells rarely started from. The start is uniform in the cell
+    '''
+    def __init__(self, vy_min, vy_max, height, n_y=20, n_vy=10, bonus=10.0, decay=0.1):
+        self.vy_min = vy_min
+        self.vy_max = vy_max
+        self.height = height
+        self.n_y = n_y
+        self.n_vy = n_vy
+        self.bonus = bonus
+        self.decay = decay              # weight of the latest TD error in the moving average
+        
+        n_cells = n_y * n_vy
+        self.td_errors = [0.0] * n_cells
+        self.visits = [0] * n_cells
+        
+    def _get_cell(self, y, vy):
+        i = min(max(int((y / self.height) * self.n_y), 0), self.n_y - 1)
+        j = min(max(int((vy - self.vy_min) / (self.vy_max - self.vy_min) * self.n_vy), 0), self.n_vy - 1)
+        return i * self.n_vy + j
+    
+    def get_priority(self, cell):
+        return self.td_errors[cell] + self.bonus / math.sqrt(1 + self.visits[cell])
+    
+    def sample(self):
+        '''
+        Returns the start (y, vy)
+        '''
+        cumulative = []
+        total = 0.0
+        for cell in xrange(len(self.visits)):
+            total += self.get_priority(cell)
+            cumulative.append(total)
+        cell = min(bisect.bisect_right(cumulative, random.random() * total), len(cumulative) - 1)
+        i, j = divmod(cell, self.n_vy)
+        y = (i + random.random()) / self.n_y * self.height
+        vy = (j + random.random()) / self.n_vy * (self.vy_max - self.vy_min) + self.vy_min
+        return y, vy
+    
+    def record(self, start, td_error):
+        '''
+        Learn the mean absolute TD error of a session started at start
+        '''
+        cell = self._get_cell(*start)
+        if self.visits[cell] == 0:
+            self.td_errors[cell] = td_error
+        else:
+            self.td_errors[cell] += self.decay * (td_error - self.td_errors[cell])
+        self.visits[cell] += 1
+        
+    def get_coverage(self):
+        '''
+        Returns the number of cells started from, and the number of cells
+        '''
+        return sum(1 for v in self.visits if v > 0), len(self.visits)
+
+class curriculum:
+    '''
+    Train with easier pillars first. stages is a list of (pillar_gap, pillar_x_interval).
+    The next stage starts once the success rate of the last `window` sessions reaches promote_rate,
+    or after max_sessions in the stage. Half of the moves in training are random, so the rate stays low
+    '''
+    default_stages = [(3.0, 5.0), (2.5, 4.5), (2.0, 4.0)]
+    
+    def __init__(self, stages=None, window=200, promote_rate=0.3, max_sessions=2000):
+        self.stages = stages if stages is not None else curriculum.default_stages
+        self.window = window
+        self.promote_rate = promote_rate
+        self.max_sessions = max_sessions
+        self.stage = 0
+        self.stage_sessions = 0
+        self.results = []
+        self.configs = {}
+        
+    def get_config(self, config):
+        '''
+        Returns the config with the pillars of the current stage
+        '''
+        key = (config, self.stage)
+        if key not in self.configs:
+            pillar_gap, pillar_x_interval = self.stages[self.stage]
+            self.configs[key] = config.replace(pillar_gap=pillar_gap, pillar_x_interval=pillar_x_interval)
+        return self.configs[key]
+        
+    def record(self, success):
+        '''
+        Record whether a session scored, and move to the next stage when it's time
+        '''
+        self.results.append(success)
+        self.stage_sessions += 1
+        if len(self.results) > self.window:
+            del self.results[0]
+        if self.stage < len(self.stages) - 1:
+            promoted = len(self.results) == self.window and sum(self.results) / self.window >= self.promote_rate
+            if promoted or self.stage_sessions >= self.max_sessions:
+                self.stage += 1
+                self.stage_sessions = 0
+                self.results = []
+                print 'curriculum: stage {}, pillar gap {}, interval {}'.format(self.stage, *self.stages[self.stage])
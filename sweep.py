@@ -0,0 +1,169 @@
+# Train and evaluate many hyperparameter configs in parallel
+#
+# A sweep spec is a JSON file, e.g.
+#   {"learner": "qtable", "search": "grid",
+#    "params": {"alpha": [0.05, 0.1, 0.2], "greedy_prob": [0.3, 0.5, 0.7]},
+#    "sessions": 2000, "games": 5, "max_score": 100, "seed": 0}
+# With "search": "random", "samples" configs are drawn, each param being a list of choices or {"min": a, "max": b}.
+# The params are trainer attributes (see learner_params) or game_config parameters.
+# Each config's result is cached in the output folder by the hash of its job, so re-runs skip the completed ones.
+
+from __future__ import division
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+
+from game_config import game_config, default_config
+
+# the params of each learner, besides the game_config parameters
+learner_params = {
+    'qtable': ('alpha', 'alpha_decay', 'greedy_prob', 'exploration_bonus', 'trace_lambda', 'step_dx', 'step_dy', 'n_state_vy'),
+    'feature': ('alpha', 'gap_baseline'),
+}
+
+def expand_spec(spec):
+    '''
+    Returns the jobs of the sweep spec, one per config
+    '''
+    learner = spec.get('learner', 'qtable')
+    params = spec['params']
+    for name in params:
+        if name not in learner_params[learner] and name not in game_config.parameters:
+            raise ValueError('unknown param of {}: {}'.format(learner, name))
+
+    names = sorted(params)
+    if spec.get('search', 'grid') == 'grid':
+        configs = [dict(zip(names, values)) for values in itertools.product(*[params[name] for name in names])]
+    else:
+        rng = random.Random(spec.get('seed', 0))
+        configs = []
+        for _ in xrange(spec['samples']):
+            config = dict()
+            for name in names:
+                value = params[name]
+                if isinstance(value, dict):
+                    if isinstance(value['min'], int) and isinstance(value['max'], int):
+                        config[name] = rng.randint(value['min'], value['max'])
+                    else:
+                        config[name] = rng.uniform(value['min'], value['max'])
+                else:
+                    config[name] = rng.choice(value)
+            configs.append(config)
+
+    jobs = []
+    for config in configs:
+        jobs.append({'learner': learner, 'params': config,
+                     'sessions': spec.get('sessions', 1000), 'games': spec.get('games', 5),
+                     'max_score': spec.get('max_score', 100), 'seed': spec.get('seed', 0)})
+    return jobs
+
+def get_job_hash(job):
+    return hashlib.sha1(json.dumps(job, sort_keys=True)).hexdigest()[:16]
+
+def create_learner(learner, params):
+    '''
+    Returns the learner with the params, starting from scratch
+    '''
+    config = default_config.replace(**dict((k, v) for k, v in params.iteritems() if k in game_config.parameters))
+    params = dict((k, v) for k, v in params.iteritems() if k not in game_config.parameters)
+    if learner == 'qtable':
+        from trainer import trainer
+        t = trainer(QTable_file=None, trace_lambda=params.pop('trace_lambda', 0.0), config=config)
+        if 'step_dx' in params or 'step_dy' in params or 'n_state_vy' in params:
+            t.set_bin_sizes(params.pop('step_dx', t.step_dx), params.pop('step_dy', t.step_dy), params.pop('n_state_vy', t.n_state_vy))
+    else:
+        from feature_trainer import feature_trainer
+        t = feature_trainer(config)
+        # not the stored weights
+        t.w_dy_to_center = t.w_dy_to_gap_baseline = t.w_dy_to_gap_baseline_in_gap = 1.0
+    for name, value in params.iteritems():
+        setattr(t, name, value)
+    return t
+
+def _cpu_time():
+    times = os.times()
+    return times[0] + times[1]
+
+def run_job(job):
+    '''
+    Train and evaluate the job's config. Returns the job with its results
+    '''
+    random.seed(job['seed'])
+    start = _cpu_time()
+    t = create_learner(job['learner'], job['params'])
+    for _ in xrange(job['sessions']):
+        t.train_one_session(False)
+    scores = t.evaluate(job['games'], job['max_score'])
+    cpu_seconds = _cpu_time() - start
+
+    result = dict(job)
+    result['scores'] = scores
+    result['mean_score'] = sum(scores) / len(scores)
+    result['cpu_seconds'] = cpu_seconds
+    result['score_per_cpu_second'] = result['mean_score'] / max(cpu_seconds, 1e-3)
+    return result
+
+def run_sweep(jobs, out_dir='data/sweep', processes=None):
+    '''
+    Run the jobs not cached in out_dir over a process pool. Returns the results of all the jobs
+    '''
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    results = []
+    todo = []
+    for job in jobs:
+        result_file = os.path.join(out_dir, get_job_hash(job) + '.json')
+        if os.path.isfile(result_file):
+            with open(result_file) as f:
+                results.append(json.load(f))
+        else:
+            todo.append(job)
+    print '{} configs, {} cached, {} to run'.format(len(jobs), len(jobs) - len(todo), len(todo))
+
+    if todo:
+        pool = multiprocessing.Pool(processes)
+        try:
+            for result in pool.imap_unordered(run_job, todo):
+                job = dict((k, result[k]) for k in ('learner', 'params', 'sessions', 'games', 'max_score', 'seed'))
+                # write to a temporary file first, so an interrupted sweep leaves no partial results
+                result_file = os.path.join(out_dir, get_job_hash(job) + '.json')
+                with open(result_file + '.tmp', 'w') as f:
+                    json.dump(result, f, sort_keys=True)
+                os.rename(result_file + '.tmp', result_file)
+                print '  {} mean score {:.1f} in {:.1f} CPU seconds'.format(result['params'], result['mean_score'], result['cpu_seconds'])
+                results.append(result)
+        finally:
+            pool.close()
+            pool.join()
+    return results
+
+def write_results_table(results, filename):
+    '''
+    Write the results sorted by score per CPU second, the best first. Returns the lines of the table
+    '''
+    results = sorted(results, key=lambda r: r['score_per_cpu_second'], reverse=True)
+    names = sorted(set(name for r in results for name in r['params']))
+    lines = ['\t'.join(['score/cpu_s', 'mean_score', 'cpu_s'] + names)]
+    for r in results:
+        values = [str(r['params'].get(name, '')) for name in names]
+        lines.append('\t'.join(['{:.3f}'.format(r['score_per_cpu_second']), '{:.1f}'.format(r['mean_score']), '{:.1f}'.format(r['cpu_seconds'])] + values))
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return lines
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Train and evaluate the hyperparameter configs of a sweep spec in parallel')
+    parser.add_argument('spec', help='JSON file of the sweep spec')
+    parser.add_argument('--out', default='data/sweep', help='folder of the cached results and the table (default=%(default)s)')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: the number of CPUs)')
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    results = run_sweep(expand_spec(spec), args.out, args.processes)
+    for line in write_results_table(results, os.path.join(args.out, 'results.tsv')):
+        print line
@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import tempfile
+from checkpoint import checkpointer, tracked_table
+
+class test_checkpoint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'QTable')
+        
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        
+    def test_save_appends_changes(self):
+        c = checkpointer(self.filename, compact_ratio=100.0)
+        table = tracked_table()
+        for i in xrange(100):
+            table[((i, 0, 0), True)] = float(i)
+        self.assertEqual(c.save(table), 100)    # the first save is a snapshot
+        self.assertFalse(os.path.isfile(c.log_filename))
+        
+        table[((1, 0, 0), True)] = -1.0
+        table.pop(((2, 0, 0), True))
+        table[((200, 0, 0), False)] = 5.0
+        self.assertEqual(c.save(table), 3)
+        self.assertEqual(c.save(table), 0)
+        
+        loaded = c.load()
+        self.assertEqual(loaded, table)
+        self.assertEqual(loaded.dirty, set())
+        
+    def test_load_drops_incomplete_record(self):
+        c = checkpointer(self.filename, compact_ratio=100.0)
+        table = tracked_table({((0, 0, 0), True): 1.0})
+        c.save(table)
+        table[((0, 0, 0), True)] = 2.0
+        c.save(table)
+        table[((0, 0, 0), True)] = 3.0
+        c.save(table)
+        # a crash in the middle of the last record
+        size = os.path.getsize(c.log_filename)
+        with open(c.log_filename, 'r+b') as f:
+            f.truncate(size - 5)
+        self.assertEqual(c.load()[((0, 0, 0), True)], 2.0)
+        
+    def test_compaction(self):
+        c = checkpointer(self.filename, compact_ratio=0.5)
+        table = tracked_table()
+        for i in xrange(10):
+            table[((i, 0, 0), True)] = 0.0
+        c.save(table)
+        for i in xrange(10):
+            table[((i, 0, 0), True)] = 1.0
+        c.save(table)
+        # the log grew larger than half the snapshot
+        self.assertFalse(os.path.isfile(c.log_filename))
+        self.assertEqual(c.load(), table)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from flappy_bird import collission_detector
+from benchmarks import collisions
+
+def bottom_pieces_only(pillars, rect):
+    return any(collission_detector.collide(p.bottom_rect, rect) for p in pillars)
+
+class test_collisions(unittest.TestCase):
+    def test_collide(self):
+        pillar = ((0.0, 0.0), (1.0, 2.0))
+        self.assertTrue(collission_detector.collide(pillar, ((0.5, 1.5), (0.9, 1.9))))
+        self.assertTrue(collission_detector.collide(((0.5, 1.5), (0.9, 1.9)), pillar))
+        # touching edges and corners collide
+        self.assertTrue(collission_detector.collide(pillar, ((1.0, 1.0), (1.4, 1.4))))
+        self.assertTrue(collission_detector.collide(pillar, ((0.5, 2.0), (0.9, 2.4))))
+        self.assertTrue(collission_detector.collide(pillar, ((-0.4, -0.4), (0.0, 0.0))))
+        self.assertFalse(collission_detector.collide(pillar, ((1.01, 1.0), (1.4, 1.4))))
+        # corner containment only: a cross with no corner inside the other doesn't collide
+        self.assertFalse(collission_detector.collide(pillar, ((-1.0, 0.5), (2.0, 1.0))))
+        
+    def test_corpus(self):
+        corpus = collisions.load_corpus()
+        mismatches, steps_per_sec = collisions.replay(corpus)
+        self.assertEqual(mismatches, [])
+        self.assertTrue(steps_per_sec > 0)
+        
+        mismatches, _ = collisions.replay(corpus, bottom_pieces_only)
+        self.assertTrue(len(mismatches) > 0)
+        
+    def test_replay_edge_games(self):
+        corpus = {'max_steps': 10, 'games': [{'seed': 0, 'actions': '', 'outcomes': ''}]}
+        self.assertEqual(collisions.replay(corpus)[0], [])
+        # an engine colliding with everything ends the games before their first move
+        corpus = collisions.load_corpus()
+        mismatches, _ = collisions.replay(corpus, lambda pillars, rect: True)
+        self.assertEqual(len(mismatches), len(corpus['games']))
+        self.assertEqual(set(step for _, step, _, _ in mismatches), set([-1]))
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+#!/usr/bin/python
+
+import math
+import random
+import unittest
+from discretizer import uniform_discretizer, adaptive_discretizer, get_stats
+
+class test_discretizer(unittest.TestCase):
+    def test_uniform(self):
+        d = uniform_discretizer((0.0, -4.8, -4.4), (0.2, 0.4, 0.59))
+        self.assertEqual(d.get_state(1.0, 0.5, 1.5), (math.floor(1.0/0.2), math.floor(5.3/0.4), math.floor(5.9/0.59)))
+        self.assertEqual(d.observe((1, 2, 3), 100.0), None)
+        
+    def test_adaptive_split(self):
+        d = adaptive_discretizer((0.0, 0.0, 0.0), (1.0, 1.0, 1.0), initial_depth=3, min_samples=4, split_variance=1.0)
+        self.assertEqual(d.get_n_states(), 8)
+        state = d.get_state(0.1, 0.1, 0.1)
+        self.assertEqual(state, d.get_state(0.4, 0.4, 0.4))
+        
+        # low variance, no split
+        for _ in xrange(10):
+            self.assertEqual(d.observe(state, 5.0), None)
+        new_states = d.observe(state, -10.0)
+        self.assertEqual(len(new_states), 2)
+        self.assertEqual(d.observe(state, 10.0), None)      # already split
+        self.assertEqual(d.get_n_states(), 9)
+        self.assertNotEqual(d.get_state(0.1, 0.1, 0.1), d.get_state(0.4, 0.1, 0.1))
+        self.assertTrue(d.get_state(0.1, 0.1, 0.1) in new_states)
+        
+    def test_stats_leave_the_global_random_alone(self):
+        d = uniform_discretizer((0.0, -4.8, -4.4), (0.2, 0.4, 0.59))
+        table = dict((((i, 0, 0), True), 1.0) for i in xrange(100))
+        random.seed(3)
+        expected = random.random()
+        random.seed(3)
+        stats = get_stats(d, table, (0.0, -4.8, -4.4), (10.0, 4.8, 1.5), n_lookups=100, n_samples=10)
+        self.assertEqual(random.random(), expected)
+        self.assertEqual((stats['states'], stats['entries']), (100, 100))
+        self.assertEqual(stats['bytes'], get_stats(d, table, (0.0, -4.8, -4.4), (10.0, 4.8, 1.5), n_lookups=100, n_samples=100)['bytes'])
@@ -0,0 +1,49 @@
+import unittest
+from environment import flappy_bird_env, flappy_bird_vector_env, pillar_pixel, bird_pixel
+
+class test_environment(unittest.TestCase):
+    def test_reset_is_seeded(self):
+        env = flappy_bird_env()
+        obs = env.reset(seed=3).copy()
+        self.assertEqual(obs.shape, (3,))
+        self.assertTrue((env.reset(seed=3) == obs).all())
+        
+    def test_step(self):
+        env = flappy_bird_env(action_repeat=3)
+        obs = env.reset(seed=0)
+        self.assertIs(env.step(0)[0], obs)      # the same buffer
+        self.assertAlmostEqual(env.game.x, 0.6)
+        total_reward = 0.0
+        done = False
+        while not done:
+            obs, reward, done, info = env.step(False)
+            total_reward += reward
+        self.assertEqual(total_reward, -1.0)
+        self.assertEqual(info['score'], 0)
+        
+    def test_observation_modes(self):
+        env = flappy_bird_env(observation='bins')
+        self.assertEqual(env.reset(seed=0).dtype.kind, 'i')
+        env = flappy_bird_env(observation='pixels', pixel_shape=(50, 100))
+        pixels = env.reset(seed=0)
+        self.assertEqual(pixels.shape, (50, 100))
+        self.assertTrue((pixels == pillar_pixel).any())
+        self.assertTrue((pixels == bird_pixel).any())
+        self.assertRaises(ValueError, flappy_bird_env, observation='rgb')
+        
+    def test_vector_env(self):
+        envs = flappy_bird_vector_env(4, seed=0)
+        obs = envs.reset(seed=10)
+        self.assertEqual(obs.shape, (4, 3))
+        single = flappy_bird_env().reset(seed=12)
+        self.assertTrue((obs[2] == single).all())
+        n_done = 0
+        for _ in xrange(12):
+            obs, rewards, dones, infos = envs.step([False] * 4)
+            n_done += dones.sum()
+        # all fell down once, and were reset
+        self.assertEqual(n_done, 4)
+        self.assertEqual(len(infos), 4)
+        
+if __name__ == '__main__':
+    unittest.main()
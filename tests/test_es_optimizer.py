@@ -0,0 +1,63 @@
+import unittest
+import os
+import shutil
+import tempfile
+import random
+import es_optimizer
+from feature_trainer import feature_trainer, select_action_with_max_value, write_weights
+from flappy_bird import flappy_bird_game
+
+class test_es_optimizer(unittest.TestCase):
+    def test_rank_weights(self):
+        self.assertEqual(list(es_optimizer.get_rank_weights([3.0, 10.0, -1.0])), [0.0, 0.5, -0.5])
+        
+    def test_survival_is_seeded(self):
+        weights = [-16.7, -18.1, -13.0]
+        self.assertEqual(es_optimizer.survival(weights, 'gap', 7, 100), es_optimizer.survival(weights, 'gap', 7, 100))
+        # without its weight, the speed feature plays the same games
+        self.assertEqual(es_optimizer.survival(weights + [0.0], 'gap_speed', 7, 50), es_optimizer.survival(weights, 'gap', 7, 50))
+
+    def test_speed_feature_changes_the_actions(self):
+        weights = [-16.7, -18.1, -13.0]
+        features = es_optimizer.feature_sets['gap_speed']
+        without_speed = es_optimizer.get_value_function(weights + [0.0], features)
+        with_speed = es_optimizer.get_value_function(weights + [-100.0], features)
+        game = flappy_bird_game(rng=random.Random(7))
+        n_different = 0
+        for _ in xrange(200):
+            if game.is_game_over:
+                break
+            actions = game.get_legal_actions()
+            action = select_action_with_max_value(game, actions, without_speed, random.Random(0))[0]
+            if select_action_with_max_value(game, actions, with_speed, random.Random(0))[0] != action:
+                n_different += 1
+            game.move(action)
+        self.assertTrue(n_different > 0)
+
+    def test_select_best(self):
+        es = es_optimizer.es_optimizer([1.0, 1.0, 1.0], population=4, n_games=2, max_steps=30)
+        es.step()
+        weights, fitness = es.select_best()
+        self.assertTrue(any((weights == w).all() for w in (es.theta, es.best_weights)))
+        self.assertTrue(0 <= fitness <= 30)
+        
+    def test_step(self):
+        es = es_optimizer.es_optimizer([1.0, 1.0, 1.0], population=4, n_games=2, max_steps=30)
+        current, mean = es.step()
+        self.assertEqual(es.generation, 1)
+        self.assertTrue(es.best_fitness >= max(current, mean))
+        
+    def test_write_weights(self):
+        tmp_dir = tempfile.mkdtemp()
+        weight_file = feature_trainer.weight_file
+        feature_trainer.weight_file = os.path.join(tmp_dir, 'feature_weights')
+        try:
+            write_weights(feature_trainer.weight_file, [-1.0, -2.0, -3.0])
+            ft = feature_trainer()
+            self.assertEqual((ft.w_dy_to_center, ft.w_dy_to_gap_baseline, ft.w_dy_to_gap_baseline_in_gap), (-1.0, -2.0, -3.0))
+        finally:
+            feature_trainer.weight_file = weight_file
+            shutil.rmtree(tmp_dir)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 #!/usr/bin/python
 
 import unittest
-from flappy_bird import flappy_bird_game
+import random
+from flappy_bird import flappy_bird_game, pillar
 
 class test_game(unittest.TestCase):
     def test_update_pillars(self):
@@ -32,3 +33,36 @@ class test_game(unittest.TestCase):
         p = game.create_pillar(pillars[-1].pid+1)
         xmin, _ = p.get_x_range()
         self.assertTrue(xmin >= game.x + game.dx_loaded)
+
+    def test_pillar_views(self):
+        p = pillar(3, 17.0, 1.5, 1.0, 1.0, 5.0)
+        self.assertEqual(p.get_x_range(), (17.0, 18.0))
+        self.assertEqual(p.get_gap_y_range(), (1.0, 3.5))
+        self.assertEqual(p.bottom_rect, ((17.0, 0), (18.0, 1.0)))
+        self.assertEqual(p.top_rect, ((17.0, 3.5), (18.0, 5.0)))
+        self.assertFalse(p.collide_with(((16.5, 3.4), (16.9, 3.8))))
+        self.assertTrue(p.collide_with(((17.5, 3.4), (17.9, 3.8))))
+        self.assertFalse(hasattr(p, '__dict__'))
+
+    def test_endurance(self):
+        def play(game, n):
+            # jump whenever falling low in the gap, to get far
+            trace = []
+            for _ in xrange(n):
+                p = [p for p in game.pillars if p.x + p.width > game.bird.x][0]
+                game.move(game.bird.y < p.gap_y_min + 0.3 * (p.gap_y_max - p.gap_y_min) and game.bird.yspeed < 0)
+                trace.append((game.x, game.bird.x, [p.x for p in game.pillars], game.is_game_over))
+            return trace
+        game = flappy_bird_game(rng=random.Random(0))
+        endurance_game = flappy_bird_game(rng=random.Random(0), endurance=True)
+        # the same as a short game for the first two intervals
+        n = 2 * endurance_game.ticks_per_interval
+        self.assertEqual(play(endurance_game, n), play(game, n))
+        # then every interval with the floats of the second one
+        m = endurance_game.ticks_per_interval
+        second = [t[:3] for t in play(endurance_game, m)]
+        play(endurance_game, 50 * m)
+        self.assertFalse(endurance_game.is_game_over)
+        self.assertEqual([t[:3] for t in play(endurance_game, m)], second)
+        self.assertEqual(endurance_game.ticks, 54 * m)
+        self.assertTrue(endurance_game.score >= 50)
@@ -0,0 +1,31 @@
+import unittest
+import pickle
+from game_config import game_config, default_config
+from flappy_bird import flappy_bird_game
+
+class test_game_config(unittest.TestCase):
+    def test_defaults(self):
+        self.assertEqual(default_config.height, 5.0)
+        self.assertEqual(default_config.dy_max, 4.8)
+        self.assertEqual(game_config(), default_config)
+        self.assertRaises(TypeError, game_config, no_such_parameter=1)
+        self.assertRaises(AttributeError, setattr, default_config, 'height', 6.0)
+        
+    def test_replace(self):
+        config = default_config.replace(pillar_gap=3.0)
+        self.assertEqual(config.pillar_gap, 3.0)
+        self.assertEqual(default_config.pillar_gap, 2.0)
+        self.assertNotEqual(config, default_config)
+        self.assertEqual(hash(config), hash(default_config.replace(pillar_gap=3.0)))
+        self.assertEqual(pickle.loads(pickle.dumps(config)), config)
+        
+    def test_game_with_config(self):
+        config = default_config.replace(pillar_gap=3.0, height=6.0)
+        game = flappy_bird_game(config=config)
+        gap_min, gap_max = game.pillars[0].get_gap_y_range()
+        self.assertAlmostEqual(gap_max - gap_min, 3.0)
+        self.assertEqual(game.height, 6.0)
+        self.assertEqual(flappy_bird_game.height, 5.0)
+        
+if __name__ == '__main__':
+    unittest.main()
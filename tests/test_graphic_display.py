@@ -0,0 +1,88 @@
+#!/usr/bin/python
+
+import os
+import unittest
+
+# run without a real screen or sound card
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import graphic_display
+from flappy_bird import flappy_bird_game
+
+class test_graphic_display(unittest.TestCase):
+    def test_load_atlas(self):
+        atlas = graphic_display.load_atlas()
+        self.assertEqual(atlas['bg_day'], (0.0, 0.0, 0.28125, 0.5))
+        self.assertEqual(atlas['pipe2_down'], (0.0, 0.6308594, 0.05078125, 0.3125))
+        
+    def test_assets_shared_between_displays(self):
+        d1 = graphic_display.graphic_display(flappy_bird_game())
+        d2 = graphic_display.graphic_display(flappy_bird_game())
+        self.assertTrue(d1.bird_imgs is d2.bird_imgs)
+        self.assertTrue(d1.screen is d2.screen)
+        
+        # a different dx_loaded needs differently scaled images
+        d3 = graphic_display.graphic_display(flappy_bird_game(7.0))
+        self.assertFalse(d1.pillar_bot_img is d3.pillar_bot_img)
+        
+    def test_bind(self):
+        display = graphic_display.graphic_display(flappy_bird_game())
+        game = flappy_bird_game()
+        display.bind(game)
+        self.assertTrue(display.game is game)
+        
+    def test_dirty_rect_frame_matches_full_redraw(self):
+        import pygame
+        game = flappy_bird_game()
+        display = graphic_display.graphic_display(game)
+        display.bird_img_time = float('inf')        # freeze the bird animation
+        for i in xrange(30):
+            game.move(i % 4 == 0)
+            display.update_display()
+        incremental = pygame.surfarray.array3d(display.screen)
+        display.full_redraw = True
+        display.update_display()
+        full = pygame.surfarray.array3d(display.screen)
+        self.assertTrue((incremental == full).all())
+        
+    def test_fast_forward_renders_every_nth_step(self):
+        game = flappy_bird_game()
+        display = graphic_display.fast_forward_display(graphic_display.graphic_display(game), report_interval=1000.0)
+        display.n = 5
+        rendered = []
+        display.display.update_display = lambda fps: rendered.append(fps) or (False, False, False)
+        for i in xrange(10):
+            display.update_display()
+        self.assertEqual(rendered, [0, 0])
+        
+        # adjust n and show the rates after each report interval
+        display.report_interval = 0.0
+        display.n = 1
+        display.update_display()
+        self.assertTrue(display.n >= 1)
+        self.assertTrue(display.display.overlay_text.startswith('x'))
+
+    def test_sound_effects_at_score_and_death(self):
+        played = []
+        class fake_channel(object):
+            def play(self, sound):
+                played.append(sound)
+        saved = graphic_display._sounds
+        graphic_display._sounds = {'hit': ('hit', fake_channel()), 'point': ('point', fake_channel())}
+        try:
+            game = flappy_bird_game()
+            display = graphic_display.graphic_display(game)
+            game.score += 1
+            display.update_display(fps=0)
+            display.update_display(fps=0)
+            self.assertEqual(played, ['point'])
+            game.is_game_over = True
+            display.update_display(fps=0)
+            self.assertEqual(played, ['point', 'hit'])
+        finally:
+            graphic_display._sounds = saved
+        
+        # no sound effects without a screen or a sound card
+        self.assertTrue(graphic_display.is_headless())
+        self.assertEqual(graphic_display.load_sounds(), {})
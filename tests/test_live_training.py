@@ -0,0 +1,46 @@
+import unittest
+import os
+
+# run without a real screen or sound card
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import live_training
+from checkpoint import tracked_table
+from trainer import trainer
+
+class test_live_training(unittest.TestCase):
+    def test_live_table_changes(self):
+        table = live_training.live_table(tracked_table({'a': 1.0, 'b': 2.0}))
+        table['a'] = 3.0
+        table['c'] = 4.0
+        table.pop('b')
+        self.assertEqual(table.take_changes(), ({'a': 3.0, 'c': 4.0}, set(['b'])))
+        self.assertEqual(table.take_changes(), ({}, set()))
+        # the checkpoint tracking is independent
+        self.assertEqual(table.dirty, set(['a', 'c']))
+        self.assertEqual(table.removed, set(['b']))
+
+    def test_run(self):
+        t = trainer(QTable_file=None)
+        t.record_stats = True
+        n_sessions = live_training.run(t, live_training.qtable_sync(t), publish_interval=0.05, fps=0, max_frames=200)
+        self.assertTrue(n_sessions > 0)
+        # the training of the worker is in this process's trainer
+        self.assertTrue(len(t.QTable) > 0)
+        self.assertEqual(t.q_stats.get_summary()['entries'], len(t.QTable))
+        self.assertEqual(t.QTable.dirty, set(t.QTable))
+        self.assertTrue(sum(t.state_visits.itervalues()) > 0)
+
+    def test_worker_failure(self):
+        t = trainer(QTable_file=None)
+        def fail(training):
+            raise ZeroDivisionError()
+        t.train_one_session = fail
+        with self.assertRaises(RuntimeError) as raised:
+            live_training.run(t, live_training.qtable_sync(t), publish_interval=0.05, fps=0, max_frames=20)
+        self.assertIn('ZeroDivisionError', str(raised.exception))
+
+    def test_refuses_lost_state(self):
+        t = trainer(QTable_file=None, prioritized_start=True)
+        self.assertRaises(ValueError, live_training.run, t, live_training.qtable_sync(t), max_frames=1)
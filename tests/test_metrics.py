@@ -0,0 +1,41 @@
+import unittest
+import json
+import os
+import tempfile
+from metrics import metrics_sink, summarize
+from trainer import trainer
+
+class test_metrics(unittest.TestCase):
+    def test_summarize(self):
+        s = summarize(range(1, 101))
+        self.assertEqual(s['count'], 100)
+        self.assertEqual(s['mean'], 50.5)
+        self.assertEqual((s['min'], s['p50'], s['p99'], s['max']), (1, 50, 99, 100))
+        
+    def test_training_metrics_are_flushed(self):
+        for suffix in ('.jsonl', '.csv'):
+            fd, filename = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+            os.remove(filename)
+            try:
+                t = trainer(QTable_file=None)
+                t.metrics = metrics_sink(filename, flush_interval=60.0)
+                for _ in xrange(10):
+                    t.train_one_session(False)
+                t.metrics.close()
+                with open(filename) as f:
+                    lines = f.read().splitlines()
+                if suffix == '.jsonl':
+                    summary = json.loads(lines[-1])
+                    self.assertEqual(summary['sessions']['count'], 10)
+                    self.assertEqual(summary['episode_length']['count'], 10)
+                    self.assertEqual(summary['qtable_size']['value'], len(t.QTable))
+                    self.assertTrue(summary['steps']['per_sec'] > 0)
+                else:
+                    self.assertEqual(lines[0], 'time,name,field,value')
+                    self.assertTrue(any(line.split(',')[1:] == ['sessions', 'count', '10'] for line in lines))
+            finally:
+                os.remove(filename)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from mlp_trainer import mlp, mlp_trainer
+
+class test_mlp_trainer(unittest.TestCase):
+    def test_gradients(self):
+        net = mlp((3, 5, 2), seed=1)
+        x = np.random.RandomState(0).randn(4, 3)
+        d_out = np.random.RandomState(1).randn(4, 2)
+        _, activations = net.forward(x)
+        d_weights, _ = net.backward(activations, d_out)
+        # compare with the numeric gradient of sum(out * d_out)
+        eps = 1e-6
+        for i, j in [(0, 0), (2, 4)]:
+            w = net.weights[0]
+            w[i, j] += eps
+            up = (net.forward(x)[0] * d_out).sum()
+            w[i, j] -= 2 * eps
+            down = (net.forward(x)[0] * d_out).sum()
+            w[i, j] += eps
+            self.assertAlmostEqual(d_weights[0][i, j], (up - down) / (2 * eps), places=5)
+        
+    def test_train_and_store(self):
+        weight_file = mlp_trainer.weight_file
+        tmp_dir = tempfile.mkdtemp()
+        mlp_trainer.weight_file = os.path.join(tmp_dir, 'mlp_weights.npz')
+        try:
+            t = mlp_trainer()
+            t.batch_size = 32
+            t.target_sync = 10
+            t.train(400)
+            self.assertEqual(t.n_updates, 100 - 32 // t.train_every + 1)
+            t.store_weights()
+            t2 = mlp_trainer()
+            self.assertTrue((t2.net.weights[0] == t.net.weights[0]).all())
+        finally:
+            mlp_trainer.weight_file = weight_file
+            shutil.rmtree(tmp_dir)
+        
+if __name__ == '__main__':
+    unittest.main()
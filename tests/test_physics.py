@@ -0,0 +1,48 @@
+#!/usr/bin/python
+
+import unittest
+import physics
+from flappy_bird import bird, flappy_bird_game
+
+class test_physics(unittest.TestCase):
+    def test_step_matches_trapezoidal_move(self):
+        y, vy, dt, a = 2.5, 0.3, 0.2, -2.0
+        vy_new = vy + a * dt
+        self.assertEqual(physics.step(y, vy, dt, a), (y + (vy + vy_new) / 2.0 * dt, vy_new))
+        self.assertEqual(physics.step(y, vy, dt, a, True, 1.5), (y + (vy + 1.5) / 2.0 * dt, 1.5))
+        
+    def test_substeps_without_jump_are_exact(self):
+        y1, vy1 = physics.step(2.5, 0.3, 0.2, -2.0)
+        y4, vy4 = physics.step(2.5, 0.3, 0.2, -2.0, substeps=4)
+        self.assertAlmostEqual(y1, y4, places=12)
+        self.assertAlmostEqual(vy1, vy4, places=12)
+
+    def test_substeps_with_jump_end_at_the_same_state(self):
+        y1, vy1 = physics.step(2.5, -0.7, 0.2, -2.0, True, 1.5)
+        for n in [2, 4, 7]:
+            y, vy = physics.step(2.5, -0.7, 0.2, -2.0, True, 1.5, substeps=n)
+            self.assertAlmostEqual(y, y1, places=12)
+            self.assertAlmostEqual(vy, 1.5, places=12)
+        self.assertEqual(vy1, 1.5)
+
+    def test_advance_equals_looped_moves(self):
+        b1 = bird(0.4, 1.0, 2.5)
+        b1.yspeed = 1.5
+        b2 = b1.clone()
+        for _ in xrange(37):
+            b1.move(flappy_bird_game.time_per_move)
+        b2.advance(flappy_bird_game.time_per_move, 37)
+        self.assertAlmostEqual(b1.x, b2.x, places=9)
+        self.assertAlmostEqual(b1.y, b2.y, places=9)
+        self.assertAlmostEqual(b1.yspeed, b2.yspeed, places=9)
+
+    def test_steps_until_below(self):
+        y, vy, dt, a = 4.0, 1.5, 0.2, -2.0
+        k = physics.steps_until_below(y, vy, dt, a, 0.0)
+        n = 0
+        while y > 0.0:
+            y, vy = physics.step(y, vy, dt, a)
+            n += 1
+        self.assertEqual(k, n)
+        self.assertEqual(physics.steps_until_below(-1.0, 0.0, dt, a, 0.0), 0)
+        self.assertEqual(physics.steps_until_below(1.0, 1.0, dt, 0.0, 0.0), None)
@@ -0,0 +1,43 @@
+#!/usr/bin/python
+
+import random
+import unittest
+from flappy_bird import flappy_bird_game
+from planner import lookahead_planner
+
+class test_planner(unittest.TestCase):
+    def test_jumps_before_hitting_the_ground(self):
+        game = flappy_bird_game()
+        game.bird.y = 0.1
+        game.bird.yspeed = -1.5
+        planner = lookahead_planner(max_depth=4, time_budget=1.0)
+        self.assertEqual(planner.get_action(game), True)
+        actions, values = planner.get_action_values(game)
+        self.assertTrue(values[actions.index(True)] > values[actions.index(False)])
+        
+    def test_survives_pillars(self):
+        random.seed(0)
+        game = flappy_bird_game()
+        planner = lookahead_planner(max_depth=8, time_budget=1.0)
+        for _ in xrange(100):
+            game.move(planner.get_action(game))
+        self.assertFalse(game.is_game_over)
+        self.assertTrue(game.score >= 4)
+        
+    def test_stop_at_score(self):
+        game = flappy_bird_game()
+        game.bird.x = game.pillars[0].x
+        game.bird.y = game.pillars[0].get_gap_y_range()[0] + 0.8
+        planner = lookahead_planner(max_depth=10, time_budget=1.0, stop_at_score=True, death_value=-1000)
+        _, values = planner.get_action_values(game)
+        self.assertEqual(max(values), 100.0)
+        
+    def test_death_values(self):
+        game = flappy_bird_game()
+        game.bird.y = 0.05
+        game.bird.yspeed = -3.0
+        # dies at the first move whatever it does
+        planner = lookahead_planner(max_depth=4, time_budget=1.0, death_value=-50.0, leaf_value=0.0)
+        self.assertEqual(planner.get_action_values(game)[1], [-54.0, -54.0])
+        planner = lookahead_planner(max_depth=4, time_budget=1.0, death_value=-50.0, leaf_value=0.0, prefer_later_death=False)
+        self.assertEqual(planner.get_action_values(game)[1], [-50.0, -50.0])
@@ -0,0 +1,58 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from flappy_bird import flappy_bird_game
+from trainer import trainer
+from feature_trainer import feature_trainer
+from policy_server import policy_server, policy_client, qtable_model, feature_model
+
+class test_policy_server(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        
+    def serve(self, model):
+        server = policy_server(model, os.path.join(self.dir, 'policy.sock'))
+        server.start()
+        self.addCleanup(server.stop)
+        client = policy_client(server.address)
+        self.addCleanup(client.close)
+        return server, client
+        
+    def test_qtable_values(self):
+        random.seed(0)
+        t = trainer(QTable_file=None)
+        for _ in xrange(300):
+            t.train_one_session(False)
+        server, client = self.serve(qtable_model(t))
+        game = flappy_bird_game()
+        for _ in xrange(100):
+            if game.is_game_over:
+                game = flappy_bird_game()
+            actions, values = client.get_action_values(game)
+            self.assertEqual(values, [t.get_action_value(game, a, training=False) for a in actions])
+            game.move(random.random() < 0.3)
+        stats = server.get_stats()
+        self.assertEqual(stats['requests'], 100)
+        self.assertTrue(stats['p99_ms'] >= stats['p50_ms'] > 0)
+        
+    def test_feature_values(self):
+        ft = feature_trainer()
+        server, client = self.serve(feature_model(ft))
+        game = flappy_bird_game()
+        for _ in xrange(20):
+            actions, values = client.get_action_values(game)
+            expected = []
+            for a in actions:
+                g = game.clone_game()
+                g.move(a)
+                expected.append(ft.get_value(g))
+            self.assertEqual(values, expected)
+            game.move(client.get_action(game))
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+import numpy as np
+import q_analytics as qa
+
+class test_q_analytics(unittest.TestCase):
+    def setUp(self):
+        self.table = {((0.0, 0.0, 0.0), True): 5.0, ((0.0, 0.0, 0.0), False): 1.0,
+                      ((1.0, 2.0, 0.0), False): -3.0, ((1.0, 2.0, 0.0), 'x'): -10.0,
+                      ((-1.0, 0.0, 1.0), 's'): 100.0}
+        self.lo = np.zeros(3, dtype=np.int64)
+        self.hi = np.array([2, 2, 1])
+
+    def test_distribution_and_coverage(self):
+        arrays = qa.q_table_arrays(self.table)
+        distribution = qa.value_distribution(arrays)
+        self.assertEqual(distribution['no_jump']['count'], 2)
+        self.assertEqual(distribution['no_jump']['negative'], 1)
+        self.assertEqual(distribution['dead']['max'], -10.0)
+        coverage = qa.get_coverage(arrays, self.lo, self.hi)
+        self.assertEqual(list(coverage['dx'][0]), [2, 2, 0])
+        self.assertEqual(coverage['states'], (2, 18))
+        self.assertEqual(coverage['outside'], 1)
+
+    def test_policy_and_diff(self):
+        a = qa.q_table_arrays(self.table)
+        changed = dict(self.table)
+        changed[((1.0, 2.0, 0.0), False)] = 4.0
+        changed[((0.0, 0.0, 0.0), True)] = 0.5
+        del changed[((1.0, 2.0, 0.0), 'x')]
+        b = qa.q_table_arrays(changed)
+        policy_a = qa.greedy_policy(qa.get_dense(a, self.lo, self.hi))
+        policy_b = qa.greedy_policy(qa.get_dense(b, self.lo, self.hi))
+        # the missing jump value of (1, 2, 0) is 0, above -3
+        self.assertEqual((policy_a[0, 0, 0], policy_a[1, 2, 0], policy_a[2, 2, 0]), (1, 1, -1))
+        self.assertEqual((policy_b[0, 0, 0], policy_b[1, 2, 0]), (0, 0))
+        disagreement, fraction = qa.policy_disagreement(policy_a, policy_b)
+        self.assertEqual(fraction, 1.0)
+        self.assertEqual(disagreement[2, 2, 0], -1)
+
+        diff = qa.diff_tables(a, b)
+        self.assertEqual((diff['added'], diff['removed'], diff['changed']), (0, 1, 2))
+        self.assertEqual(diff['largest_changes'], [((1, 2, 0), False, -3.0, 4.0), ((0, 0, 0), True, 5.0, 0.5)])
+
+    def test_png(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filenames = qa.export_heatmaps(qa.q_table_arrays(self.table), self.lo, self.hi, os.path.join(directory, 'q'), scale=2)
+            with open(filenames[1], 'rb') as f:
+                data = f.read()
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(data[:8], '\x89PNG\r\n\x1a\n')
+        width, height = struct.unpack('>II', data[16:24])
+        # 2 vy slices of 3 dx bins and a gap column, 3 dy bins, 2 pixels per bin
+        self.assertEqual((width, height), (14, 6))
+        idat_length = struct.unpack('>I', data[33:37])[0]
+        raw = np.frombuffer(zlib.decompress(data[41:41 + idat_length]), dtype=np.uint8).reshape(height, 1 + width * 3)
+        # the rows after the first are the differences to the row above
+        self.assertEqual(list(raw[:, 0]), [0] + [2] * (height - 1))
+        pixels = np.cumsum(raw[:, 1:], axis=0, dtype=np.uint8).reshape(height, width, 3)
+        # the bottom left bin, (dx 0, dy 0) of the vy 0 slice, jumps
+        self.assertEqual(tuple(pixels[-1, 0]), qa.policy_colors[1])
+        self.assertEqual(tuple(pixels[-1, 6]), qa.gap_color)
+
+    def test_bin_range_includes_the_entries_outside_the_state_ranges(self):
+        from trainer import trainer
+        t = trainer(QTable_file=None)
+        arrays = qa.q_table_arrays(self.table)
+        configured_lo, configured_hi = qa.get_bin_range(t)
+        lo, hi = qa.get_bin_range(t, arrays)
+        # the death past the pillar, state_x -1
+        self.assertEqual(list(lo), [-1, 0, 0])
+        self.assertEqual(list(hi), list(configured_hi))
+        self.assertEqual(qa.get_coverage(arrays, lo, hi)['outside'], 0)
+        dense = qa.get_dense(arrays, lo, hi)
+        self.assertEqual(dense[3, 0, 0, 1], 100.0)
+        self.assertEqual(qa.render_heatmaps(qa.get_category_colors(qa.greedy_policy(dense), qa.policy_colors), 1).shape[1],
+                         (hi[2] - lo[2] + 1) * (hi[0] - lo[0] + 2) - 1)
@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+from q_store import q_store
+from trainer import trainer
+
+class test_q_store(unittest.TestCase):
+    def test_record_and_summary(self):
+        stats = q_store()
+        for i in xrange(5):
+            stats.record(((0, 0, 0), True), 1.0 - i)
+        stats.record(((1, 0, 0), True), 2.0)
+        stats.record(((2, 0, 0), False), -2.0)
+        self.assertEqual(stats.get_visits(((0, 0, 0), True)), 5)
+        self.assertEqual(stats.get_td_error(((0, 0, 0), True)), -3.0)
+        summary = stats.get_summary()
+        self.assertEqual(summary['entries'], 3)
+        self.assertEqual(summary['visits'], 7)
+        self.assertAlmostEqual(summary['mean_abs_td_error'], 7.0 / 3)
+        self.assertEqual(summary['visit_histogram'], [(1, 2), (4, 1)])
+        stats.remove(((0, 0, 0), True))
+        self.assertEqual(stats.get_summary()['visit_histogram'], [(1, 2)])
+
+    def test_saved_with_the_q_table(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'QTable')
+            t = trainer(filename)
+            t.record_stats = True
+            t.update_q_value((1, 1, 1), True, 10.0)
+            t.update_q_value((1, 1, 1), True, 10.0)
+            t.save_q_table()
+            t = trainer(filename)
+            self.assertEqual(t.q_stats.get_visits(((1, 1, 1), True)), 2)
+            self.assertEqual(t.q_stats.get_summary()['visits'], 2)
+            # statistics of entries not in the Q-table are dropped on load
+            t.q_stats.record(((2, 2, 2), True), 1.0)
+            t.q_stats.save()
+            t = trainer(filename)
+            self.assertEqual(t.q_stats.get_visits(((2, 2, 2), True)), 0)
+            self.assertEqual(len(t.q_stats), 1)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_recorded_only_when_needed(self):
+        t = trainer(QTable_file=None)
+        t.update_q_value((0, 0, 0), False, 10.0)
+        self.assertEqual(len(t.q_stats), 0)
+        self.assertAlmostEqual(t.QTable[((0, 0, 0), False)], 1.0)
+        t.alpha_decay = 1.0
+        t.update_q_value((0, 0, 0), False, 10.0)
+        self.assertEqual(t.q_stats.get_visits(((0, 0, 0), False)), 1)
+
+    def test_learning_rate_schedule(self):
+        t = trainer(QTable_file=None)
+        t.alpha_decay = 1.0
+        # 1/n averages the targets
+        for score in [10.0, 20.0, 60.0]:
+            t.update_q_value((0, 0, 0), False, score)
+        self.assertAlmostEqual(t.QTable[((0, 0, 0), False)], 30.0)
+        self.assertEqual(t.q_stats.get_learning_rate(((0, 0, 0), False), 0.1, 0.6), 3 ** -0.6)
+        self.assertEqual(t.q_stats.get_learning_rate(((9, 9, 9), False), 0.1, 0.6), 0.1)
+
+    def test_exploration_bonus(self):
+        t = trainer(QTable_file=None)
+        t.exploration_bonus = 10.0
+        state = (0, 0, 0)
+        for _ in xrange(8):
+            t.q_stats.record((state, True), 0.0)
+        # the rarely updated action wins despite a lower value, and is returned with its value
+        self.assertEqual(t.select_action_with_bonus(state, [True, False], [5.0, 0.0]), (False, 0.0))
+        self.assertEqual(t.select_action_with_bonus(state, [True, False], [9.0, 0.0]), (True, 9.0))
+        for _ in xrange(20):
+            t.train_one_session(False)
+        self.assertTrue(t.q_stats.get_summary()['visits'] > 0)
@@ -0,0 +1,34 @@
+#!/usr/bin/python
+
+import random
+import unittest
+from flappy_bird import flappy_bird_game
+from game_config import default_config
+from start_sampler import prioritized_start_sampler, curriculum
+
+class test_start_sampler(unittest.TestCase):
+    def test_prioritized_prefers_high_td_error(self):
+        random.seed(0)
+        sampler = prioritized_start_sampler(-4.0, 1.5, 5.0, n_y=2, n_vy=2, bonus=0.0)
+        for _ in xrange(10):
+            sampler.record((4.0, 1.0), 100.0)
+            sampler.record((1.0, -3.0), 1.0)
+        starts = [sampler.sample() for _ in xrange(1000)]
+        for y, vy in starts:
+            self.assertTrue(0 <= y < 5.0 and -4.0 <= vy < 1.5)
+        n_high = sum(1 for y, vy in starts if y >= 2.5 and vy >= -1.25)
+        self.assertTrue(n_high > 900)
+        self.assertEqual(sampler.get_coverage(), (2, 4))
+        
+    def test_curriculum(self):
+        c = curriculum([(3.0, 5.0), (2.0, 4.0)], window=10, promote_rate=0.8)
+        game = flappy_bird_game(config=c.get_config(default_config))
+        y_min, y_max = game.pillars[0].get_gap_y_range()
+        self.assertAlmostEqual(y_max - y_min, 3.0)
+        self.assertEqual(game.get_pillar_x(1) - game.get_pillar_x(0), 5.0)
+        for i in xrange(10):
+            c.record(i % 5 != 0)
+        self.assertEqual(c.stage, 1)
+        game = flappy_bird_game(config=c.get_config(default_config))
+        y_min, y_max = game.pillars[0].get_gap_y_range()
+        self.assertAlmostEqual(y_max - y_min, 2.0)
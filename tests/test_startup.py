@@ -0,0 +1,12 @@
+#!/usr/bin/python
+
+import subprocess
+import sys
+import unittest
+
+class test_startup(unittest.TestCase):
+    def test_headless_entry_points_do_not_load_gui(self):
+        for module in ['flappy_bird', 'trainer', 'feature_trainer', 'policy_gradiants']:
+            code = 'import sys, {}; print [p for p in ("pygame", "matplotlib") if p in sys.modules]'.format(module)
+            out = subprocess.check_output([sys.executable, '-c', code])
+            self.assertEqual(out.strip().split('\n')[-1], '[]', module)
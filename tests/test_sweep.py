@@ -0,0 +1,36 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sweep
+
+class test_sweep(unittest.TestCase):
+    def test_expand_spec(self):
+        jobs = sweep.expand_spec({'params': {'alpha': [0.1, 0.2], 'greedy_prob': [0.5, 0.7, 0.9]}})
+        self.assertEqual(len(jobs), 6)
+        self.assertEqual(len(set(sweep.get_job_hash(job) for job in jobs)), 6)
+        
+        spec = {'search': 'random', 'samples': 4, 'learner': 'feature',
+                'params': {'alpha': {'min': 0.01, 'max': 0.2}, 'pillar_gap': [2.0, 2.5]}}
+        jobs = sweep.expand_spec(spec)
+        self.assertEqual(jobs, sweep.expand_spec(spec))
+        for job in jobs:
+            self.assertTrue(0.01 <= job['params']['alpha'] <= 0.2)
+        self.assertRaises(ValueError, sweep.expand_spec, {'params': {'gap_baseline': [0.2]}})
+        
+    def test_run_sweep_is_cached(self):
+        out_dir = tempfile.mkdtemp()
+        try:
+            jobs = sweep.expand_spec({'params': {'alpha': [0.1], 'step_dy': [0.8]}, 'sessions': 20, 'games': 1, 'max_score': 1})
+            results = sweep.run_sweep(jobs, out_dir, processes=1)
+            self.assertEqual(len(results), 1)
+            self.assertEqual(len(os.listdir(out_dir)), 1)
+            # the second time it is read from the cache
+            self.assertEqual(sweep.run_sweep(jobs, out_dir, processes=1), results)
+            lines = sweep.write_results_table(results, os.path.join(out_dir, 'results.tsv'))
+            self.assertEqual(len(lines), 2)
+        finally:
+            shutil.rmtree(out_dir)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+import unittest
+from trainer import trainer, get_lambda_returns
+
+class test_trainer(unittest.TestCase):
+    def test_update_q_values_backwards(self):
+        t = trainer(QTable_file=None, trace_lambda=0.5)
+        t.alpha = 1.0
+        trajectory = [((1, 1, 1), True, 10.0), ((2, 2, 2), False, 20.0)]
+        t.update_q_values_backwards(trajectory, 100.0)
+        # G = 0.5*20 + 0.5*100 = 60, then 0.5*10 + 0.5*60 = 35
+        self.assertEqual(t.QTable[((2, 2, 2), False)], 60.0)
+        self.assertEqual(t.QTable[((1, 1, 1), True)], 35.0)
+        
+    def test_lambda_returns(self):
+        scores = [3.0, -1.0, 7.0, 2.0, 0.5, 4.0, -6.0]
+        expected = []
+        g = 50.0
+        for score in reversed(scores):
+            g = 0.3 * score + 0.7 * g
+            expected.insert(0, g)
+        # in blocks of 3 steps, and in one
+        for block in [3, 256]:
+            for value, expected_value in zip(get_lambda_returns(scores, 50.0, 0.7, block), expected):
+                self.assertAlmostEqual(value, expected_value)
+        self.assertEqual(len(get_lambda_returns([], 50.0, 0.7)), 0)
+        
+    def test_update_q_values_backwards_together_as_one_at_a_time(self):
+        trajectory = [((i, 1, 1), i % 2 == 0, float(i)) for i in xrange(10)]
+        together = trainer(QTable_file=None, trace_lambda=0.8)
+        together.QTable[((3, 1, 1), False)] = 20.0
+        together.update_q_values_backwards(trajectory, -30.0)
+        # the statistics make the updates one at a time
+        one_at_a_time = trainer(QTable_file=None, trace_lambda=0.8)
+        one_at_a_time.QTable[((3, 1, 1), False)] = 20.0
+        one_at_a_time.record_stats = True
+        one_at_a_time.update_q_values_backwards(trajectory, -30.0)
+        self.assertEqual(sorted(together.QTable), sorted(one_at_a_time.QTable))
+        for key, value in together.QTable.iteritems():
+            self.assertAlmostEqual(value, one_at_a_time.QTable[key])
+        self.assertAlmostEqual(together.session_td_error, one_at_a_time.session_td_error)
+        self.assertEqual(together.QTable.dirty, set(together.QTable))
+        
+    def test_update_q_values_backwards_skips_split_states(self):
+        t = trainer(QTable_file=None, trace_lambda=0.5, adaptive=True)
+        t.record_stats = True
+        state = t.discretizer.get_state(0.0, 0.0, 0.0)
+        new_states = t.discretizer._split(state, 0)
+        t.update_q_values_backwards([(state, True, 10.0), (new_states[0], False, 20.0)], 100.0)
+        self.assertTrue((new_states[0], False) in t.QTable)
+        self.assertFalse((state, True) in t.QTable)
+        self.assertEqual(t.q_stats.get_visits((state, True)), 0)
+        
+    def test_train_one_session_with_trace(self):
+        t = trainer(QTable_file=None, trace_lambda=0.8)
+        for _ in xrange(20):
+            t.train_one_session(False)
+        self.assertTrue(len(t.QTable) > 0)
+        self.assertTrue(any(k[1] in ('x', 's') for k in t.QTable))
+        
+    def test_save_without_file(self):
+        t = trainer(QTable_file=None)
+        t.update_q_value((1, 1, 1), True, 10.0)
+        self.assertEqual(t.save_q_table(), 0)
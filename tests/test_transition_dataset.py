@@ -0,0 +1,56 @@
+import unittest
+import shutil
+import tempfile
+import numpy as np
+from transition_dataset import generate, transition_dataset, fit_q_table
+from trainer import trainer
+
+class test_transition_dataset(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_generate_and_iterate(self):
+        self.assertEqual(generate(self.dir, 2500, producers=2, chunk_size=1000, frame_shape=(10, 20)), 3)
+        dataset = transition_dataset(self.dir)
+        self.assertEqual(len(dataset), 2500)
+        self.assertEqual(dataset.fields[-2:], ('frames', 'next_frames'))
+        n = 0
+        dones = 0
+        for batch in dataset.iterate_minibatches(300, np.random.RandomState(0), dataset.fields):
+            # slices of the memory-mapped chunks
+            self.assertTrue(isinstance(batch['states'], np.memmap))
+            self.assertEqual(batch['frames'].shape[1:], (10, 20))
+            n += len(batch['states'])
+            dones += batch['dones'].sum()
+        self.assertEqual(n, 2500)
+        self.assertTrue(0 < dones < 2500)
+
+    def test_fit_q_table(self):
+        generate(self.dir, 5000, producers=1, chunk_size=5000)
+        t = trainer(None)
+        self.assertEqual(fit_q_table(t, transition_dataset(self.dir), epochs=2, batch_size=500), 10000)
+        deaths = [v for (state, action), v in t.QTable.iteritems() if action == 'x']
+        scores = [v for (state, action), v in t.QTable.iteritems() if action == 's']
+        self.assertTrue(deaths and max(deaths) < 0)
+        self.assertTrue(scores and min(scores) > 0)
+        self.assertTrue(any(action is True for state, action in t.QTable))
+
+    def test_fit_keeps_the_states_outside_the_ranges(self):
+        generate(self.dir, 5000, producers=1, chunk_size=5000)
+        dataset = transition_dataset(self.dir)
+        t = trainer(None)
+        t.QTable[((0.0, 0.0, -40.0), False)] = 7.0
+        fit_q_table(t, dataset)
+        # each transition updated the entry of its own bins, none was merged into an edge bin
+        mins = np.array(t.get_state_mins())
+        steps = np.array([t.step_dx, t.step_dy, t.step_dvy])
+        chunk = dataset.chunks[0]
+        for state, action in zip(np.floor((chunk['states'] - mins) / steps), chunk['actions']):
+            self.assertIn((tuple(float(s) for s in state), bool(action)), t.QTable)
+        self.assertEqual(t.QTable[((0.0, 0.0, -40.0), False)], 7.0)
+
+    def test_generate_fails_with_a_producer(self):
+        self.assertRaises(RuntimeError, generate, self.dir, 100, producers=1, frame_shape=(-1, 10))
@@ -3,126 +3,230 @@
 # Run the training sessions. It will load the Q-table, and update it with the training results
 
 from __future__ import division
-from flappy_bird import flappy_bird_game, bird
-from graphic_display import graphic_display
+from flappy_bird import flappy_bird_game
+from game_config import default_config
 from null_display import null_display
+from planner import lookahead_planner
+from discretizer import uniform_discretizer, adaptive_discretizer, get_stats
+from start_sampler import uniform_start_sampler, prioritized_start_sampler, curriculum
+from metrics import null_metrics, metrics_sink
+from checkpoint import checkpointer, tracked_table
+from q_store import q_store
+import argparse
 import random
-import logging.config
+import logging
+from log_setup import get_logger
 import math
-import pickle
 import os
 import time
 
-logging.config.fileConfig('logging.conf')
-logger = logging.getLogger('flappy_bird.trainer')
+logger = get_logger('flappy_bird.trainer')
+
+def get_distances(game, training):
+    '''
+    Returns the horizontal and vertical distances of the bird to the pillar, and its vertical speed
+    '''
+    pillar_idx = 0
+    if not training:
+        # training always reference pillar 0
+        for i in xrange(len(game.pillars)):
+            p = game.pillars[i]
+            _, p_x_max = p.get_x_range()
+            if p_x_max > game.bird.x:
+                pillar_idx = i
+                break
+    dx = game.pillars[pillar_idx].x + game.pillar_width - game.bird.x
+    dy = game.bird.y - game.pillars[pillar_idx].gap_y_min
+    return dx, dy, game.bird.yspeed
+
+def get_lambda_returns(scores, terminal_reward, trace_lambda, block=256):
+    '''
+    Returns the array of the lambda-returns G[i] = (1-lambda) * scores[i] + lambda * G[i+1] of the steps, where G after
+    the last step is the terminal reward. Each block of steps is one product with the matrix lambda^(j-i) for j >= i,
+    so that no power of lambda exceeds the block
+    '''
+    # import on demand, so that the other modes don't load numpy
+    import numpy as np
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    returns = np.empty(n)
+    m = min(n, block)
+    exponents = np.subtract.outer(np.arange(m), np.arange(m))
+    kernel = np.where(exponents <= 0, trace_lambda ** np.maximum(-exponents, 0), 0.0)    # [i, j]: lambda^(j-i)
+    tail = trace_lambda ** np.arange(m, 0, -1)                                          # [i]: lambda^(m-i)
+    g = terminal_reward
+    for end in xrange(n, 0, -block):
+        start = max(end - block, 0)
+        k = end - start
+        returns[start:end] = (1 - trace_lambda) * kernel[:k, :k].dot(scores[start:end]) + tail[m-k:] * g
+        g = returns[start]
+    return returns
 
 class trainer:
     '''
     Run the training sessions
     '''
-    def __init__(self):
+    def __init__(self, QTable_file='data/QTable_v1', trace_lambda=0.0, adaptive=False, prioritized_start=False, pillar_curriculum=None, config=default_config):
+        '''
+        QTable_file: the Q-table is loaded from and stored to it. With None, start with an empty Q-table
+        trace_lambda: with 0, each step updates its Q-value right away toward the one-step bootstrapped score.
+                      Otherwise the session is updated at the end with lambda-returns
+        adaptive: states are the leaves of a k-d tree refined where the TD errors vary, instead of fixed bins
+        prioritized_start: sessions start more often where the TD errors are high or which are rarely visited
+        pillar_curriculum: a curriculum of the pillars of the sessions, or None to always use the game's
+        config: the game_config of the games played and trained, which the state ranges are derived from
+        '''
+        self.config = config
         #self.n_state_x = 20
         #self.n_state_y = 20
         self.n_state_vy = 10
         
-        self.dx_min = 0
-        # bird initial location or after it clears a pillar, to the next pillar
-        self.dx_max = max(flappy_bird_game.pillar_x0 + flappy_bird_game.pillar_width - flappy_bird_game.bird_x0, flappy_bird_game.pillar_x_interval)
+        self.dx_min = config.dx_min
+        self.dx_max = config.dx_max
         
         #self.dy_max = flappy_bird_game.height - flappy_bird_game.pillar_piece_min_length
-        self.dy_max = 4.8
-        self.dy_min = -self.dy_max 
+        self.dy_max = config.dy_max
+        self.dy_min = config.dy_min
         
         #self.step_dx = (self.dx_max - self.dx_min)/self.n_state_x
         #self.step_dy = (self.dy_max - self.dy_min)/self.n_state_y
-        self.step_dx = 0.2  # same as the resolution of x in movement
-        self.step_dy = 0.4  # same as the size of the bird
+        self.step_dx = config.time_per_move * config.xspeed  # same as the resolution of x in movement
+        self.step_dy = config.bird_size  # same as the size of the bird
         
-        self.vy_max = bird.yspeed_after_jump
-        # time to fall from the top to bottom
-        t_fall = math.sqrt(2 * self.dy_max / math.fabs(bird.yaccelation))
-        self.vy_min = t_fall * bird.yaccelation
+        self.vy_max = config.vy_max
+        self.vy_min = config.vy_min
         self.step_dvy = (self.vy_max - self.vy_min) / self.n_state_vy  
         
         logging.info('x: ({:.2f}, {:.2f}), delta: {:.2f}'.format(self.dx_min, self.dx_max, self.step_dx))
         logging.info('y: ({:.2f}, {:.2f}), delta: {:.2f}'.format(self.dy_min, self.dy_max, self.step_dy))
         logging.info('vy: ({:.2f}, {:.2f}), delta: {:.2f}'.format(self.vy_min, self.vy_max, self.step_dvy))
         
+        if adaptive:
+            self.discretizer = adaptive_discretizer(self.get_state_mins(), self.get_state_maxs())
+        else:
+            self.discretizer = uniform_discretizer(self.get_state_mins(), (self.step_dx, self.step_dy, self.step_dvy))
+        
         self.alpha = 0.1 # learning rate
+        self.alpha_decay = None # with w, the learning rate of an entry updated n times is 1/n^w instead of alpha
+        self.greedy_prob = 0.5 # probability that a training step takes the best action, otherwise a random one
+        self.exploration_bonus = None # with c, a training step takes the best action by value + c/sqrt(n+1) instead
+        self.record_stats = False # count the updates of the entries without alpha_decay and exploration_bonus too, for dump_q_table
+        self.trace_lambda = trace_lambda
+        
+        if prioritized_start:
+            self.start_sampler = prioritized_start_sampler(self.vy_min, self.vy_max, config.height)
+        else:
+            self.start_sampler = uniform_start_sampler(self.vy_min, self.vy_max, config.yspeed_after_jump, config.height)
+        self.curriculum = pillar_curriculum
+        # visits of the states in the training sessions, and the absolute TD errors of the current session
+        self.state_visits = dict()
+        self.session_td_error = 0.0
+        self.session_updates = 0
+        self.display = None
+        # the training metrics, see metrics.metrics_sink
+        self.metrics = null_metrics()
         
-        self.QTable_file = 'data/QTable_v1'
-        self.QTable = dict()
-        if os.path.isfile(self.QTable_file):
-            self.QTable = pickle.load(open(self.QTable_file,'rb'))
-            print 'Loaded Q-table from file. Total entries: ', len(self.QTable)
+        self.QTable_file = QTable_file
+        self.QTable = tracked_table()
+        # visit counts and last TD errors of the entries, see q_store
+        self.q_stats = q_store(None if QTable_file is None else QTable_file + '.stats')
+        # the Q-table is saved incrementally, see checkpoint.checkpointer
+        self.checkpointer = None
+        self.checkpoint_interval = None    # seconds between the automatic saves while training silently, None for no saves
+        if self.QTable_file is not None:
+            self.checkpointer = checkpointer(self.QTable_file)
+            if os.path.isfile(self.QTable_file) or os.path.isfile(self.checkpointer.log_filename):
+                self.QTable = self.checkpointer.load()
+                self.discretizer.load(self.QTable_file)
+                print 'Loaded Q-table from file. Total entries: ', len(self.QTable)
+        if len(self.q_stats) > 0:
+            # e.g. the Q-table file was replaced or not saved with its statistics
+            n_dropped = self.q_stats.retain(self.QTable)
+            if n_dropped > 0:
+                logger.warning('dropped the statistics of {} entries not in the Q-table'.format(n_dropped))
+        
+    def get_graphic_display(self, game):
+        '''
+        Returns the graphic display showing the game. The display is created once and re-bound to later games
+        '''
+        if self.display is None:
+            # import on demand, so that the headless modes don't load pygame
+            from graphic_display import graphic_display
+            self.display = graphic_display(game)
+        else:
+            self.display.bind(game)
+        return self.display
+    
+    def set_bin_sizes(self, step_dx, step_dy, n_state_vy):
+        '''
+        Use fixed bins of the given sizes. The Q-table should be empty, since its states are those of the old bins
+        '''
+        self.step_dx = step_dx
+        self.step_dy = step_dy
+        self.n_state_vy = n_state_vy
+        self.step_dvy = (self.vy_max - self.vy_min) / self.n_state_vy
+        self.discretizer = uniform_discretizer(self.get_state_mins(), (self.step_dx, self.step_dy, self.step_dvy))
         
     def get_state(self, game, training):
         '''
-        Returns state in (state_x, state_y, state_vy), where
+        Returns the state of the discretizer. With the fixed bins, it is (state_x, state_y, state_vy), where
         state_x is quantified horizontal distance of the bird to the pillar, and
         state_y is that of vertical distance, and
         state_vy is that of the vertical speed
         '''
-        pillar_idx = 0
-        if not training:
-            # training always reference pillar 0
-            for i in xrange(len(game.pillars)):
-                p = game.pillars[i]
-                _, p_x_max = p.get_x_range()
-                if p_x_max > game.bird.x:
-                    pillar_idx = i
-                    break
-        dx = game.pillars[pillar_idx].x + game.pillar_width - game.bird.x
-        dy = game.bird.y - game.pillars[pillar_idx].bottom_rect[1][1]
-        logging.debug('state dx={:.2f} dy={:.2f}, vy={:.2f}'.format(dx, dy, game.bird.yspeed))
-        state_x = self._quantify_distance_x(dx)
-        state_y = self._quantify_distance_y(dy)
-        state_vy = self._quantify_speed_y(game.bird.yspeed)
-        state = (state_x, state_y, state_vy)
-        logging.debug('quantified state={}'.format(state))
-        return state
+        dx, dy, vy = self.get_distances(game, training)
+        return self.discretizer.get_state(dx, dy, vy)
     
-    def _quantify_distance_x(self, dx):
+    def get_distances(self, game, training):
         '''
-        Evenly partition it from [min, max]
+        Returns the horizontal and vertical distances of the bird to the pillar, and its vertical speed
         '''
-        return math.floor((dx - self.dx_min)/self.step_dx)
+        return get_distances(game, training)
     
-    def _quantify_distance_y(self, dy):
-        '''
-        Evenly partition it from [min, max]
-        '''
-        return math.floor((dy - self.dy_min)/self.step_dy)
-
-    def _quantify_speed_y(self, vy):
+    def get_state_mins(self):
+        return (self.dx_min, self.dy_min, self.vy_min)
+    
+    def get_state_maxs(self):
+        return (self.dx_max, self.dy_max, self.vy_max)
+    
+    def _get_state_x(self, game):
         '''
-        Evenly partition it from [min, max]
+        Returns the quantified horizontal distance of the bird to the pillar of the training session
         '''
-        return math.floor((vy - self.vy_min)/self.step_dvy)
+        dx, _, _ = self.get_distances(game, training=True)
+        return math.floor((dx - self.dx_min)/self.step_dx)
     
     def _prompt(self):
         print 'Select from following options:'
         print ' x: quit'
         print ' p: play the game with learned Q-table'
+        print ' pr: play the game with the values of the policy server (see policy_server.py)'
+        print ' pl: play the game with the lookahead planner'
+        print ' l: train 100 sessions with the lookahead planner as teacher'
+        print ' lv: train silently in a worker process, showing the current policy live until the window is closed'
         print ' q: show Q-table'
+        print ' qs: show Q-table, with the memory of its entries and the time of the state lookups'
         print ' s: store Q-table'
-        print ' f: dump Q-table to text file'
+        print ' f: write the heatmaps of the Q-table values and policy to data/QTable_values.png and data/QTable_policy.png'
         print ' <n>: train n sessions'
         print ' <Return>: one interactive training session'
         user_input = raw_input('What do you want to do:')
         return user_input
     
-    def play(self):
+    def play(self, policy=None):
         '''
-        Play the game using learned Q-table
+        Play the game using learned Q-table, or the policy (e.g. a lookahead_planner) if given
         '''
-        game = flappy_bird_game()
-        display = graphic_display(game)
+        game = flappy_bird_game(config=self.config)
+        display = self.get_graphic_display(game)
         while not game.is_game_over:
             state = self.get_state(game, training=False)
             bird_yspeed = game.bird.yspeed
-            actions = game.get_legal_actions()
-            scores = [self.get_action_value(game, act, training=False) for act in actions]
+            if policy is None:
+                actions = game.get_legal_actions()
+                scores = [self.get_action_value(game, act, training=False) for act in actions]
+            else:
+                actions, scores = policy.get_action_values(game)
             action, max_score = self.select_action_with_max_score(actions, scores)
             game.move(action)
             if game.is_game_over:
@@ -132,7 +236,7 @@ class trainer:
                 print 'bird y-speed: ', bird_yspeed
                 print 'actions: ', actions
                 print 'scores: ', scores
-                if (state, action) in self.QTable.keys():
+                if (state, action) in self.QTable:
                     print '(state, action) is in the QTable'
                 else:
                     print '(state, action) is not in the QTable'
@@ -158,76 +262,123 @@ class trainer:
                 break
             if user_input == 'q':
                 self.dump_q_table()
+            elif user_input == 'qs':
+                self.dump_q_table(stats=True)
             elif user_input == 's':
-                pickle.dump(self.QTable, open(self.QTable_file, 'wb'))
-                print 'Stored Q-table'
+                n_written = self.save_q_table()
+                print 'Stored Q-table. Entries written: ', n_written
             elif user_input == 'f':
-                self.dump_q_table_to_file()
+                self.export_q_table()
             elif user_input == 'p':
                 # play the game using the learned Q-table
                 self.play()
+            elif user_input == 'pl':
+                self.play(lookahead_planner())
+            elif user_input == 'pr':
+                # import on demand, so that the other modes don't load numpy
+                from policy_server import policy_client
+                client = policy_client()
+                try:
+                    self.play(client)
+                finally:
+                    client.close()
+            elif user_input == 'lv':
+                import live_training
+                live_training.run(self, live_training.qtable_sync(self))
+            elif user_input == 'l':
+                teacher = self.get_teacher()
+                for i in xrange(100):
+                    self.train_one_session_with_teacher(teacher)
+                self.dump_q_table()
             elif user_input == '':
                 self.train_one_session()
             else:
                 n_sessions = eval(user_input)
+                last_save = time.time()
                 for i in xrange(n_sessions):
                     self.train_one_session(False)
                     if (i+1)%100 == 0:
                         print 'Finished {} sessions'.format(i+1)
+                    if self.checkpoint_interval is not None and time.time() - last_save > self.checkpoint_interval:
+                        self.save_q_table()
+                        last_save = time.time()
                 self.dump_q_table()
 
-    def dump_q_table(self):
-        print 'Q-table size: ', len(self.QTable)
-        n_entries_value_0 = 0
-        n_entries_greater_than_0 = 0
-        n_entries_less_than_0 = 0
-        for _, v in self.QTable.iteritems():
-            if v == 0:
-                n_entries_value_0 += 1
-            elif v < 0:
-                n_entries_less_than_0 += 1
-            else:
-                n_entries_greater_than_0 += 1
-        print '{} entries == 0'.format(n_entries_value_0)
-        print '{} entries < 0'.format(n_entries_less_than_0)
-        print '{} entries > 0'.format(n_entries_greater_than_0) 
+    def save_q_table(self):
+        '''
+        Checkpoint the entries of the Q-table changed since the last save. Returns the number of entries written,
+        0 without a Q-table file
+        '''
+        if self.checkpointer is None:
+            return 0
+        n_written = self.checkpointer.save(self.QTable)
+        self.q_stats.save()
+        self.discretizer.store(self.QTable_file)
+        return n_written
+    
+    def dump_q_table(self, stats=False):
+        '''
+        Print the report of the Q-table. With stats, also the memory of its entries and the time of the state lookups,
+        which walk the whole table
+        '''
+        # import on demand, so that the other modes don't load numpy
+        import q_analytics
+        arrays = q_analytics.q_table_arrays(self.QTable)
+        lo, hi = q_analytics.get_bin_range(self, arrays)
+        q_analytics.print_report(arrays, lo, hi)
+        print '{} entries, {:.1f} KB as arrays'.format(len(arrays), arrays.get_nbytes()/1024.0)
+        if stats:
+            stats = get_stats(self.discretizer, self.QTable, self.get_state_mins(), self.get_state_maxs())
+            print '{} states, about {:.1f} KB, {:.2f} us per state lookup'.format(stats['states'], stats['bytes']/1024.0, stats['lookup_us'])
+        summary = self.q_stats.get_summary()
+        if summary['entries'] > 0:
+            print '{} entries updated {} times, {:.1f} times on average, mean |last TD error| {:.2f}'.format(
+                summary['entries'], summary['visits'], summary['mean_visits'], summary['mean_abs_td_error'])
+            print 'entries by visits: {}'.format(', '.join('>={}: {}'.format(v, n) for v, n in summary['visit_histogram']))
+        if len(self.state_visits) > 0:
+            n_rare = sum(1 for v in self.state_visits.itervalues() if v < 10)
+            print '{} states visited in training, {} of them less than 10 times'.format(len(self.state_visits), n_rare)
+        coverage = self.start_sampler.get_coverage()
+        if coverage is not None:
+            print 'sessions started from {} of {} start cells'.format(*coverage)
         #print 'Q-table: '
         #print self.QTable
     
-    def dump_q_table_to_file(self):
+    def export_q_table(self, prefix='data/QTable'):
         '''
-        Dump Q-table to a text file, QTable.txt, sorted by the key
+        Write the heatmaps of the max value and the greedy policy of the states, a (dx, dy) map per vy slice
         '''
-        with open('data/QTable.txt', 'w') as f:
-            for k in sorted(self.QTable.keys()):
-                f.write('{}: {}\n'.format(k, self.QTable[k]))
+        import q_analytics
+        if self.discretizer.get_n_states() is not None:
+            print 'The heatmaps need the fixed bins'
+            return
+        arrays = q_analytics.q_table_arrays(self.QTable)
+        lo, hi = q_analytics.get_bin_range(self, arrays)
+        filenames = q_analytics.export_heatmaps(arrays, lo, hi, prefix)
+        print 'Wrote', ', '.join(filenames)
         
     def train_one_session(self, user_interactive = True):
         '''
         Run one training session
         '''
-        game = flappy_bird_game()
-        bird = game.bird
-        bird.x = 2.0
-        r = random.random()
-        bird.y = r * flappy_bird_game.height
-        dice = random.random()
-        if dice < 0.2:
-            bird.yspeed = 1.5       # 20% for the bird just jumped
-        else:
-            r = random.random()
-            bird.yspeed = r * (self.vy_max - self.vy_min) + self.vy_min
+        game = self.create_training_game()
+        start = (game.bird.y, game.bird.yspeed)
 
         if user_interactive:
-            display = graphic_display(game)
+            display = self.get_graphic_display(game)
         else:
             display = null_display(game)
         
         game_over = game.is_game_over
         just_scored = game.just_scored
+        
+        # (state, action, bootstrapped score) of the steps, if updated at the end of the session
+        trajectory = [] if self.trace_lambda > 0 else None
+        steps = 0
 
         while not game_over and not just_scored:
             state = self.get_state(game, training=True)
+            self.state_visits[state] = self.state_visits.get(state, 0) + 1
             #print 'state: ', state
             #raw_input('press key to continue...')
             game_over = game.is_game_over
@@ -239,9 +390,12 @@ class trainer:
                 else:
                     print 'No score change'
             if game_over:
-                self.update_q_value(state, 'x', -5 * state[0] - 10)  # The closer the less the negative score
-                if state[0] == -1:
-                    display = graphic_display(game)
+                state_x = self._get_state_x(game)
+                self.update_q_value(state, 'x', -5 * state_x - 10)  # The closer the less the negative score
+                if trajectory is not None:
+                    self.update_q_values_backwards(trajectory, -5 * state_x - 10)
+                if state_x == -1:
+                    display = self.get_graphic_display(game)
                     print 'bird is at (x={}, y={})'.format(game.bird.x, game.bird.y)
                     print 'pillar[0] top {}, bottom'.format(game.pillars[0].top_rect, game.pillars[0].bottom_rect)
                     print 'state: {}'.format(state)
@@ -249,40 +403,135 @@ class trainer:
             elif just_scored:
                 logging.debug('Found path to score!!!')
                 self.update_q_value(state, 's', +100)
+                if trajectory is not None:
+                    self.update_q_values_backwards(trajectory, +100)
             else:
                 actions = game.get_legal_actions()
                 scores = [self.get_action_value(game, act, training=True) for act in actions]
                 if user_interactive:
                     print 'actions: {}, scores: {}'.format(actions, scores)
                     for i in xrange(len(actions)):
-                        if (state, actions[i]) in self.QTable.keys():
+                        if (state, actions[i]) in self.QTable:
                             print '{} is in Q-table. Value={}'.format((state, actions[i]), self.QTable[(state, actions[i])])
                         else:
                             print '{} is not in Q-table'.format((state, actions[i]))
-                dice = random.random()
-                if dice < 0.5:
+                if self.exploration_bonus is not None:
+                    action, max_score = self.select_action_with_bonus(state, actions, scores)
+                elif random.random() < self.greedy_prob:
                     action, max_score = self.select_action_with_max_score(actions, scores)
                 else:
                     action, max_score = self.select_action_for_training(actions, scores)
                 if user_interactive:
                     action_text = self.get_action_text(action)             
                     print 'Take action {}, score {}'.format(action_text, max_score)
-                self.update_q_value(state, action, max_score)
+                if trajectory is None:
+                    self.update_q_value(state, action, max_score)
+                else:
+                    trajectory.append((state, action, max_score))
                 if user_interactive:
-                    if (state, action) in self.QTable.keys():
+                    if (state, action) in self.QTable:
                         print '{} is in Q-table. Value={}'.format((state, action), self.QTable[(state, action)])
                     else:
                         print '{} is not in Q-table'.format((state, action))
                 game.move(action)
+                steps += 1
             if user_interactive:
                 print 'Take action: ', action
                 print 'Just scored? : ', game.just_scored
                 raw_input('Press any key to continue')
             display.update_display()
         
+        self.end_session(start, just_scored, steps)
         #if user_interactive:
         #    raw_input('Press any key to continue')
     
+    def evaluate(self, n_games=10, max_score=500):
+        '''
+        Play n games silently with the learned Q-table, and returns their scores. A game stops at max_score
+        '''
+        scores = []
+        for _ in xrange(n_games):
+            game = flappy_bird_game(config=self.config)
+            while not game.is_game_over and game.score < max_score:
+                actions = game.get_legal_actions()
+                values = [self.get_action_value(game, act, training=False) for act in actions]
+                action, _ = self.select_action_with_max_score(actions, values)
+                game.move(action)
+            scores.append(game.score)
+            self.metrics.observe('eval_score', game.score)
+        return scores
+    
+    def create_training_game(self):
+        '''
+        Returns a game with the bird at a random start state in front of the first pillar
+        '''
+        config = self.config
+        if self.curriculum is not None:
+            config = self.curriculum.get_config(config)
+        game = flappy_bird_game(config=config)
+        bird = game.bird
+        bird.x = 2.0
+        bird.y, bird.yspeed = self.start_sampler.sample()
+        self.session_td_error = 0.0
+        self.session_updates = 0
+        return game
+    
+    def end_session(self, start, scored, steps):
+        '''
+        Let the start sampler and the curriculum learn from the session, and record its metrics
+        '''
+        if self.session_updates > 0:
+            self.start_sampler.record(start, self.session_td_error / self.session_updates)
+            self.metrics.observe('td_error', self.session_td_error / self.session_updates)
+        if self.curriculum is not None:
+            self.curriculum.record(scored)
+        self.metrics.count('sessions')
+        self.metrics.count('steps', steps)
+        self.metrics.observe('episode_length', steps)
+        self.metrics.observe('score', 1 if scored else 0)
+        self.metrics.gauge('qtable_size', len(self.QTable))
+    
+    def get_teacher(self, max_depth=6):
+        '''
+        Returns a lookahead planner whose action values are Q-targets: it gets the same rewards
+        as the training sessions, and the values of the Q-table at its leaves. Its deaths are worth exactly the
+        death rewards, without the preference for later deaths
+        '''
+        return lookahead_planner(max_depth=max_depth, time_budget=0.2,
+                                 leaf_value=self._get_leaf_value, death_value=self._get_death_reward,
+                                 score_value=100, stop_at_score=True, prefer_later_death=False)
+    
+    def _get_leaf_value(self, game):
+        state = self.get_state(game, training=True)
+        return max(self.QTable.get((state, act), 0.0) for act in game.get_legal_actions())
+    
+    def _get_death_reward(self, game):
+        return -5 * self._get_state_x(game) - 10       # The closer the less the negative score
+    
+    def train_one_session_with_teacher(self, teacher):
+        '''
+        Run one training session, where the teacher values every action of every state visited,
+        and the Q-values are updated toward them. The bird follows the teacher's best action
+        '''
+        game = self.create_training_game()
+        start = (game.bird.y, game.bird.yspeed)
+        steps = 0
+        while not game.is_game_over and not game.just_scored:
+            state = self.get_state(game, training=True)
+            self.state_visits[state] = self.state_visits.get(state, 0) + 1
+            actions, values = teacher.get_action_values(game)
+            for i in xrange(len(actions)):
+                self.update_q_value(state, actions[i], values[i])
+            action, _ = self.select_action_with_max_score(actions, values)
+            game.move(action)
+            steps += 1
+        state = self.get_state(game, training=True)
+        if game.is_game_over:
+            self.update_q_value(state, 'x', self._get_death_reward(game))
+        else:
+            self.update_q_value(state, 's', +100)
+        self.end_session(start, game.just_scored, steps)
+    
     def select_action_with_max_score(self, actions, scores):
         '''
         Returns the action based on the scores
@@ -304,6 +553,15 @@ class trainer:
         idx = action_indices_with_max_scores[idx]
         return actions[idx], scores[idx]
 
+    def select_action_with_bonus(self, state, actions, scores):
+        '''
+        Returns the action with the max score plus its exploration bonus, which is larger the less
+        the entry was updated, and the score of the action
+        '''
+        bonus_scores = [scores[i] + self.q_stats.get_bonus((state, actions[i]), self.exploration_bonus) for i in xrange(len(actions))]
+        action, _ = self.select_action_with_max_score(actions, bonus_scores)
+        return action, scores[actions.index(action)]
+
     def get_action_value(self, game, action, training):
         '''
         Returns the max Q-value of the state if the aciton is taken
@@ -322,20 +580,65 @@ class trainer:
         max_score = max(self.QTable.get((state, act), 0.0) for act in actions)
         return max_score
         
+    def update_q_values_backwards(self, trajectory, terminal_reward):
+        '''
+        Update the Q-values of the (state, action, bootstrapped score) steps of a session toward their lambda-returns,
+        see get_lambda_returns. The terminal reward thus reaches all the states of the session at once, not one state
+        back per visit. The updates are applied together, unless an update depends on the previous ones: with the
+        statistics of the entries, the splits of the adaptive states, or an entry visited twice. Then they are applied
+        from the end to the start, skipping the steps of states split during the replay
+        '''
+        import numpy as np
+        keys = [(state, action) for state, action, _ in trajectory]
+        returns = get_lambda_returns([score for _, _, score in trajectory], terminal_reward, self.trace_lambda)
+        if (self.discretizer.get_n_states() is not None or self.alpha_decay is not None or self.exploration_bonus is not None
+                or self.record_stats or len(set(keys)) < len(keys)):
+            for (state, action), g in reversed(zip(keys, returns.tolist())):
+                if self.discretizer.is_leaf(state):
+                    self.update_q_value(state, action, g)
+            return
+        old_values = np.array([self.QTable.get(key, 0.0) for key in keys])
+        new_values = self.alpha * returns + (1-self.alpha) * old_values
+        for key, value in zip(keys, new_values.tolist()):
+            self.QTable[key] = value
+        self.session_td_error += float(np.abs(returns - old_values).sum())
+        self.session_updates += len(keys)
+    
     def update_q_value(self, state, action, score):
         key = (state, action)
-        if key not in self.QTable.keys():
+        if key not in self.QTable:
             self.QTable[key] = 0.0
             logging.debug('QTable: new size: {}'.format(len(self.QTable)))
         old_value = self.QTable[key]
-        new_value = self.alpha * score + (1-self.alpha) * old_value
+        if self.alpha_decay is not None or self.exploration_bonus is not None or self.record_stats:
+            self.q_stats.record(key, score - old_value)
+            alpha = self.q_stats.get_learning_rate(key, self.alpha, self.alpha_decay)
+        else:
+            alpha = self.alpha
+        new_value = alpha * score + (1-alpha) * old_value
         self.QTable[key] = new_value
+        self.session_td_error += abs(score - old_value)
+        self.session_updates += 1
+        new_states = self.discretizer.observe(state, score - old_value)
+        if new_states is not None:
+            self.split_state(state, new_states)
         logging.debug('New sample {} with score {}'.format((state, action), score))
         logging.debug('Value update {:.2f} -> {:.2f}'.format(old_value, new_value))
     
+    def split_state(self, state, new_states):
+        '''
+        The discretizer replaced the state with new ones. They start with the Q-values of the state
+        '''
+        for action in [True, False, 'x', 's']:
+            value = self.QTable.pop((state, action), None)
+            self.q_stats.remove((state, action))
+            if value is not None:
+                for new_state in new_states:
+                    self.QTable[(new_state, action)] = value
+    
     def get_q_value(self, state, action):
         key = (state, action)
-        if key not in self.QTable.keys():
+        if key not in self.QTable:
             self.QTable[key] = 0.0
             logging.debug('QTable: new size: {}'.format(len(self.QTable)))
         return self.QTable[key]
@@ -350,5 +653,37 @@ class trainer:
         return action_text
         
 if __name__ == '__main__':
-    trainer = trainer()
-    trainer.train()
+    parser = argparse.ArgumentParser('Train the AI player with Q-learning')
+    parser.add_argument('--trace-lambda', type=float, default=0.0,
+                        help='lambda of the returns the sessions are updated with. 0 for one-step updates (default=%(default)s)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='use states refined where the TD errors vary, stored in data/QTable_adaptive, instead of fixed bins')
+    parser.add_argument('--prioritized-start', action='store_true',
+                        help='start the sessions more often where the TD errors are high or rarely visited')
+    parser.add_argument('--curriculum', action='store_true',
+                        help='train with wider pillar gaps first, narrowing them as the sessions succeed')
+    parser.add_argument('--alpha-decay', type=float, default=None, metavar='W',
+                        help='learning rate 1/n^W of an entry updated n times, e.g. 1 or 0.6, instead of the constant 0.1')
+    parser.add_argument('--exploration-bonus', type=float, default=None, metavar='C',
+                        help='explore by the bonus C/sqrt(n+1) of the entries updated n times, instead of random actions half of the time')
+    parser.add_argument('--record-stats', action='store_true',
+                        help='count the updates of the entries for the report of the Q-table, also without --alpha-decay and --exploration-bonus')
+    parser.add_argument('--checkpoint-interval', type=float, default=None, metavar='SECONDS',
+                        help='save the changes of the Q-table every this many seconds while training silently')
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help='append summaries of the training metrics to the file, CSV if it ends with .csv, otherwise JSONL')
+    args = parser.parse_args()
+    
+    QTable_file = 'data/QTable_adaptive' if args.adaptive else 'data/QTable_v1'
+    pillar_curriculum = curriculum() if args.curriculum else None
+    trainer = trainer(QTable_file, args.trace_lambda, args.adaptive, args.prioritized_start, pillar_curriculum)
+    trainer.alpha_decay = args.alpha_decay
+    trainer.exploration_bonus = args.exploration_bonus
+    trainer.record_stats = args.record_stats
+    trainer.checkpoint_interval = args.checkpoint_interval
+    if args.metrics is not None:
+        trainer.metrics = metrics_sink(args.metrics)
+    try:
+        trainer.train()
+    finally:
+        trainer.metrics.close()
@@ -0,0 +1,306 @@
+# !/usr/bin/python
+
+# Simulate once, train many times: the transitions of many headless games are streamed to disk, and
+# the learners read them back instead of driving flappy_bird_game live.
+#
+# Producer processes play the games with an epsilon-random heuristic policy and put chunks of transitions
+# into a bounded queue, so that at most queue_size chunks are held in memory. The writer shuffles the rows
+# of each chunk and saves its fields to .npy files:
+#   <dir>/meta.json                 the chunk lengths, the fields and the game parameters
+#   <dir>/chunk_00000_<field>.npy   states, actions, rewards, next_states, dones [, frames, next_frames]
+# The loader memory-maps the chunks, and iterates minibatches that are slices of them, without copies.
+# As the rows of a chunk are shuffled when written, contiguous slices in a shuffled order are shuffled
+# minibatches.
+
+from __future__ import division
+import argparse
+import json
+import multiprocessing
+import os
+import Queue
+import random
+import time
+
+import numpy as np
+
+from environment import flappy_bird_env
+from game_config import game_config, default_config
+from discretizer import uniform_discretizer
+
+fields = ('states', 'actions', 'rewards', 'next_states', 'dones')
+frame_fields = ('frames', 'next_frames')
+
+def get_action(game, rng, epsilon):
+    '''
+    Jump when falling low in the gap of the next pillar, or a random action with probability epsilon
+    '''
+    if rng.random() < epsilon:
+        return rng.random() < 0.5
+    bird = game.bird
+    for p in game.pillars:
+        if p.x + p.width > bird.x:
+            return bird.y < p.gap_y_min + 0.3 * (p.gap_y_max - p.gap_y_min) and bird.yspeed < 0
+    return False
+
+def _new_chunk(chunk_size, frame_shape):
+    chunk = {
+        'states': np.zeros((chunk_size, 3)),
+        'actions': np.zeros(chunk_size, dtype=np.int8),
+        'rewards': np.zeros(chunk_size, dtype=np.float32),
+        'next_states': np.zeros((chunk_size, 3)),
+        'dones': np.zeros(chunk_size, dtype=np.bool_),
+    }
+    if frame_shape is not None:
+        chunk['frames'] = np.zeros((chunk_size,) + tuple(frame_shape), dtype=np.uint8)
+        chunk['next_frames'] = np.zeros((chunk_size,) + tuple(frame_shape), dtype=np.uint8)
+    return chunk
+
+def produce(queue, chunk_sizes, config, seed, epsilon=0.2, frame_shape=None):
+    '''
+    Play games until the chunks of the sizes are filled, and put each into the queue, then None
+    '''
+    rng = random.Random(seed)
+    env = flappy_bird_env(config=config, seed=rng.getrandbits(32))
+    frame = np.zeros(frame_shape, dtype=np.uint8) if frame_shape is not None else None
+    state = env.reset().copy()
+    if frame is not None:
+        env.draw(frame)
+    for chunk_size in chunk_sizes:
+        chunk = _new_chunk(chunk_size, frame_shape)
+        for i in xrange(chunk_size):
+            action = get_action(env.game, rng, epsilon)
+            next_state, reward, done, _ = env.step(action)
+            chunk['states'][i] = state
+            chunk['actions'][i] = action
+            chunk['rewards'][i] = reward
+            chunk['next_states'][i] = next_state
+            chunk['dones'][i] = done
+            if frame is not None:
+                chunk['frames'][i] = frame
+                env.draw(frame)
+                chunk['next_frames'][i] = frame
+            if done:
+                next_state = env.reset()
+                if frame is not None:
+                    env.draw(frame)
+            state[:] = next_state
+        queue.put(chunk)
+    queue.put(None)
+
+def get_chunk_filename(directory, chunk_idx, field):
+    return os.path.join(directory, 'chunk_{:05d}_{}.npy'.format(chunk_idx, field))
+
+def generate(directory, n_transitions, config=default_config, producers=None, chunk_size=None,
+             queue_size=4, epsilon=0.2, frame_shape=None, seed=0):
+    '''
+    Write n_transitions transitions of headless games to the directory. Returns the number of chunks
+    producers: processes playing the games, the number of CPUs by default
+    chunk_size: transitions per chunk, 65536 by default, or 4096 with frames
+    queue_size: chunks held in memory between the producers and the writer
+    frame_shape: (rows, columns) of the frames of the states, see flappy_bird_env, or None for no frames
+    Raises RuntimeError if a producer fails
+    '''
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    if producers is None:
+        producers = multiprocessing.cpu_count()
+    if chunk_size is None:
+        chunk_size = 65536 if frame_shape is None else 4096
+    chunk_sizes = [chunk_size] * (n_transitions // chunk_size)
+    if n_transitions % chunk_size:
+        chunk_sizes.append(n_transitions % chunk_size)
+    producers = max(1, min(producers, len(chunk_sizes)))
+
+    rng = np.random.RandomState(seed)
+    queue = multiprocessing.Queue(queue_size)
+    processes = [multiprocessing.Process(target=produce, args=(queue, chunk_sizes[i::producers], config,
+                                                               seed * 1000003 + i, epsilon, frame_shape))
+                 for i in xrange(producers)]
+    for p in processes:
+        p.daemon = True
+        p.start()
+
+    lengths = []
+    running = producers
+    while running > 0:
+        try:
+            chunk = queue.get(timeout=1.0)
+        except Queue.Empty:
+            failed = [p.exitcode for p in processes if p.exitcode not in (None, 0)]
+            if failed:
+                for p in processes:
+                    p.terminate()
+                raise RuntimeError('a producer failed with exit code {}'.format(failed[0]))
+            continue
+        if chunk is None:
+            running -= 1
+            continue
+        order = rng.permutation(len(chunk['states']))
+        for field, values in chunk.iteritems():
+            np.save(get_chunk_filename(directory, len(lengths), field), values[order])
+        lengths.append(len(order))
+    for p in processes:
+        p.join()
+
+    meta = {
+        'chunk_lengths': lengths,
+        'fields': list(fields + (frame_fields if frame_shape is not None else ())),
+        'config': config.as_dict(),
+        'score_reward': 1.0,
+        'death_reward': -1.0,
+        'epsilon': epsilon,
+    }
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f, sort_keys=True, indent=1)
+    return len(lengths)
+
+class transition_dataset(object):
+    '''
+    The chunks of a directory written by generate, memory-mapped
+    '''
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.directory = directory
+        self.fields = tuple(self.meta['fields'])
+        self.config = game_config(**self.meta['config'])
+        self.chunks = [dict((field, np.load(get_chunk_filename(directory, i, field), mmap_mode='r'))
+                            for field in self.fields)
+                       for i in xrange(len(self.meta['chunk_lengths']))]
+
+    def __len__(self):
+        return sum(self.meta['chunk_lengths'])
+
+    def iterate_minibatches(self, batch_size, rng=np.random, fields=fields):
+        '''
+        Yield dicts of the fields of minibatches of up to batch_size transitions, covering the dataset once.
+        The arrays are slices of the memory-mapped chunks: copy them to keep them
+        '''
+        batches = [(i, start) for i, length in enumerate(self.meta['chunk_lengths'])
+                   for start in xrange(0, length, batch_size)]
+        for idx in rng.permutation(len(batches)):
+            i, start = batches[idx]
+            chunk = self.chunks[i]
+            yield dict((field, chunk[field][start:start + batch_size]) for field in fields)
+
+def _update_means(values, idx, targets, alpha):
+    '''
+    Move the values of the indices toward the mean of their targets in the batch
+    '''
+    counts = np.bincount(idx, minlength=len(values))
+    sums = np.bincount(idx, targets, minlength=len(values))
+    updated = counts > 0
+    values[updated] += alpha * (sums[updated] / counts[updated] - values[updated])
+    return updated
+
+def fit_q_table(t, dataset, epochs=1, batch_size=4096, seed=0):
+    '''
+    Fit the Q-table of the trainer t, of fixed bins, to the transitions of the dataset, with its learning rate.
+    The targets are those of trainer.train_one_session: the value of the state after the action, which is
+    its death value 'x' or score value 's' if the transition died or scored, otherwise its max Q-value.
+    Each minibatch moves a value toward the mean of its targets in the batch, in dense arrays of the bins.
+    Returns the number of transitions fitted
+    '''
+    if not isinstance(t.discretizer, uniform_discretizer):
+        raise ValueError('only Q-tables of fixed bins can be fitted')
+    actions = [False, True, 'x', 's']
+    mins = np.array(t.get_state_mins())
+    steps = np.array([t.step_dx, t.step_dy, t.step_dvy])
+
+    def get_bins(states):
+        return np.floor((states - mins) / steps).astype(np.int64)
+
+    # the bins of the state ranges, extended to those of the transitions and of the existing entries, so that
+    # no state shares the bin of another
+    lo = np.zeros(3, dtype=np.int64)
+    hi = np.floor((np.array(t.get_state_maxs()) - mins) / steps).astype(np.int64)
+    for chunk in dataset.chunks:
+        for field in ('states', 'next_states'):
+            if len(chunk[field]):
+                bins = get_bins(chunk[field])
+                lo = np.minimum(lo, bins.min(axis=0))
+                hi = np.maximum(hi, bins.max(axis=0))
+    entries = [(np.array(state, dtype=np.int64), action, value) for (state, action), value in t.QTable.iteritems()]
+    for state, action, value in entries:
+        lo = np.minimum(lo, state)
+        hi = np.maximum(hi, state)
+    shape = tuple(hi - lo + 1)
+    n_cells = int(np.prod(shape))
+
+    def get_cells(states):
+        return np.ravel_multi_index((get_bins(states) - lo).T, shape)
+
+    values = np.zeros(len(actions) * n_cells)
+    fitted = np.zeros(len(actions) * n_cells, dtype=np.bool_)
+    for state, action, value in entries:
+        cell = actions.index(action) * n_cells + np.ravel_multi_index(state - lo, shape)
+        values[cell] = value
+        fitted[cell] = True
+
+    score_reward = dataset.meta['score_reward']
+    rng = np.random.RandomState(seed)
+    n = 0
+    for _ in xrange(epochs):
+        for batch in dataset.iterate_minibatches(batch_size, rng):
+            cells = get_cells(batch['states'])
+            next_cells = get_cells(batch['next_states'])
+            dead = batch['dones']
+            scored = ~dead & (batch['rewards'] >= score_reward)
+
+            # the terminal values, as trainer.train_one_session sets them
+            if dead.any():
+                state_x = np.floor((batch['next_states'][dead, 0] - mins[0]) / steps[0])
+                fitted[_update_means(values, 2 * n_cells + next_cells[dead], -5 * state_x - 10, t.alpha)] = True
+            if scored.any():
+                fitted[_update_means(values, 3 * n_cells + next_cells[scored], np.full(scored.sum(), 100.0), t.alpha)] = True
+
+            targets = np.where(dead, values[2 * n_cells + next_cells],
+                               np.where(scored, values[3 * n_cells + next_cells],
+                                        np.maximum(values[next_cells], values[n_cells + next_cells])))
+            action_cells = batch['actions'].astype(np.int64) * n_cells + cells
+            fitted[_update_means(values, action_cells, targets, t.alpha)] = True
+            n += len(cells)
+
+    for cell in np.flatnonzero(fitted):
+        action_idx, state_cell = divmod(int(cell), n_cells)
+        state = tuple(float(s) for s in np.array(np.unravel_index(state_cell, shape)) + lo)
+        t.QTable[(state, actions[action_idx])] = float(values[cell])
+    return n
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Generate transitions of headless games, or fit the Q-table to them')
+    subparsers = parser.add_subparsers(dest='command')
+    gen_parser = subparsers.add_parser('generate', help='simulate the games and write the transitions')
+    gen_parser.add_argument('--transitions', type=float, default=1e6, help='(default=%(default)s)')
+    gen_parser.add_argument('--producers', type=int, default=None, help='(default: the number of CPUs)')
+    gen_parser.add_argument('--chunk-size', type=int, default=None, help='(default: 65536, or 4096 with frames)')
+    gen_parser.add_argument('--queue-size', type=int, default=4, help='chunks held in memory (default=%(default)s)')
+    gen_parser.add_argument('--epsilon', type=float, default=0.2, help='probability of a random action (default=%(default)s)')
+    gen_parser.add_argument('--frames', default=None, help='also write frames of ROWSxCOLUMNS pixels, e.g. 50x100')
+    gen_parser.add_argument('--seed', type=int, default=0)
+    fit_parser = subparsers.add_parser('fit', help='fit the Q-table of trainer.py to the transitions')
+    fit_parser.add_argument('--epochs', type=int, default=1, help='(default=%(default)s)')
+    fit_parser.add_argument('--batch-size', type=int, default=4096, help='(default=%(default)s)')
+    fit_parser.add_argument('--qtable', default='data/QTable_v1', help='(default=%(default)s)')
+    for p in (gen_parser, fit_parser):
+        p.add_argument('--dir', default='data/transitions', help='(default=%(default)s)')
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.command == 'generate':
+        frame_shape = tuple(int(v) for v in args.frames.split('x')) if args.frames else None
+        n_chunks = generate(args.dir, int(args.transitions), producers=args.producers, chunk_size=args.chunk_size,
+                            queue_size=args.queue_size, epsilon=args.epsilon, frame_shape=frame_shape, seed=args.seed)
+        elapsed = time.time() - start
+        print 'Wrote {} transitions in {} chunks to {} in {:.1f}s, {:.0f} transitions/s'.format(
+            int(args.transitions), n_chunks, args.dir, elapsed, int(args.transitions) / elapsed)
+    else:
+        from trainer import trainer
+        dataset = transition_dataset(args.dir)
+        t = trainer(args.qtable, config=dataset.config)
+        n = fit_q_table(t, dataset, args.epochs, args.batch_size)
+        elapsed = time.time() - start
+        print 'Fitted {} transitions in {:.1f}s, {:.0f} transitions/s. Q-table size {}'.format(
+            n, elapsed, n / elapsed, len(t.QTable))
+        t.save_q_table()
+        print 'Evaluation scores:', t.evaluate()